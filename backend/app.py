@@ -9,13 +9,19 @@ import pandas as pd
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from datetime import datetime
+from collections import deque
 import sys
+import threading
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.login_tracker import get_login_tracker
-from decision_engine.resolution_model import recommend_resolution
+from database.mongo_client import pool_stats
+from data_source import ViewFilter, DataFrameSource, get_data_source, METRIC_COLUMNS
+from model_service import ModelService
+from decision_engine.resolution_model import recommend_resolution, severity_score
+from decision_engine.incidents import IncidentTracker
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend
@@ -38,28 +44,58 @@ USERS = {
 # -----------------------------
 # INITIALIZE LOGIN TRACKER
 # -----------------------------
+# Connects in the background; startup does not wait for MongoDB
 login_tracker = get_login_tracker()
 
 # -----------------------------
-# UTIL: Load dataset
+# DATA SOURCE (CSV in memory, Parquet or MongoDB via AIOPS_DATA_SOURCE)
 # -----------------------------
+try:
+    data_source = get_data_source(DATA_FILE)
+    print(f"[OK] Loaded {data_source.count()} records from {data_source.name}")
+except Exception as e:
+    print(f"[ERROR] Failed to load data: {e}")
+    data_source = DataFrameSource(pd.DataFrame())
 
 
-def load_data(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    df = df.dropna(subset=["timestamp"]).sort_values(
-        "timestamp").reset_index(drop=True)
-    return df
+# -----------------------------
+# MODELS (active registry version, loaded on first use, hot-swappable)
+# -----------------------------
+model_service = ModelService()
 
+# -----------------------------
+# INCIDENTS (alert rows coalesced as they are ingested)
+# -----------------------------
+RECENT_INCIDENTS = 200
+incident_tracker = IncidentTracker()
+recent_incidents = deque(maxlen=RECENT_INCIDENTS)
+incident_lock = threading.Lock()
 
-# Load data once at startup
 try:
-    df = load_data(DATA_FILE)
-    print(f"[OK] Loaded {len(df)} records from CSV")
+    # Start from recent history (the newest day partitions of a Parquet source),
+    # so incidents already in progress continue
+    recent_frame = getattr(data_source, "recent_frame", None)
+    history = recent_frame() if recent_frame else None
+    if isinstance(history, pd.DataFrame) and len(history) and "failure_probability" in history.columns:
+        incident_tracker.update_frame(history)
+        recent_incidents.extend(incident_tracker.drain_resolved())
+        print(f"[OK] Coalesced history into {len(recent_incidents)} recent and "
+              f"{len(incident_tracker.open)} open incidents")
 except Exception as e:
-    print(f"[ERROR] Failed to load data: {e}")
-    df = pd.DataFrame()
+    print(f"[WARN] Could not build incidents from history: {e}")
+
+
+def parse_view_filter() -> ViewFilter:
+    """Read the shared row-selection query parameters"""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    return ViewFilter(
+        alert_status=request.args.get('alert_status', 'ALL'),
+        root_cause=request.args.get('root_cause', 'ALL'),
+        start=pd.to_datetime(start_date) if start_date and end_date else None,
+        end=pd.to_datetime(end_date) if start_date and end_date else None,
+        window=int(request.args.get('window', 250))
+    )
 
 # -----------------------------
 # API ROUTES
@@ -72,8 +108,11 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "records": len(df),
-        "mongodb_connected": login_tracker.db is not None
+        "records": data_source.count(),
+        "data_source": data_source.name,
+        "mongodb_connected": login_tracker.db is not None,
+        "mongodb_breaker": login_tracker.breaker.state,
+        "mongodb_pool": pool_stats()
     })
 
 
@@ -121,7 +160,6 @@ def login():
 @app.route('/api/ingest', methods=['POST'])
 def ingest_data():
     """Ingest new metrics data (Real-time stream)"""
-    global df
     try:
         data = request.get_json()
 
@@ -167,25 +205,27 @@ def ingest_data():
             anomaly_label=data['anomaly_label'],
         )
         data.update(resolution)
-        
-        # Append to DataFrame
-        new_row = pd.DataFrame([data])
-        new_row['timestamp'] = pd.to_datetime(
-            new_row['timestamp'], errors='coerce')
-
-        # Handle empty dataframe case
-        if df.empty:
-            df = new_row.copy()
-        else:
-            df = pd.concat([df, new_row], ignore_index=True)
 
-        # Optional: Save back to CSV occasionally (skipping for performance demo)
+        # Coalesce into an incident (open / update / resolve)
+        with incident_lock:
+            event, incident, _ = incident_tracker.update(
+                data['timestamp'], data['predicted_root_cause'], data['failure_probability'],
+                severity=severity_score(data['cpu_usage'], data['memory_usage'],
+                                        data['response_time'], data['anomaly_score']),
+                plan=data,
+            )
+            recent_incidents.extend(incident_tracker.drain_resolved())
+            incident_info = dict(incident.to_dict(), event=event) if incident else None
+
+        # Append to the active data source
+        data_source.append(data)
 
         return jsonify({
             "success": True,
             "message": "Data ingested successfully",
-            "total_records": len(df),
-            "ingested_record": data
+            "total_records": data_source.count(),
+            "ingested_record": data,
+            "incident": incident_info
         })
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -195,54 +235,23 @@ def ingest_data():
 def get_data():
     """Get filtered data based on query parameters"""
     try:
-        # Check if dataframe is empty
-        if df.empty:
+        # Check if dataset is empty
+        if data_source.is_empty():
             return jsonify({
                 "success": False,
                 "error": "No data available. Please ensure CSV file exists and contains data."
             }), 404
 
-        # Get query parameters
-        alert_filter = request.args.get('alert_status', 'ALL')
-        root_filter = request.args.get('root_cause', 'ALL')
-        window = int(request.args.get('window', 250))
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-
-        # Apply filters
-        filtered = df.copy()
-
-        if alert_filter != "ALL":
-            filtered = filtered[filtered["alert_status"] == alert_filter]
-
-        if root_filter != "ALL":
-            filtered = filtered[filtered["predicted_root_cause"]
-                                == root_filter]
-
-        # Date range filter
-        if start_date and end_date:
-            start = pd.to_datetime(start_date)
-            end = pd.to_datetime(end_date)
-            filtered = filtered[
-                (filtered["timestamp"] >= start) &
-                (filtered["timestamp"] <= end)
-            ]
+        # Filters are applied by the data source; only the window is returned
+        view = parse_view_filter()
+        view_df = data_source.rows(view)
 
         # Check if filtered result is empty
-        if filtered.empty:
-            return jsonify({
-                "success": False,
-                "error": "No data found for selected filters"
-            }), 404
-
-        # Apply window
-        view_df = filtered.tail(window).copy()
-
-        # Check if view_df is empty after window
         if view_df.empty:
             return jsonify({
                 "success": False,
-                "error": "No data in selected window"
+                "error": "No data in selected window" if view.window <= 0
+                else "No data found for selected filters"
             }), 404
 
         # Get latest record
@@ -282,15 +291,16 @@ def get_data():
 def get_kpi():
     """Get KPI metrics"""
     try:
-        # Check if dataframe is empty
-        if df.empty:
+        # Check if dataset is empty
+        if data_source.is_empty():
             return jsonify({
                 "success": False,
                 "error": "No data available"
             }), 404
 
         window = int(request.args.get('window', 250))
-        view_df = df.tail(window).copy()
+        # Only the newest row of the window is needed
+        view_df = data_source.rows(ViewFilter(window=min(window, 1)))
 
         # Check if view_df is empty
         if view_df.empty:
@@ -324,15 +334,16 @@ def get_kpi():
 def get_analytics():
     """Get analytics data"""
     try:
-        # Check if dataframe is empty
-        if df.empty:
+        # Check if dataset is empty
+        if data_source.is_empty():
             return jsonify({
                 "success": False,
                 "error": "No data available"
             }), 404
 
-        window = int(request.args.get('window', 250))
-        view_df = df.tail(window).copy()
+        view = parse_view_filter()
+        # Metric columns only, for correlation and describe()
+        view_df = data_source.rows(view, columns=METRIC_COLUMNS)
 
         # Check if view_df is empty
         if view_df.empty:
@@ -342,17 +353,13 @@ def get_analytics():
             }), 404
 
         # Root cause distribution
-        rc_counts = view_df["predicted_root_cause"].value_counts(
-        ).to_dict() if "predicted_root_cause" in view_df.columns else {}
+        rc_counts = data_source.value_counts(view, "predicted_root_cause")
 
         # Alert status distribution
-        alert_counts = view_df["alert_status"].value_counts(
-        ).to_dict() if "alert_status" in view_df.columns else {}
+        alert_counts = data_source.value_counts(view, "alert_status")
 
         # Correlation matrix
-        metrics = ['cpu_usage', 'memory_usage',
-                   'response_time', 'failure_probability']
-        available_metrics = [m for m in metrics if m in view_df.columns]
+        available_metrics = [m for m in METRIC_COLUMNS if m in view_df.columns]
 
         if len(available_metrics) > 1:
             corr_matrix = view_df[available_metrics].corr().to_dict()
@@ -379,64 +386,41 @@ def get_analytics():
 def get_insights():
     """Get AI-powered insights"""
     try:
-        # Check if dataframe is empty
-        if df.empty:
+        # Check if dataset is empty
+        if data_source.is_empty():
             return jsonify({
                 "success": False,
                 "error": "No data available"
             }), 404
 
-        window = int(request.args.get('window', 250))
-        view_df = df.tail(window).copy()
+        view = parse_view_filter()
+        summary = data_source.summary(view)
 
-        # Check if view_df is empty
-        if view_df.empty:
+        # Check if the window is empty
+        if summary["total"] == 0:
             return jsonify({
                 "success": False,
                 "error": "No data in selected window"
             }), 404
 
-        total_records = len(view_df)
-        alerts_count = int((view_df["alert_status"] == "ALERT").sum(
-        )) if "alert_status" in view_df.columns else 0
-        anom_count = int((view_df.get("anomaly_label", 0) == 1).sum()
-                         ) if "anomaly_label" in view_df.columns else 0
-
-        alert_rate = (alerts_count / total_records *
+        total_records = summary["total"]
+        alert_rate = (summary["alerts"] / total_records *
                       100) if total_records > 0 else 0
-        anomaly_rate = (anom_count / total_records *
+        anomaly_rate = (summary["anomalies"] / total_records *
                         100) if total_records > 0 else 0
 
-        avg_cpu = float(view_df['cpu_usage'].mean()
-                        ) if 'cpu_usage' in view_df.columns else 0.0
-        avg_memory = float(view_df['memory_usage'].mean(
-        )) if 'memory_usage' in view_df.columns else 0.0
-        avg_response = float(view_df['response_time'].mean(
-        )) if 'response_time' in view_df.columns else 0.0
-        avg_failure_prob = float(view_df['failure_probability'].mean(
-        )) if 'failure_probability' in view_df.columns else 0.0
-
         # Hourly trends
-        hourly_trends = []
-        if 'timestamp' in view_df.columns and not view_df.empty:
-            view_df['hour'] = view_df['timestamp'].dt.hour
-            hourly_stats = view_df.groupby('hour').agg({
-                'cpu_usage': 'mean' if 'cpu_usage' in view_df.columns else 'count',
-                'memory_usage': 'mean' if 'memory_usage' in view_df.columns else 'count',
-                'response_time': 'mean' if 'response_time' in view_df.columns else 'count',
-                'alert_status': lambda x: (x == 'ALERT').sum() if 'alert_status' in view_df.columns else 0
-            }).reset_index()
-            hourly_trends = hourly_stats.to_dict('records')
+        hourly_trends = data_source.hourly_trends(view)
 
         return jsonify({
             "success": True,
             "insights": {
                 "alert_rate": alert_rate,
                 "anomaly_rate": anomaly_rate,
-                "avg_cpu": avg_cpu,
-                "avg_memory": avg_memory,
-                "avg_response": avg_response,
-                "avg_failure_prob": avg_failure_prob,
+                "avg_cpu": summary["avg_cpu"],
+                "avg_memory": summary["avg_memory"],
+                "avg_response": summary["avg_response"],
+                "avg_failure_prob": summary["avg_failure_prob"],
                 "hourly_trends": hourly_trends
             }
         })
@@ -451,8 +435,8 @@ def get_insights():
 def get_options():
     """Get filter options"""
     try:
-        # Check if dataframe is empty
-        if df.empty:
+        # Check if dataset is empty
+        if data_source.is_empty():
             return jsonify({
                 "success": True,
                 "root_causes": [],
@@ -463,21 +447,7 @@ def get_options():
             })
 
         alert_filter = request.args.get('alert_status', 'ALL')
-
-        temp = df.copy()
-        if alert_filter != "ALL" and "alert_status" in temp.columns:
-            temp = temp[temp["alert_status"] == alert_filter]
-
-        root_causes = []
-        if "predicted_root_cause" in temp.columns:
-            root_causes = sorted(
-                temp["predicted_root_cause"].astype(str).unique().tolist())
-
-        date_min = ""
-        date_max = ""
-        if "timestamp" in df.columns and not df.empty:
-            date_min = str(df["timestamp"].min().date())
-            date_max = str(df["timestamp"].max().date())
+        root_causes, date_min, date_max = data_source.options(alert_filter)
 
         return jsonify({
             "success": True,
@@ -494,6 +464,70 @@ def get_options():
         }), 500
 
 
+@app.route('/api/models', methods=['GET'])
+def get_models():
+    """Loaded and active model versions"""
+    try:
+        info = model_service.info()
+        version = info["active_version"]
+        info["metadata"] = model_service.registry.metadata(version) if version else {}
+        return jsonify({"success": True, **info})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/models/activate', methods=['POST'])
+def activate_model():
+    """Hot-swap the active model version (Admin only)"""
+    data = request.get_json() or {}
+    version = data.get('version')
+    if not version:
+        return jsonify({"success": False, "error": "No version provided"}), 400
+    try:
+        models = model_service.activate(version)
+        return jsonify({"success": True, "version": models.version})
+    except KeyError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/score', methods=['POST'])
+def score_rows():
+    """Score engineered feature rows with the active models"""
+    data = request.get_json()
+    if not data:
+        return jsonify({"success": False, "error": "No data provided"}), 400
+    rows = data.get('rows', [data]) if isinstance(data, dict) else data
+    try:
+        version, results = model_service.score(rows)
+        return jsonify({"success": True, "model_version": version, "results": results})
+    except KeyError as e:
+        return jsonify({"success": False, "error": f"Missing feature: {e}"}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/incidents', methods=['GET'])
+def get_incidents():
+    """Open and recently resolved incidents (status=OPEN|RESOLVED|ALL)"""
+    try:
+        status = request.args.get('status', 'ALL').upper()
+        limit = int(request.args.get('limit', 50))
+        with incident_lock:
+            open_incidents = [i.to_dict() for i in incident_tracker.open_incidents()]
+            resolved = [i.to_dict() for i in reversed(recent_incidents)]
+        incidents = (open_incidents if status in ('ALL', 'OPEN') else []) + \
+            (resolved if status in ('ALL', 'RESOLVED') else [])
+        return jsonify({
+            "success": True,
+            "open": len(open_incidents),
+            "incidents": incidents[:limit]
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route('/api/login-history', methods=['GET'])
 def get_login_history():
     """Get login history (Admin only) - MongoDB tracking"""
@@ -533,8 +567,8 @@ def get_login_stats():
 if __name__ == '__main__':
     print("🚀 Starting AIOps Backend API Server...")
     print(f"📊 Data file: {DATA_FILE}")
-    print(f"📈 Records loaded: {len(df)}")
-    print(f"🔐 MongoDB login tracking: "f"{'Enabled' if login_tracker.db is not None else 'Disabled'}")
+    print(f"📈 Records loaded: {data_source.count()} ({data_source.name})")
+    print(f"🔐 MongoDB login tracking: "f"{'Enabled' if login_tracker.db is not None else 'Connecting in background'}")
     app.run(
         debug=True,
         host='0.0.0.0',
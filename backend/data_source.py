@@ -0,0 +1,454 @@
+"""
+Data sources for the backend API
+
+The API routes describe what they need as a ViewFilter (alert status,
+root cause, date range and window) and ask a data source for rows,
+counts and aggregates. Three sources are available, selected with
+AIOPS_DATA_SOURCE:
+
+    csv     - the decision output CSV loaded into a DataFrame (default)
+    parquet - the date-partitioned Parquet decision output; each request
+              only reads the day partitions (and rows) its filter touches
+    mongo   - the incidents collection; filters become indexed queries and
+              $group pipelines, so the dataset never has to fit in memory
+"""
+import atexit
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+METRIC_COLUMNS = ['cpu_usage', 'memory_usage', 'response_time', 'failure_probability']
+
+# Ingested rows written to the Parquet dataset per batch / at the latest after this long
+PARQUET_BATCH_ROWS = int(os.getenv("AIOPS_PARQUET_BATCH_ROWS", "500"))
+PARQUET_FLUSH_SECONDS = float(os.getenv("AIOPS_PARQUET_FLUSH_SECONDS", "60"))
+# Days of history recent_frame() reads (startup priming)
+RECENT_DAYS = int(os.getenv("AIOPS_RECENT_DAYS", "2"))
+
+# Internal fields that are not part of the dataset rows
+_HIDDEN_FIELDS = {"_id": 0, "created_at": 0, "meta": 0}
+
+
+@dataclass
+class ViewFilter:
+    """Row selection shared by the API routes"""
+    alert_status: str = "ALL"
+    root_cause: str = "ALL"
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    window: int = 250
+
+
+class DataFrameSource:
+    """In-memory source backed by the decision output CSV"""
+
+    name = "csv"
+
+    def __init__(self, df):
+        self.df = df
+
+    @classmethod
+    def from_csv(cls, path):
+        df = pd.read_csv(path)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        df = df.dropna(subset=["timestamp"]).sort_values(
+            "timestamp").reset_index(drop=True)
+        return cls(df)
+
+    def count(self):
+        return len(self.df)
+
+    def recent_frame(self, days=RECENT_DAYS):
+        """Recent history to prime state from (in memory already, so all of it)"""
+        return self.df
+
+    def is_empty(self):
+        return self.df.empty
+
+    def append(self, record):
+        new_row = pd.DataFrame([record])
+        new_row['timestamp'] = pd.to_datetime(
+            new_row['timestamp'], errors='coerce')
+
+        # Handle empty dataframe case
+        if self.df.empty:
+            self.df = new_row.copy()
+        else:
+            self.df = pd.concat([self.df, new_row], ignore_index=True)
+
+    def _filtered(self, view):
+        filtered = self.df
+
+        if view.alert_status != "ALL":
+            filtered = filtered[filtered["alert_status"] == view.alert_status]
+
+        if view.root_cause != "ALL":
+            filtered = filtered[filtered["predicted_root_cause"]
+                                == view.root_cause]
+
+        # Date range filter
+        if view.start is not None and view.end is not None:
+            filtered = filtered[
+                (filtered["timestamp"] >= view.start) &
+                (filtered["timestamp"] <= view.end)
+            ]
+        return filtered
+
+    def rows(self, view, columns=None):
+        """The last `window` matching rows, oldest first"""
+        view_df = self._filtered(view).tail(view.window)
+        if columns is not None:
+            view_df = view_df[[c for c in columns if c in view_df.columns]]
+        return view_df.copy()
+
+    def value_counts(self, view, column):
+        view_df = self.rows(view)
+        if column not in view_df.columns:
+            return {}
+        return view_df[column].value_counts().to_dict()
+
+    def summary(self, view):
+        view_df = self.rows(view)
+        return {
+            "total": len(view_df),
+            "alerts": int((view_df["alert_status"] == "ALERT").sum()) if "alert_status" in view_df.columns else 0,
+            "ok": int((view_df["alert_status"] == "OK").sum()) if "alert_status" in view_df.columns else 0,
+            "anomalies": int((view_df["anomaly_label"] == 1).sum()) if "anomaly_label" in view_df.columns else 0,
+            "avg_cpu": float(view_df['cpu_usage'].mean()) if 'cpu_usage' in view_df.columns else 0.0,
+            "avg_memory": float(view_df['memory_usage'].mean()) if 'memory_usage' in view_df.columns else 0.0,
+            "avg_response": float(view_df['response_time'].mean()) if 'response_time' in view_df.columns else 0.0,
+            "avg_failure_prob": float(view_df['failure_probability'].mean()) if 'failure_probability' in view_df.columns else 0.0,
+        }
+
+    def hourly_trends(self, view):
+        view_df = self.rows(view)
+        if 'timestamp' not in view_df.columns or view_df.empty:
+            return []
+        view_df['hour'] = view_df['timestamp'].dt.hour
+        hourly_stats = view_df.groupby('hour').agg({
+            'cpu_usage': 'mean' if 'cpu_usage' in view_df.columns else 'count',
+            'memory_usage': 'mean' if 'memory_usage' in view_df.columns else 'count',
+            'response_time': 'mean' if 'response_time' in view_df.columns else 'count',
+            'alert_status': lambda x: (x == 'ALERT').sum() if 'alert_status' in view_df.columns else 0
+        }).reset_index()
+        return hourly_stats.to_dict('records')
+
+    def options(self, alert_status="ALL"):
+        temp = self.df
+        if alert_status != "ALL" and "alert_status" in temp.columns:
+            temp = temp[temp["alert_status"] == alert_status]
+
+        root_causes = []
+        if "predicted_root_cause" in temp.columns:
+            root_causes = sorted(
+                temp["predicted_root_cause"].astype(str).unique().tolist())
+
+        date_min = ""
+        date_max = ""
+        if "timestamp" in self.df.columns and not self.df.empty:
+            date_min = str(self.df["timestamp"].min().date())
+            date_max = str(self.df["timestamp"].max().date())
+        return root_causes, date_min, date_max
+
+
+class ParquetSource(DataFrameSource):
+    """
+    Source reading only the Parquet day partitions a request touches
+
+    Ingested rows are buffered and written per partition in batches
+    (PARQUET_BATCH_ROWS rows, or the first buffered row is
+    PARQUET_FLUSH_SECONDS old), and partitions that collect many files are
+    compacted, so ingest does not leave one file per row. Reads include
+    the buffered rows.
+    """
+
+    name = "parquet"
+
+    def __init__(self, csv_path):
+        from decision_engine import stage_store
+        self.stage = stage_store
+        self.path = csv_path
+        if not stage_store.stage_exists(csv_path, stage_store.PARQUET):
+            raise FileNotFoundError(f"no Parquet dataset at {stage_store.dataset_path(csv_path)}")
+        self.lock = threading.RLock()
+        self.buffer = []
+        self.buffered_since = None
+        # Row count on disk, valid while the dataset metadata is unchanged
+        self._disk_rows = None
+        self._metadata_mtime = None
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _filters(view):
+        filters = {}
+        if view.alert_status != "ALL":
+            filters["alert_status"] = view.alert_status
+        if view.root_cause != "ALL":
+            filters["predicted_root_cause"] = view.root_cause
+        return filters
+
+    def _buffered(self, start=None, end=None, filters=None, days=None, columns=None):
+        """Buffered rows matching the read_stage arguments"""
+        df = pd.DataFrame(self.buffer)
+        if df.empty:
+            return df
+        stamps = df["timestamp"]
+        keep = pd.Series(True, index=df.index)
+        if start is not None:
+            keep &= stamps >= pd.Timestamp(start)
+        if end is not None:
+            keep &= stamps <= pd.Timestamp(end)
+        if days is not None:
+            keep &= stamps.dt.strftime("%Y-%m-%d").isin(list(days))
+        for column, value in (filters or {}).items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            keep &= df[column].isin(values) if column in df.columns else False
+        df = df[keep]
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+        return df
+
+    def _read(self, **kwargs):
+        with self.lock:
+            df = self.stage.read_stage(self.path, self.stage.PARQUET, **kwargs)
+            buffered = self._buffered(**kwargs)
+        if len(buffered):
+            df = pd.concat([df, buffered], ignore_index=True) if len(df) else buffered
+        if "timestamp" in df.columns:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+            df = df.dropna(subset=["timestamp"]).sort_values("timestamp", kind="stable")
+        return df.reset_index(drop=True)
+
+    def _days(self):
+        days = set(self.stage.stage_days(self.path))
+        days.update(str(record["timestamp"].date()) for record in self.buffer
+                    if not pd.isna(record["timestamp"]))
+        return sorted(days)
+
+    def recent_frame(self, days=RECENT_DAYS):
+        """The rows of the newest `days` day partitions (plus the buffered rows)"""
+        with self.lock:
+            recent = self._days()[-days:]
+        return self._read(days=recent) if recent else pd.DataFrame()
+
+    def count(self):
+        with self.lock:
+            metadata = os.path.join(self.stage.dataset_path(self.path), self.stage.METADATA_FILE)
+            mtime = os.stat(metadata).st_mtime_ns
+            # A rewrite of the dataset (write_stage) replaces the metadata file
+            if self._disk_rows is None or mtime != self._metadata_mtime:
+                self._disk_rows = self.stage.count_stage_rows(self.path, self.stage.PARQUET)
+                self._metadata_mtime = mtime
+            return self._disk_rows + len(self.buffer)
+
+    def is_empty(self):
+        return self.count() == 0
+
+    def append(self, record):
+        record = dict(record)
+        record["timestamp"] = pd.to_datetime(record["timestamp"], errors="coerce")
+        with self.lock:
+            self.buffer.append(record)
+            now = time.monotonic()
+            if self.buffered_since is None:
+                self.buffered_since = now
+            if len(self.buffer) >= PARQUET_BATCH_ROWS or now - self.buffered_since >= PARQUET_FLUSH_SECONDS:
+                self.flush()
+
+    def flush(self):
+        """Write the buffered rows (one file per touched partition) and compact those partitions"""
+        with self.lock:
+            if not self.buffer:
+                return 0
+            frame = pd.DataFrame(self.buffer)
+            rows = len(frame)
+            disk_rows = self.count() - rows
+            try:
+                self.stage.append_stage(frame, self.path, self.stage.PARQUET)
+            except Exception as e:
+                print(f"[ERROR] Could not write {rows} buffered rows: {e}")
+                return 0
+            self.buffer, self.buffered_since = [], None
+            self._disk_rows = disk_rows + rows
+            days = frame["timestamp"].dt.strftime("%Y-%m-%d").fillna(self.stage.UNKNOWN_DATE).unique()
+            try:
+                self.stage.compact_stage(self.path, days=list(days))
+            except Exception as e:
+                print(f"[WARN] Could not compact {self.path}: {e}")
+            return rows
+
+    def _view_frame(self, view):
+        """The rows the view can select from, read partition by partition"""
+        filters = self._filters(view)
+        if view.start is not None and view.end is not None:
+            return self._read(start=view.start, end=view.end, filters=filters)
+        # tail(window): read days newest first until the window is full
+        parts, rows = [], 0
+        for day in reversed(self._days()):
+            part = self._read(days=[day], filters=filters)
+            parts.append(part)
+            rows += len(part)
+            if rows >= view.window:
+                break
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts[::-1], ignore_index=True)
+
+    def rows(self, view, columns=None):
+        return DataFrameSource(self._view_frame(view)).rows(view, columns)
+
+    def options(self, alert_status="ALL"):
+        filters = {} if alert_status == "ALL" else {"alert_status": alert_status}
+        causes = self._read(columns=["predicted_root_cause"], filters=filters)
+        root_causes = sorted(causes["predicted_root_cause"].astype(str).unique().tolist()) \
+            if "predicted_root_cause" in causes.columns else []
+        with self.lock:
+            days = self._days()
+        return root_causes, (days[0] if days else ""), (days[-1] if days else "")
+
+
+class MongoSource:
+    """Source that pushes filters and aggregations down to MongoDB"""
+
+    name = "mongo"
+
+    def __init__(self, database):
+        self.database = database
+        # The store hides the storage layout (standard/timeseries/bucketed)
+        self.store = database.incidents_store
+
+    def count(self):
+        return self.store.count_documents({})
+
+    def is_empty(self):
+        return self.store.find_one({}, {"_id": 1}) is None
+
+    def append(self, record):
+        record = dict(record)
+        record["timestamp"] = pd.to_datetime(record["timestamp"], errors="coerce").to_pydatetime()
+        self.database.insert_incident(record)
+
+    @staticmethod
+    def _match(view):
+        query = {}
+        if view.alert_status != "ALL":
+            query["alert_status"] = view.alert_status
+        if view.root_cause != "ALL":
+            query["predicted_root_cause"] = view.root_cause
+        if view.start is not None and view.end is not None:
+            query["timestamp"] = {"$gte": view.start, "$lte": view.end}
+        return query
+
+    def _window_stages(self, view):
+        """$match + newest-first $limit: the same rows as tail(window)"""
+        return [
+            {"$match": self._match(view)},
+            {"$sort": {"timestamp": -1, "_id": -1}},
+            {"$limit": view.window}
+        ]
+
+    def rows(self, view, columns=None):
+        if view.window <= 0:
+            return pd.DataFrame()
+        projection = {c: 1 for c in columns} if columns else dict(_HIDDEN_FIELDS)
+        if columns:
+            projection["_id"] = 0
+        cursor = self.store.find(self._match(view), projection) \
+            .sort([("timestamp", -1), ("_id", -1)]).limit(view.window)
+        view_df = pd.DataFrame(list(cursor))
+        if view_df.empty:
+            return view_df
+        if "timestamp" in view_df.columns:
+            view_df["timestamp"] = pd.to_datetime(view_df["timestamp"], errors="coerce")
+        return view_df.iloc[::-1].reset_index(drop=True)
+
+    def value_counts(self, view, column):
+        if view.window <= 0:
+            return {}
+        pipeline = self._window_stages(view) + [
+            {"$group": {"_id": f"${column}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}}
+        ]
+        return {item["_id"]: item["count"] for item in self.store.aggregate(pipeline)
+                if item["_id"] is not None}
+
+    def summary(self, view):
+        pipeline = self._window_stages(view) + [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "alerts": {"$sum": {"$cond": [{"$eq": ["$alert_status", "ALERT"]}, 1, 0]}},
+                "ok": {"$sum": {"$cond": [{"$eq": ["$alert_status", "OK"]}, 1, 0]}},
+                "anomalies": {"$sum": {"$cond": [{"$eq": ["$anomaly_label", 1]}, 1, 0]}},
+                "avg_cpu": {"$avg": "$cpu_usage"},
+                "avg_memory": {"$avg": "$memory_usage"},
+                "avg_response": {"$avg": "$response_time"},
+                "avg_failure_prob": {"$avg": "$failure_probability"}
+            }}
+        ]
+        result = next(iter(self.store.aggregate(pipeline)), None) if view.window > 0 else None
+        if result is None:
+            return {"total": 0, "alerts": 0, "ok": 0, "anomalies": 0, "avg_cpu": 0.0,
+                    "avg_memory": 0.0, "avg_response": 0.0, "avg_failure_prob": 0.0}
+        result.pop("_id", None)
+        for key in ("avg_cpu", "avg_memory", "avg_response", "avg_failure_prob"):
+            result[key] = float(result[key] or 0.0)
+        return result
+
+    def hourly_trends(self, view):
+        if view.window <= 0:
+            return []
+        pipeline = self._window_stages(view) + [
+            {"$group": {
+                "_id": {"$hour": "$timestamp"},
+                "cpu_usage": {"$avg": "$cpu_usage"},
+                "memory_usage": {"$avg": "$memory_usage"},
+                "response_time": {"$avg": "$response_time"},
+                "alert_status": {"$sum": {"$cond": [{"$eq": ["$alert_status", "ALERT"]}, 1, 0]}}
+            }},
+            {"$sort": {"_id": 1}}
+        ]
+        trends = []
+        for item in self.store.aggregate(pipeline):
+            item["hour"] = item.pop("_id")
+            trends.append(item)
+        return trends
+
+    def options(self, alert_status="ALL"):
+        match = {} if alert_status == "ALL" else {"alert_status": alert_status}
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": "$predicted_root_cause"}}
+        ]
+        root_causes = sorted(str(item["_id"]) for item in self.store.aggregate(pipeline))
+
+        date_min = ""
+        date_max = ""
+        first = self.store.find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+        last = self.store.find_one({}, {"timestamp": 1}, sort=[("timestamp", -1)])
+        if first and last:
+            date_min = str(pd.Timestamp(first["timestamp"]).date())
+            date_max = str(pd.Timestamp(last["timestamp"]).date())
+        return root_causes, date_min, date_max
+
+
+def get_data_source(csv_path):
+    """Build the data source named by AIOPS_DATA_SOURCE (csv, parquet or mongo)"""
+    kind = os.getenv("AIOPS_DATA_SOURCE", "csv").lower()
+    if kind == "parquet":
+        try:
+            return ParquetSource(csv_path)
+        except Exception as e:
+            print(f"[WARN] Parquet data source unavailable ({e}); falling back to CSV")
+    if kind == "mongo":
+        try:
+            from database.mongodb_connection import get_database
+            return MongoSource(get_database())
+        except Exception as e:
+            print(f"[WARN] MongoDB data source unavailable ({e}); falling back to CSV")
+    return DataFrameSource.from_csv(csv_path)
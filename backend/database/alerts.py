@@ -0,0 +1,159 @@
+"""
+Alert fingerprints and bulk write operations
+
+An alert's fingerprint identifies the condition it reports (service,
+host, metric, type, root cause). At most one active alert exists per
+fingerprint, enforced by a partial unique index, so repeated raises of
+the same condition update that alert instead of piling up duplicates.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import InsertOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+
+FINGERPRINT_FIELDS = ("service", "host", "metric", "alert_type", "predicted_root_cause")
+
+# Fields returned by get_active_alerts() unless a projection is given
+ACTIVE_ALERT_PROJECTION = {
+    "fingerprint": 1, "status": 1, "severity": 1, "message": 1,
+    "alert_type": 1, "predicted_root_cause": 1, "service": 1, "host": 1, "metric": 1,
+    "timestamp": 1, "created_at": 1, "last_seen": 1, "occurrences": 1,
+}
+
+DUPLICATE_KEY = 11000
+UPSERT_ATTEMPTS = 3
+
+
+def alert_fingerprint(alert):
+    """
+    Stable identity of an alert: an explicit fingerprint or a hash of
+    FINGERPRINT_FIELDS. An alert with none of those set is only itself,
+    so its _id is used (None when it has no _id yet).
+    """
+    if alert.get("fingerprint"):
+        return str(alert["fingerprint"])
+    key = {field: alert.get(field) for field in FINGERPRINT_FIELDS}
+    if all(value is None for value in key.values()):
+        return str(alert["_id"]) if alert.get("_id") is not None else None
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def to_object_id(alert_id):
+    """ObjectId for a hex string id; other ids are matched as given"""
+    if isinstance(alert_id, str):
+        try:
+            return ObjectId(alert_id)
+        except InvalidId:
+            return alert_id
+    return alert_id
+
+
+def _duplicate_indexes(error):
+    """Indexes of the ops that failed on the unique fingerprint; re-raise anything else"""
+    errors = error.details.get("writeErrors", [])
+    if any(e.get("code") != DUPLICATE_KEY for e in errors):
+        raise error
+    return {e["index"] for e in errors}
+
+
+def insert_alerts(collection, alerts):
+    """
+    Insert new active alerts, skipping fingerprints that already have one
+
+    Returns:
+        List of inserted ids (None for skipped duplicates), in input order
+    """
+    now = datetime.now()
+    documents = []
+    for alert in alerts:
+        document = dict(alert)
+        document.setdefault("_id", ObjectId())
+        document["fingerprint"] = alert_fingerprint(document)
+        document["status"] = "active"
+        document["created_at"] = now
+        document["last_seen"] = now
+        document["occurrences"] = 1
+        documents.append(document)
+    if not documents:
+        return []
+
+    skipped = set()
+    try:
+        # InsertOne assigns _id client side, so ids are known either way
+        collection.bulk_write([InsertOne(doc) for doc in documents], ordered=False)
+    except BulkWriteError as e:
+        skipped = _duplicate_indexes(e)
+    return [None if i in skipped else str(doc["_id"]) for i, doc in enumerate(documents)]
+
+
+def upsert_alerts(collection, alerts):
+    """
+    Raise alerts by fingerprint: refresh the active alert or open a new one
+
+    Alerts sharing a fingerprint within the batch collapse into one write
+    (the last one wins). Returns counts of created and updated alerts.
+    """
+    now = datetime.now()
+    latest = {}
+    repeats = {}
+    for alert in alerts:
+        fingerprint = alert_fingerprint(alert) or str(ObjectId())
+        latest[fingerprint] = alert
+        repeats[fingerprint] = repeats.get(fingerprint, 0) + 1
+    if not latest:
+        return {"created": 0, "updated": 0}
+
+    operations = []
+    for fingerprint, alert in latest.items():
+        fields = {k: v for k, v in alert.items()
+                  if k not in ("_id", "status", "created_at", "occurrences")}
+        fields["fingerprint"] = fingerprint
+        fields["last_seen"] = now
+        operations.append(UpdateOne(
+            {"fingerprint": fingerprint, "status": "active"},
+            {
+                "$set": fields,
+                "$setOnInsert": {"status": "active", "created_at": now},
+                "$inc": {"occurrences": repeats[fingerprint]}
+            },
+            upsert=True
+        ))
+
+    created = updated = 0
+    for _ in range(UPSERT_ATTEMPTS):
+        if not operations:
+            break
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            failed = set()
+        except BulkWriteError as e:
+            # Two writers upserting the same new fingerprint: the loser hits
+            # the unique index and is retried as an update
+            result = None
+            failed = _duplicate_indexes(e)
+            created += e.details.get("nUpserted", 0)
+            updated += e.details.get("nMatched", 0)
+        if result is not None:
+            created += result.upserted_count
+            updated += result.matched_count
+        operations = [op for i, op in enumerate(operations) if i in failed]
+    return {"created": created, "updated": updated}
+
+
+def close_alerts(collection, alert_ids=None, fingerprints=None):
+    """Close active alerts by id and/or fingerprint; returns the number closed"""
+    update = {"$set": {"status": "closed", "closed_at": datetime.now()}}
+    operations = []
+    if alert_ids:
+        ids = [to_object_id(alert_id) for alert_id in alert_ids]
+        operations.append(UpdateMany({"_id": {"$in": ids}, "status": "active"}, update))
+    if fingerprints:
+        operations.append(UpdateMany(
+            {"fingerprint": {"$in": list(fingerprints)}, "status": "active"}, update))
+    if not operations:
+        return 0
+    return collection.bulk_write(operations, ordered=False).modified_count
@@ -0,0 +1,74 @@
+"""
+Circuit breaker for calls to an unreliable dependency (MongoDB)
+"""
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker
+
+    closed    -> calls pass through; consecutive failures are counted
+    open      -> calls are short-circuited until reset_timeout has elapsed
+    half_open -> one trial call is let through; success closes, failure re-opens.
+                 A trial that reports neither is retried after reset_timeout
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to wait in the open state before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may proceed"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """Count a failed call, opening the circuit when the threshold is hit"""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def release(self):
+        """End an inconclusive trial call, re-opening the circuit"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+
+    def trip(self):
+        """Open the circuit immediately"""
+        with self._lock:
+            self.failures = max(self.failures, self.failure_threshold)
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
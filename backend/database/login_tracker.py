@@ -2,20 +2,31 @@
 MongoDB Login Tracker - Only for tracking user logins
 """
 import os
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+import threading
+from pymongo import UpdateOne, ReplaceOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError, ServerSelectionTimeoutError
 from datetime import datetime
 
+from .circuit_breaker import CircuitBreaker
+from .login_writer import LoginAuditWriter, PartialWriteError
+from .mongo_client import get_client, release_client
+
+# MongoDB error code of a duplicate _id (the record is already stored)
+DUPLICATE_KEY = 11000
+
+
 class LoginTracker:
     """MongoDB Connection for Login Tracking Only"""
     
-    def __init__(self, connection_string=None, database_name="aiops_db"):
+    def __init__(self, connection_string=None, database_name="aiops_db", background=True):
         """
         Initialize MongoDB connection for login tracking
         
         Args:
             connection_string: MongoDB connection string (default: mongodb://localhost:27017/)
             database_name: Name of the database to use
+            background: Connect and create indexes on a background thread
+                        instead of blocking the caller
         """
         if connection_string is None:
             connection_string = os.getenv(
@@ -27,73 +38,204 @@ class LoginTracker:
         self.database_name = database_name
         self.client = None
         self.db = None
-        self._connect()
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('MONGODB_BREAKER_FAILURES', 3)),
+            reset_timeout=float(os.getenv('MONGODB_BREAKER_RESET_SECONDS', 30))
+        )
+        self._connect_lock = threading.Lock()
+        self._connect_thread = None
+        # Held while a batch is inserted and folded into login_stats, and
+        # while login_stats is rebuilt, so neither sees the other half done
+        self._stats_lock = threading.Lock()
+        # Records queued before the connection is up are flushed (or spilled)
+        # by the writer once it gets to them
+        self.writer = LoginAuditWriter(self._write_records)
+        
+        if background:
+            self._start_connect()
+        else:
+            self._connect()
+    
+    def _start_connect(self):
+        """Run _connect() on a daemon thread unless one is already running"""
+        with self._connect_lock:
+            if self._connect_thread is not None and self._connect_thread.is_alive():
+                return
+            self._connect_thread = threading.Thread(
+                target=self._connect, name="login-tracker-connect", daemon=True)
+            self._connect_thread.start()
+    
+    def wait_until_connected(self, timeout=None):
+        """Block until the background connection attempt finishes"""
+        thread = self._connect_thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.db is not None
     
     def _connect(self):
         """Establish connection to MongoDB"""
+        client = None
         try:
-            self.client = MongoClient(
-                self.connection_string,
-                serverSelectionTimeoutMS=5000
-            )
-            self.client.server_info()
-            self.db = self.client[self.database_name]
-            self.logins_collection = self.db["user_logins"]
+            client = get_client(self.connection_string)
+            client.server_info()
+            db = client[self.database_name]
+            logins_collection = db["user_logins"]
             
             # Create index on timestamp for faster queries
-            self.logins_collection.create_index("timestamp")
-            self.logins_collection.create_index("username")
+            logins_collection.create_index("timestamp")
+            logins_collection.create_index("username")
+            
+            self.logins_collection = logins_collection
+            # Per-user summary, kept current with $inc/$max on every login
+            self.stats_collection = db["login_stats"]
+            
+            # Seed the summary the first time an existing history is seen.
+            # This runs before self.db is published, so the writer's $inc/$max
+            # upserts cannot interleave with the rebuild.
+            if (self.stats_collection.estimated_document_count() == 0
+                    and self.logins_collection.estimated_document_count() > 0):
+                with self._stats_lock:
+                    self._backfill_login_stats()
+            
+            # Publish only once the collections are ready for use
+            self.client = client
+            self.db = db
+            self.breaker.record_success()
             
             print("[OK] Connected to MongoDB for login tracking")
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             print(f"[WARN] MongoDB connection failed: {e}")
-            print("[INFO] Login tracking will be disabled. Dashboard will still work.")
-            self.client = None
-            self.db = None
+            self._connect_failed(client)
+        except PyMongoError as e:
+            # e.g. authentication or index creation failing on a reachable server
+            print(f"[ERROR] MongoDB login tracking setup failed: {e}")
+            self._connect_failed(client)
+        except Exception as e:
+            # Runs on a background thread; an escaping error would leave the
+            # breaker closed and the failure unlogged
+            print(f"[ERROR] Unexpected error connecting to MongoDB: {e}")
+            self._connect_failed(client)
     
-    def log_login(self, username, role, ip_address=None, user_agent=None):
-        """Log a user login"""
-        if self.db is None :
-            return False
+    def _connect_failed(self, client):
+        """Release a half-set-up client and open the breaker so a retry waits"""
+        print("[INFO] Login tracking is paused and will retry. Dashboard will still work.")
+        if client is not None and self.client is not client:
+            release_client(client)
+        self.breaker.trip()
+    
+    def _available(self):
+        """
+        Check the circuit breaker before touching MongoDB
         
-        try:
-            login_record = {
-                "username": username,
-                "role": role,
-                "timestamp": datetime.now(),
-                "ip_address": ip_address,
-                "user_agent": user_agent,
-                "status": "success"
-            }
-            self.logins_collection.insert_one(login_record)
-            return True
-        except Exception as e:
-            print(f"[ERROR] Failed to log login: {e}")
+        While disconnected, a call let through by the breaker triggers a
+        background reconnect instead of blocking the request.
+        """
+        if not self.breaker.allow():
+            return False
+        if self.db is None:
+            self._start_connect()
             return False
+        return True
+    
+    def log_login(self, username, role, ip_address=None, user_agent=None):
+        """Log a user login"""
+        return self._submit({
+            "username": username,
+            "role": role,
+            "timestamp": datetime.now(),
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "status": "success"
+        })
     
     def log_failed_login(self, username, ip_address=None, user_agent=None):
         """Log a failed login attempt"""
-        if not self.db:
-            return False
+        return self._submit({
+            "username": username,
+            "role": None,
+            "timestamp": datetime.now(),
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "status": "failed"
+        })
+    
+    def _submit(self, login_record):
+        """Hand a login record to the background writer"""
+        return self.writer.submit(login_record)
+    
+    def _write_records(self, records):
+        """Write a batch of login records (called from the writer thread)"""
+        if not self._available():
+            raise ConnectionFailure("MongoDB login tracking is unavailable")
+        with self._stats_lock:
+            try:
+                failed = self._insert_records(records)
+            except Exception:
+                # MongoDB errors are recorded by _insert_records; anything
+                # else must not leave a half-open trial unresolved
+                self.breaker.release()
+                raise
+        if failed:
+            raise PartialWriteError(failed, len(records) - len(failed),
+                                    f"{len(failed)} of {len(records)} login records were rejected")
+    
+    def _insert_records(self, records):
+        """
+        Insert a batch and fold the inserted records into login_stats
         
+        Returns:
+            The records MongoDB rejected (empty when all were stored)
+        """
+        failed = []
         try:
-            login_record = {
-                "username": username,
-                "role": None,
-                "timestamp": datetime.now(),
-                "ip_address": ip_address,
-                "user_agent": user_agent,
-                "status": "failed"
-            }
-            self.logins_collection.insert_one(login_record)
-            return True
+            self.logins_collection.insert_many(records, ordered=False)
+            inserted = records
+        except BulkWriteError as e:
+            # ordered=False inserts every record it can. A duplicate _id is a
+            # record an earlier (replayed) write already stored.
+            errors = e.details.get("writeErrors", [])
+            duplicates = {error["index"] for error in errors if error.get("code") == DUPLICATE_KEY}
+            failed_indexes = {error["index"] for error in errors} - duplicates
+            failed = [records[i] for i in sorted(failed_indexes)]
+            inserted = [record for i, record in enumerate(records)
+                        if i not in failed_indexes and i not in duplicates]
+        except PyMongoError:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        try:
+            self._update_stats(inserted)
         except Exception as e:
-            print(f"[ERROR] Failed to log failed login: {e}")
-            return False
+            # The audit records are stored; a drifted summary is repaired by
+            # backfill_login_stats()
+            print(f"[WARN] Failed to update login stats: {e}")
+        return failed
+    
+    def _update_stats(self, records):
+        """Fold a batch of login records into the login_stats summary"""
+        totals = {}
+        for record in records:
+            username = record.get("username")
+            count, last = totals.get(username, (0, None))
+            timestamp = record.get("timestamp")
+            if last is None or (timestamp is not None and timestamp > last):
+                last = timestamp
+            totals[username] = (count + 1, last)
+        
+        operations = [
+            UpdateOne(
+                {"_id": username},
+                {"$inc": {"total_logins": count}, "$max": {"last_login": last}},
+                upsert=True
+            )
+            for username, (count, last) in totals.items()
+        ]
+        if operations:
+            self.stats_collection.bulk_write(operations, ordered=False)
     
     def get_recent_logins(self, limit=10):
         """Get recent login records"""
-        if not self.db:
+        if not self._available():
             return []
         
         try:
@@ -107,47 +249,118 @@ class LoginTracker:
                 if isinstance(login.get('timestamp'), datetime):
                     login['timestamp'] = login['timestamp'].isoformat()
             
+            self.breaker.record_success()
             return logins
+        except PyMongoError as e:
+            self.breaker.record_failure()
+            print(f"[ERROR] Failed to get logins: {e}")
+            return []
         except Exception as e:
+            self.breaker.release()
             print(f"[ERROR] Failed to get logins: {e}")
             return []
     
     def get_login_stats(self):
-        """Get login statistics"""
-        if not self.db:
+        """Get login statistics from the login_stats summary collection"""
+        if not self._available():
             return {}
         
         try:
-            pipeline = [
-                {
-                    "$group": {
-                        "_id": "$username",
-                        "total_logins": {"$sum": 1},
-                        "last_login": {"$max": "$timestamp"}
-                    }
-                },
-                {"$sort": {"total_logins": -1}}
-            ]
-            
-            stats = list(self.logins_collection.aggregate(pipeline))
-            
-            # Convert to dict format
-            result = {}
-            for stat in stats:
-                result[stat['_id']] = {
-                    "total_logins": stat['total_logins'],
-                    "last_login": stat['last_login'].isoformat() if isinstance(stat['last_login'], datetime) else stat['last_login']
-                }
-            
-            return result
+            stats = self._format_stats(
+                self.stats_collection.find({}).sort("total_logins", -1))
+            self.breaker.record_success()
+            return stats
+        except PyMongoError as e:
+            self.breaker.record_failure()
+            print(f"[ERROR] Failed to get login stats: {e}")
+            return {}
         except Exception as e:
+            self.breaker.release()
             print(f"[ERROR] Failed to get login stats: {e}")
             return {}
     
+    def _aggregate_login_stats(self):
+        """Compute login statistics from the raw user_logins history"""
+        pipeline = [
+            {
+                "$group": {
+                    "_id": "$username",
+                    "total_logins": {"$sum": 1},
+                    "last_login": {"$max": "$timestamp"}
+                }
+            },
+            {"$sort": {"total_logins": -1}}
+        ]
+        return list(self.logins_collection.aggregate(pipeline))
+    
+    @staticmethod
+    def _format_stats(stats):
+        """Convert summary documents to the API dict format"""
+        result = {}
+        for stat in stats:
+            result[stat['_id']] = {
+                "total_logins": stat['total_logins'],
+                "last_login": stat['last_login'].isoformat() if isinstance(stat['last_login'], datetime) else stat['last_login']
+            }
+        return result
+    
+    def backfill_login_stats(self):
+        """Rebuild login_stats from the full user_logins history (one-shot)"""
+        if self.db is None:
+            return 0
+        
+        # The writer waits, so no login is both aggregated and $inc-ed
+        with self._stats_lock:
+            return self._backfill_login_stats()
+    
+    def _backfill_login_stats(self):
+        """Replace login_stats with a fresh aggregation (caller holds _stats_lock)"""
+        stats = self._aggregate_login_stats()
+        operations = [
+            ReplaceOne(
+                {"_id": stat['_id']},
+                {"total_logins": stat['total_logins'], "last_login": stat['last_login']},
+                upsert=True
+            )
+            for stat in stats
+        ]
+        if operations:
+            self.stats_collection.bulk_write(operations, ordered=False)
+        # Drop summaries for users that no longer have any login history
+        self.stats_collection.delete_many(
+            {"_id": {"$nin": [stat['_id'] for stat in stats]}})
+        print(f"[OK] Backfilled login stats for {len(stats)} users")
+        return len(stats)
+    
+    def check_login_stats(self):
+        """
+        Compare login_stats against a fresh aggregation of user_logins
+        
+        Returns:
+            List of {"username", "expected", "actual"} entries that disagree
+        """
+        if self.db is None:
+            return []
+        
+        expected = self._format_stats(self._aggregate_login_stats())
+        actual = self._format_stats(self.stats_collection.find({}))
+        
+        mismatches = []
+        for username in set(expected) | set(actual):
+            if expected.get(username) != actual.get(username):
+                mismatches.append({
+                    "username": username,
+                    "expected": expected.get(username),
+                    "actual": actual.get(username)
+                })
+        return mismatches
+    
     def close(self):
-        """Close MongoDB connection"""
+        """Flush pending login records and close MongoDB connection"""
+        self.writer.close()
         if self.client:
-            self.client.close()
+            release_client(self.client)
+            self.client = None
 
 
 # Singleton instance
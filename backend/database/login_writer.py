@@ -0,0 +1,260 @@
+"""
+Background writer for login audit records
+
+Login events are buffered in a bounded queue and flushed in batches by a
+daemon thread, so a slow MongoDB never adds latency to /api/login.
+Batches that cannot be written are spilled to a local JSON-lines file and
+replayed once writes succeed again. Spilled records keep their _id, so a
+record that did reach MongoDB is not inserted twice on replay; a sink that
+wrote part of a batch raises PartialWriteError and only the rest is spilled.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_SPILL_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "login_spill.jsonl"
+)
+
+try:
+    from bson import ObjectId
+except ImportError:  # bson ships with pymongo
+    ObjectId = None
+
+_STOP = object()
+
+
+class PartialWriteError(Exception):
+    """Raised by a sink that wrote only part of a batch"""
+
+    def __init__(self, failed, written, message="partial write"):
+        """
+        Args:
+            failed: Records that were not written and should be retried
+            written: Number of records that were written
+        """
+        super().__init__(message)
+        self.failed = list(failed)
+        self.written = written
+
+
+def _encode(value):
+    """JSON encoder hook for values that are not natively serializable"""
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if ObjectId is not None and isinstance(value, ObjectId):
+        return {"$oid": str(value)}
+    return str(value)
+
+
+def _decode(obj):
+    """JSON decoder hook that restores datetimes and ObjectIds written by _encode"""
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    if len(obj) == 1 and "$oid" in obj and ObjectId is not None:
+        return ObjectId(obj["$oid"])
+    return obj
+
+
+class LoginAuditWriter:
+    """Buffered, batched writer for login records"""
+
+    def __init__(self, sink, batch_size=100, flush_interval=1.0,
+                 max_queue_size=10000, spill_path=None):
+        """
+        Start the background writer
+
+        Args:
+            sink: Callable taking a list of records and writing them to MongoDB.
+                  It must raise on failure so the batch can be spilled.
+            batch_size: Flush as soon as this many records are buffered
+            flush_interval: Flush at least this often (seconds) when records are pending
+            max_queue_size: Bound on buffered records; overflow goes straight to the spill file
+            spill_path: JSON-lines file used when MongoDB is unavailable
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path or os.getenv(
+            'LOGIN_SPILL_FILE', DEFAULT_SPILL_FILE)
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._spill_lock = threading.Lock()
+        self._closed = False
+        self.written = 0
+        self.spilled = 0
+        self.skipped = 0
+
+        # A replay interrupted by a crash is picked up by the next one
+        self._resume_replay()
+
+        self._thread = threading.Thread(
+            target=self._run, name="login-audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record):
+        """Queue a record for writing; never blocks the caller"""
+        if self._closed:
+            self._spill([record])
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._spill([record])
+        return True
+
+    def _run(self):
+        """Writer loop: collect a batch by size or time, then flush it"""
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if stopping:
+                # Drain whatever was queued before close()
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            if batch:
+                try:
+                    self._flush(batch)
+                except Exception as e:
+                    # Never let one batch stop the writer thread
+                    print(f"[ERROR] Login audit writer error: {e}")
+
+    def _write(self, records):
+        """
+        Write records through the sink
+
+        Returns:
+            The records that were not written (empty on success)
+        """
+        try:
+            self.sink(records)
+        except PartialWriteError as e:
+            self.written += e.written
+            print(f"[WARN] Login audit write was partial, {len(e.failed)} records not written: {e}")
+            return e.failed
+        except Exception as e:
+            print(f"[WARN] Login audit write failed for {len(records)} records: {e}")
+            return records
+        self.written += len(records)
+        return []
+
+    def _flush(self, batch):
+        """Write a batch through the sink, spilling what was not written"""
+        failed = self._write(batch)
+        if failed:
+            self._spill(failed)
+            return
+        self._replay_spill()
+
+    def _spill(self, records):
+        """Append records to the local spill file (with their _id, so a replay is idempotent)"""
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    for record in records:
+                        f.write(json.dumps(record, default=_encode) + "\n")
+                self.spilled += len(records)
+            except (OSError, TypeError, ValueError) as e:
+                print(f"[ERROR] Failed to spill login records: {e}")
+
+    def _resume_replay(self):
+        """Move the lines of a replay file left by a crash back into the spill file"""
+        replay_path = self.spill_path + ".replay"
+        with self._spill_lock:
+            if not os.path.exists(replay_path):
+                return
+            try:
+                with open(replay_path, "rb") as src, open(self.spill_path, "ab") as dst:
+                    data = src.read()
+                    # A line cut short by the crash must not run into the next record
+                    dst.write(data if not data or data.endswith(b"\n") else data + b"\n")
+                os.remove(replay_path)
+                print(f"[INFO] Resuming interrupted login spill replay from {replay_path}")
+            except OSError as e:
+                print(f"[WARN] Could not resume login spill replay from {replay_path}: {e}")
+
+    def _read_replay(self, replay_path):
+        """Decode a replay file, skipping lines that are not valid records"""
+        records = []
+        with open(replay_path, "r", encoding="utf-8", errors="replace") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line, object_hook=_decode)
+                except ValueError as e:
+                    record = e
+                if not isinstance(record, dict):
+                    self.skipped += 1
+                    print(f"[WARN] Skipping unreadable login spill line {number}")
+                    continue
+                records.append(record)
+        return records
+
+    def _replay_spill(self):
+        """Re-send spilled records after a successful flush"""
+        replay_path = self.spill_path + ".replay"
+        with self._spill_lock:
+            if not os.path.exists(self.spill_path) or os.path.exists(replay_path):
+                return
+            try:
+                os.replace(self.spill_path, replay_path)
+            except OSError:
+                return
+
+        try:
+            records = self._read_replay(replay_path)
+        except OSError as e:
+            # Left in place; the next writer start resumes it
+            print(f"[WARN] Could not read login spill replay {replay_path}: {e}")
+            return
+
+        for start in range(0, len(records), self.batch_size):
+            chunk = records[start:start + self.batch_size]
+            failed = self._write(chunk)
+            if failed:
+                self._spill(failed + records[start + len(chunk):])
+                break
+        try:
+            os.remove(replay_path)
+        except OSError as e:
+            print(f"[WARN] Could not remove {replay_path}: {e}")
+        print(f"[INFO] Replayed spilled login records from {self.spill_path}")
+
+    def pending(self):
+        """Number of records waiting in the queue"""
+        return self._queue.qsize()
+
+    def close(self, timeout=10.0):
+        """Flush remaining records and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
@@ -0,0 +1,232 @@
+"""
+Process-wide MongoClient factory
+
+LoginTracker and MongoDBConnection share one pooled MongoClient per
+connection string instead of each opening their own. Pool sizing,
+compression and timeouts are read from the environment:
+
+    MONGODB_MAX_POOL_SIZE             (default 50)
+    MONGODB_MIN_POOL_SIZE             (default 0)
+    MONGODB_MAX_IDLE_TIME_MS          (default 300000)
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS     (default 10000)
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS (default 5000)
+    MONGODB_CONNECT_TIMEOUT_MS        (default 5000)
+    MONGODB_SOCKET_TIMEOUT_MS         (default unset)
+    MONGODB_COMPRESSORS               (e.g. "zstd,snappy,zlib"; default unset)
+"""
+import atexit
+import os
+import re
+import threading
+import time
+
+from pymongo import MongoClient
+from pymongo import monitoring
+
+_INT_OPTIONS = {
+    "maxPoolSize": ("MONGODB_MAX_POOL_SIZE", 50),
+    "minPoolSize": ("MONGODB_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS": ("MONGODB_MAX_IDLE_TIME_MS", 300000),
+    "waitQueueTimeoutMS": ("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 10000),
+    "serverSelectionTimeoutMS": ("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000),
+    "connectTimeoutMS": ("MONGODB_CONNECT_TIMEOUT_MS", 5000),
+    "socketTimeoutMS": ("MONGODB_SOCKET_TIMEOUT_MS", None),
+}
+
+
+def client_options(**overrides):
+    """Build MongoClient keyword arguments from the environment"""
+    options = {}
+    for name, (env_var, default) in _INT_OPTIONS.items():
+        value = os.getenv(env_var)
+        if value is not None and value != "":
+            options[name] = int(value)
+        elif default is not None:
+            options[name] = default
+
+    compressors = os.getenv("MONGODB_COMPRESSORS")
+    if compressors:
+        options["compressors"] = compressors
+
+    options.update(overrides)
+    return options
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool listener tracking utilization and checkout waits"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Zero the counters (open/checked-out connection gauges are kept)"""
+        with self._lock:
+            if not hasattr(self, "open_connections"):
+                self.open_connections = 0
+                self.checked_out = 0
+            self.peak_checked_out = self.checked_out
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    # Checkout happens on the calling thread, so the start time is kept
+    # thread-locally and matched up in connection_checked_out/failed
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def _wait(self):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return 0.0 if started is None else time.perf_counter() - started
+
+    def connection_checked_out(self, event):
+        wait = self._wait()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def connection_check_out_failed(self, event):
+        wait = self._wait()
+        with self._lock:
+            self.checkout_failures += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self, max_pool_size):
+        """Return the current metrics as a dict"""
+        with self._lock:
+            attempts = self.checkouts + self.checkout_failures
+            return {
+                "max_pool_size": max_pool_size,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "utilization": self.checked_out / max_pool_size if max_pool_size else 0.0,
+                "peak_utilization": self.peak_checked_out / max_pool_size if max_pool_size else 0.0,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_checkout_wait_ms": 1000 * self.total_wait / attempts if attempts else 0.0,
+                "max_checkout_wait_ms": 1000 * self.max_wait,
+            }
+
+
+class _SharedClient:
+    def __init__(self, client, metrics, options):
+        self.client = client
+        self.metrics = metrics
+        self.options = options
+        self.refs = 0
+
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def _key(connection_string, overrides):
+    return connection_string, tuple(sorted(overrides.items()))
+
+
+def _label(key):
+    """Printable name for a shared client, with credentials removed"""
+    connection_string, overrides = key
+    label = re.sub(r"//[^@/]*@", "//***@", connection_string)
+    if overrides:
+        label += " " + ", ".join(f"{k}={v}" for k, v in overrides)
+    return label
+
+
+def get_client(connection_string=None, **overrides):
+    """
+    Acquire the shared MongoClient for a connection string
+
+    Every call must be balanced by release_client(); the client is closed
+    when the last holder releases it.
+
+    Args:
+        connection_string: MongoDB URI (default: MONGODB_URI or localhost)
+        **overrides: MongoClient options that take precedence over the environment
+    """
+    if connection_string is None:
+        connection_string = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
+
+    key = _key(connection_string, overrides)
+    with _lock:
+        shared = _clients.get(key)
+        if shared is None:
+            options = client_options(**overrides)
+            metrics = PoolMetrics()
+            client = MongoClient(connection_string, event_listeners=[metrics], **options)
+            shared = _SharedClient(client, metrics, options)
+            _clients[key] = shared
+        shared.refs += 1
+        return shared.client
+
+
+def release_client(client):
+    """Release a client obtained from get_client()"""
+    with _lock:
+        for key, shared in list(_clients.items()):
+            if shared.client is client:
+                shared.refs -= 1
+                if shared.refs <= 0:
+                    del _clients[key]
+                    client.close()
+                return
+
+
+def pool_stats():
+    """Pool utilization and checkout-wait metrics for every shared client"""
+    with _lock:
+        return {
+            _label(key): shared.metrics.snapshot(shared.options.get("maxPoolSize", 100))
+            for key, shared in _clients.items()
+        }
+
+
+def reset_pool_stats():
+    """Zero the checkout counters of every shared client"""
+    with _lock:
+        for shared in _clients.values():
+            shared.metrics.reset()
+
+
+@atexit.register
+def close_all():
+    """Close every shared client (run at interpreter exit)"""
+    with _lock:
+        for shared in _clients.values():
+            shared.client.close()
+        _clients.clear()
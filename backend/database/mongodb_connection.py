@@ -2,11 +2,53 @@
 MongoDB Connection and Database Utilities
 """
 import os
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from datetime import datetime
 import pandas as pd
 
+from .csv_importer import import_csv
+from .mongo_client import get_client, release_client
+from .timeseries_store import TimeSeriesStore, storage_mode_from_env
+from .query_stream import serialize_document, iter_documents, iter_frames
+from .rollups import IncidentRollups
+from .alerts import (ACTIVE_ALERT_PROJECTION, alert_fingerprint, close_alerts,
+                     insert_alerts, upsert_alerts)
+
+# Declared secondary indexes, one (keys, options) pair per index. Each
+# compound index puts the equality filters used by the API first and the
+# time sort last, so a filtered "newest N" query walks the index in order
+# instead of scanning and sorting the collection. _id closes the
+# (timestamp, _id) keyset used by the streaming readers and window queries.
+# scripts/index_advisor.py checks the query methods against this plan.
+INDEX_PLAN = {
+    "incidents": [
+        ([("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("alert_status", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("predicted_root_cause", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+        # Incremental rollup refreshes select new incidents by created_at
+        ([("created_at", ASCENDING)], {}),
+    ],
+    "metrics": [
+        ([("timestamp", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "alerts": [
+        ([("timestamp", ASCENDING)], {}),
+        ([("status", ASCENDING), ("created_at", DESCENDING)], {}),
+        # One active alert per fingerprint; closed alerts are history, and
+        # active alerts stored before fingerprints existed are left out
+        ([("fingerprint", ASCENDING)], {
+            "unique": True,
+            "partialFilterExpression": {"status": "active", "fingerprint": {"$exists": True}},
+            "name": "active_fingerprint_unique"
+        }),
+    ],
+    "users": [
+        ([("username", ASCENDING)], {"unique": True}),
+    ],
+}
+
+
 class MongoDBConnection:
     """MongoDB Connection Manager"""
     
@@ -34,10 +76,8 @@ class MongoDBConnection:
     def _connect(self):
         """Establish connection to MongoDB"""
         try:
-            self.client = MongoClient(
-                self.connection_string,
-                serverSelectionTimeoutMS=5000  # 5 second timeout
-            )
+            # Pooled client shared with the login tracker
+            self.client = get_client(self.connection_string)
             # Test connection
             self.client.server_info()
             self.db = self.client[self.database_name]
@@ -45,12 +85,16 @@ class MongoDBConnection:
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
             print(f"[ERROR] MongoDB connection failed: {e}")
             print("[INFO] Make sure MongoDB is running on your system")
+            if self.client is not None:
+                release_client(self.client)
+                self.client = None
             raise
     
     def close(self):
         """Close MongoDB connection"""
         if self.client:
-            self.client.close()
+            release_client(self.client)
+            self.client = None
             print("[INFO] MongoDB connection closed")
     
     def get_collection(self, collection_name):
@@ -69,21 +113,29 @@ class MongoDBConnection:
 class AIOpsDatabase:
     """AIOps Database Operations"""
     
-    def __init__(self, connection_string=None):
+    def __init__(self, connection_string=None, storage_mode=None):
+        """
+        Args:
+            connection_string: MongoDB connection string
+            storage_mode: Layout for metrics/incidents: "standard", "timeseries"
+                          or "bucketed" (default: AIOPS_STORAGE_MODE or "standard")
+        """
         self.mongo = MongoDBConnection(connection_string)
+        self.storage_mode = storage_mode or storage_mode_from_env()
         self.users_collection = self.mongo.get_collection("users")
-        self.incidents_collection = self.mongo.get_collection("incidents")
-        self.metrics_collection = self.mongo.get_collection("metrics")
+        # Reads and writes of time-ordered data go through the stores, which
+        # hide the storage layout; the raw collections stay available
+        self.incidents_store = TimeSeriesStore(self.mongo.db, "incidents", self.storage_mode)
+        self.metrics_store = TimeSeriesStore(self.mongo.db, "metrics", self.storage_mode)
+        self.incidents_collection = self.incidents_store.collection
+        self.metrics_collection = self.metrics_store.collection
         self.alerts_collection = self.mongo.get_collection("alerts")
+        self.rollups = IncidentRollups(self.mongo.db, self.incidents_store)
         self._initialize_collections()
     
     def _initialize_collections(self):
         """Initialize collections with default data if empty"""
-        # Create indexes
-        self.incidents_collection.create_index("timestamp")
-        self.metrics_collection.create_index("timestamp")
-        self.alerts_collection.create_index("timestamp")
-        self.users_collection.create_index("username", unique=True)
+        self.ensure_indexes()
         
         # Insert default users if collection is empty
         if self.users_collection.count_documents({}) == 0:
@@ -108,6 +160,21 @@ class AIOpsDatabase:
             self.users_collection.insert_many(default_users)
             print("[OK] Default users created")
     
+    def ensure_indexes(self):
+        """Create the indexes declared in INDEX_PLAN (idempotent)"""
+        # Incidents/metrics go through their stores, which skip per-sample
+        # indexes in bucketed mode
+        targets = {
+            "incidents": self.incidents_store,
+            "metrics": self.metrics_store,
+            "alerts": self.alerts_collection,
+            "users": self.users_collection,
+        }
+        for name, indexes in INDEX_PLAN.items():
+            for keys, options in indexes:
+                targets[name].create_index(keys, **options)
+        self.rollups.ensure_indexes()
+    
     # User Operations
     def authenticate_user(self, username, password):
         """Authenticate user"""
@@ -159,38 +226,39 @@ class AIOpsDatabase:
     def insert_incident(self, incident_data):
         """Insert incident data"""
         incident_data['created_at'] = datetime.now()
-        result = self.incidents_collection.insert_one(incident_data)
-        return str(result.inserted_id)
+        return str(self.incidents_store.insert_one(incident_data))
     
     def insert_incidents_bulk(self, incidents_list):
         """Insert multiple incidents"""
         for incident in incidents_list:
             incident['created_at'] = datetime.now()
-        result = self.incidents_collection.insert_many(incidents_list)
-        return len(result.inserted_ids)
+        return self.incidents_store.insert_many(incidents_list, ordered=True)
     
-    def get_incidents(self, filters=None, limit=1000, sort_by="timestamp", sort_order=-1):
+    def get_incidents(self, filters=None, limit=1000, sort_by="timestamp", sort_order=-1, projection=None):
         """Get incidents with filters"""
         if filters is None:
             filters = {}
         
-        cursor = self.incidents_collection.find(filters).sort(sort_by, sort_order).limit(limit)
-        incidents = list(cursor)
-        
-        # Convert ObjectId to string
-        for incident in incidents:
-            incident['_id'] = str(incident['_id'])
-            if 'created_at' in incident:
-                incident['created_at'] = incident['created_at'].isoformat()
-            if 'timestamp' in incident:
-                if isinstance(incident['timestamp'], datetime):
-                    incident['timestamp'] = incident['timestamp'].isoformat()
+        cursor = self.incidents_store.find(
+            filters, projection, batch_size=min(limit, 1000)
+        ).sort(sort_by, sort_order).limit(limit)
         
-        return incidents
+        # Convert ObjectId to string and datetimes to ISO
+        return [serialize_document(incident) for incident in cursor]
+    
+    def iter_incidents(self, filters=None, projection=None, batch_size=1000, sort_order=-1):
+        """Stream incidents ordered by (timestamp, _id) with keyset pagination"""
+        return iter_documents(self.incidents_store, filters, projection,
+                              batch_size, sort_order)
+    
+    def iter_incident_frames(self, columns, filters=None, batch_size=10000, sort_order=-1, dtype=None):
+        """Stream incidents as one DataFrame per page (see query_stream.iter_frames)"""
+        return iter_frames(self.incidents_store, columns, filters,
+                           batch_size, sort_order, dtype)
     
     def get_latest_incident(self):
         """Get latest incident"""
-        incident = self.incidents_collection.find_one(
+        incident = self.incidents_store.find_one(
             {},
             sort=[("timestamp", -1)]
         )
@@ -200,11 +268,24 @@ class AIOpsDatabase:
                 incident['timestamp'] = incident['timestamp'].isoformat()
         return incident
     
-    def get_incident_stats(self, filters=None):
-        """Get incident statistics"""
+    def get_incident_stats(self, filters=None, use_rollups=True):
+        """
+        Get incident statistics
+        
+        Answered from the incident rollups when the filters allow it
+        (alert_status, predicted_root_cause and minute-aligned timestamp
+        bounds); rollups trail new incidents by up to a refresh interval.
+        The refresh runs on a background thread, started by the first read.
+        """
         if filters is None:
             filters = {}
         
+        if use_rollups:
+            self.rollups.start()
+            stats = self.rollups.stats(filters)
+            if stats is not None:
+                return stats
+        
         pipeline = [
             {"$match": filters},
             {"$group": {
@@ -220,14 +301,20 @@ class AIOpsDatabase:
             }}
         ]
         
-        result = list(self.incidents_collection.aggregate(pipeline))
+        result = list(self.incidents_store.aggregate(pipeline))
         return result[0] if result else {}
     
-    def get_root_cause_distribution(self, filters=None):
-        """Get root cause distribution"""
+    def get_root_cause_distribution(self, filters=None, use_rollups=True):
+        """Get root cause distribution (from the rollups when possible)"""
         if filters is None:
             filters = {}
         
+        if use_rollups:
+            self.rollups.start()
+            distribution = self.rollups.root_cause_distribution(filters)
+            if distribution is not None:
+                return distribution
+        
         pipeline = [
             {"$match": filters},
             {"$group": {
@@ -237,72 +324,102 @@ class AIOpsDatabase:
             {"$sort": {"count": -1}}
         ]
         
-        result = list(self.incidents_collection.aggregate(pipeline))
+        result = list(self.incidents_store.aggregate(pipeline))
         return {item['_id']: item['count'] for item in result}
     
     # Metrics Operations
     def insert_metrics(self, metrics_data):
         """Insert metrics data"""
         metrics_data['created_at'] = datetime.now()
-        result = self.metrics_collection.insert_one(metrics_data)
-        return str(result.inserted_id)
+        return str(self.metrics_store.insert_one(metrics_data))
     
-    def get_metrics(self, filters=None, limit=1000):
+    def get_metrics(self, filters=None, limit=1000, projection=None):
         """Get metrics"""
         if filters is None:
             filters = {}
         
-        cursor = self.metrics_collection.find(filters).sort("timestamp", -1).limit(limit)
-        metrics = list(cursor)
+        cursor = self.metrics_store.find(
+            filters, projection, batch_size=min(limit, 1000)
+        ).sort("timestamp", -1).limit(limit)
         
-        for metric in metrics:
+        metrics = []
+        for metric in cursor:
             metric['_id'] = str(metric['_id'])
+            metrics.append(metric)
         
         return metrics
     
+    def iter_metrics(self, filters=None, projection=None, batch_size=1000, sort_order=-1):
+        """Stream metrics ordered by (timestamp, _id) with keyset pagination"""
+        return iter_documents(self.metrics_store, filters, projection,
+                              batch_size, sort_order)
+    
+    def iter_metric_frames(self, columns, filters=None, batch_size=10000, sort_order=-1, dtype=None):
+        """Stream metrics as one DataFrame per page (see query_stream.iter_frames)"""
+        return iter_frames(self.metrics_store, columns, filters,
+                           batch_size, sort_order, dtype)
+    
     # Alert Operations
     def create_alert(self, alert_data):
-        """Create alert"""
-        alert_data['created_at'] = datetime.now()
-        alert_data['status'] = 'active'
-        result = self.alerts_collection.insert_one(alert_data)
-        return str(result.inserted_id)
+        """Create alert (returns the active alert's id if its fingerprint is already open)"""
+        alert_id = self.create_alerts([alert_data])[0]
+        fingerprint = alert_fingerprint(alert_data)
+        if alert_id is None and fingerprint is not None:
+            existing = self.alerts_collection.find_one(
+                {"fingerprint": fingerprint, "status": "active"}, {"_id": 1})
+            alert_id = str(existing["_id"]) if existing else None
+        return alert_id
+    
+    def create_alerts(self, alerts):
+        """Create alerts in one bulk write; duplicates of an active fingerprint get None"""
+        return insert_alerts(self.alerts_collection, alerts)
     
-    def get_active_alerts(self):
-        """Get active alerts"""
-        alerts = list(self.alerts_collection.find({"status": "active"}))
-        for alert in alerts:
+    def upsert_alerts(self, alerts):
+        """Raise alerts by fingerprint, updating the active alert when there is one"""
+        return upsert_alerts(self.alerts_collection, alerts)
+    
+    def get_active_alerts(self, limit=0, projection=None):
+        """Get active alerts, newest first (served by the status/created_at index)"""
+        cursor = self.alerts_collection.find(
+            {"status": "active"},
+            projection or ACTIVE_ALERT_PROJECTION
+        ).sort("created_at", -1).limit(limit)
+        alerts = []
+        for alert in cursor:
             alert['_id'] = str(alert['_id'])
+            alerts.append(alert)
         return alerts
     
     def close_alert(self, alert_id):
         """Close an alert"""
-        result = self.alerts_collection.update_one(
-            {"_id": alert_id},
-            {"$set": {"status": "closed", "closed_at": datetime.now()}}
-        )
-        return result.modified_count > 0
+        return self.close_alerts([alert_id]) > 0
+    
+    def close_alerts(self, alert_ids=None, fingerprints=None):
+        """Close active alerts by id and/or fingerprint; returns the number closed"""
+        return close_alerts(self.alerts_collection, alert_ids, fingerprints)
     
     # Data Import from CSV
-    def import_csv_to_mongodb(self, csv_path):
-        """Import CSV data to MongoDB"""
+    def import_csv_to_mongodb(self, csv_path, chunksize=50000, batch_size=5000,
+                              workers=4, resume=True):
+        """Import CSV data to MongoDB (streamed in chunks, resumable)"""
         try:
-            df = pd.read_csv(csv_path)
-            df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-            
-            # Convert DataFrame to list of dictionaries
-            records = df.to_dict('records')
-            
-            # Insert into incidents collection
-            count = self.insert_incidents_bulk(records)
-            print(f"[OK] Imported {count} records from CSV to MongoDB")
-            return count
+            result = import_csv(
+                self.incidents_store,
+                csv_path,
+                chunksize=chunksize,
+                batch_size=batch_size,
+                workers=workers,
+                resume=resume
+            )
+            print(f"[OK] Imported {result['rows']} records from CSV to MongoDB")
+            return result['rows']
         except Exception as e:
             print(f"[ERROR] Error importing CSV: {e}")
             return 0
     
     def close(self):
         """Close database connection"""
+        self.rollups.stop()
         self.mongo.close()
 
 
@@ -0,0 +1,121 @@
+"""
+Streaming, keyset-paginated reads for time-ordered collections
+
+Results are fetched page by page ordered on (timestamp, _id); each page
+resumes strictly after the last key of the previous one, so memory use
+is bounded by the page size no matter how many documents match, and no
+page re-scans skipped documents the way skip()-based paging would.
+
+Documents without a timestamp are left out: range comparisons never
+match null, so they cannot be ordered against the others (a native
+time-series collection does not accept them at all).
+"""
+from datetime import datetime
+
+import pandas as pd
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+try:
+    import bsonnumpy
+except ImportError:  # optional fast decode path
+    bsonnumpy = None
+
+SORT_KEY = "timestamp"
+
+
+def serialize_document(doc):
+    """Make a document JSON-friendly: string _id, ISO-format datetimes"""
+    if "_id" in doc:
+        doc["_id"] = str(doc["_id"])
+    for key, value in doc.items():
+        if isinstance(value, datetime):
+            doc[key] = value.isoformat()
+    return doc
+
+
+def _with_sort_key(projection):
+    """Make sure an inclusion projection still returns the keyset field"""
+    if projection is None:
+        return None
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    projection = dict(projection)
+    if any(v for k, v in projection.items() if k != "_id"):
+        projection[SORT_KEY] = 1
+    return projection
+
+
+def iter_pages(collection, filters=None, projection=None, batch_size=1000, sort_order=-1):
+    """
+    Yield lists of raw documents ordered by (timestamp, _id)
+
+    Args:
+        collection: pymongo collection (may carry RawBSONDocument codec options)
+        filters: Query filter
+        projection: Fields to return (list or projection dict)
+        batch_size: Documents per page / server round trip
+        sort_order: -1 for newest first, 1 for oldest first
+    """
+    filters = dict(filters or {})
+    projection = _with_sort_key(projection)
+    direction = "$lt" if sort_order < 0 else "$gt"
+    inclusive = "$lte" if sort_order < 0 else "$gte"
+    sort = [(SORT_KEY, sort_order), ("_id", sort_order)]
+    timed = {SORT_KEY: {"$ne": None}}
+    base = [filters, timed] if filters else [timed]
+
+    last = None
+    while True:
+        clauses = list(base)
+        if last is not None:
+            last_ts, last_id = last
+            # The plain range repeats what the $or says, in a form bucketed
+            # storage can apply to bucket bounds before unwinding samples
+            clauses.append({SORT_KEY: {inclusive: last_ts}})
+            clauses.append({"$or": [
+                {SORT_KEY: {direction: last_ts}},
+                {SORT_KEY: last_ts, "_id": {direction: last_id}}
+            ]})
+        query = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+        page = list(collection.find(query, projection, batch_size=batch_size)
+                    .sort(sort).limit(batch_size))
+        if not page:
+            return
+        # Read the key before handing the page out; callers may mutate it
+        tail = page[-1]
+        last = (tail.get(SORT_KEY), tail["_id"])
+        yield page
+        if len(page) < batch_size:
+            return
+
+
+def iter_documents(collection, filters=None, projection=None, batch_size=1000, sort_order=-1):
+    """Yield JSON-friendly documents one at a time"""
+    for page in iter_pages(collection, filters, projection, batch_size, sort_order):
+        for doc in page:
+            yield serialize_document(doc)
+
+
+def iter_frames(collection, columns, filters=None, batch_size=10000, sort_order=-1, dtype=None):
+    """
+    Yield one DataFrame per page with the given columns
+
+    When bsonnumpy is installed and a NumPy dtype is given, pages are read
+    as raw BSON and decoded straight into a structured array, skipping
+    per-document dict construction.
+    """
+    # Raw decoding needs one document per sample, so it is skipped for
+    # bucketed storage
+    if dtype is not None and bsonnumpy is not None and getattr(collection, "mode", None) != "bucketed":
+        raw_collection = collection.with_options(
+            codec_options=CodecOptions(document_class=RawBSONDocument))
+        for page in iter_pages(raw_collection, filters, columns, batch_size, sort_order):
+            array = bsonnumpy.sequence_to_ndarray(
+                (doc.raw for doc in page), dtype, len(page))
+            yield pd.DataFrame(array)
+        return
+
+    for page in iter_pages(collection, filters, columns, batch_size, sort_order):
+        yield pd.DataFrame.from_records(page, columns=list(columns))
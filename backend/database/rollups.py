@@ -0,0 +1,387 @@
+"""
+Pre-aggregated incident rollups
+
+incidents_1m and incidents_1h hold one document per (time bucket,
+alert_status, predicted_root_cause) with incident counts and metric
+sums. A refresh aggregates only the incidents created since the last
+watermark and folds them into both collections with $merge, adding to
+existing buckets, so late incidents still land in the right minute/hour.
+
+Refreshes run on a background thread (start()), never inside a read. A
+refresh that fails part-way leaves the buckets half-merged; the state
+stays pending so readers scan the incidents, and the next refresh
+rebuilds the rollups from scratch.
+
+Statistics then read rollup documents instead of every incident. Queries
+the rollups cannot answer exactly (filters on other fields, time bounds
+that do not fall on a bucket boundary) return None so the caller can
+scan the incidents instead.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+ROLLUP_COLLECTIONS = {"minute": "incidents_1m", "hour": "incidents_1h"}
+STATE_COLLECTION = "rollup_state"
+STATE_ID = "incidents"
+
+# Dimensions kept in each rollup document
+DIMENSIONS = ("alert_status", "predicted_root_cause")
+
+# Rollup field -> incident field averaged by the stats
+METRICS = {
+    "cpu": "cpu_usage",
+    "memory": "memory_usage",
+    "response": "response_time",
+    "failure_prob": "failure_probability",
+}
+NUMERIC_TYPES = ["double", "int", "long", "decimal"]
+
+# Incidents created within the last few seconds are left for the next
+# refresh, so writers still committing older created_at values are not
+# skipped by the watermark
+SETTLE_SECONDS = float(os.getenv("ROLLUP_SETTLE_SECONDS", "5"))
+REFRESH_SECONDS = float(os.getenv("ROLLUP_REFRESH_SECONDS", "30"))
+# A pending claim older than this belongs to a refresher that died
+# mid-merge (another process); it is rebuilt like a failed one
+PENDING_SECONDS = float(os.getenv("ROLLUP_PENDING_SECONDS", "600"))
+
+
+def _is_number(field):
+    return {"$in": [{"$type": f"${field}"}, NUMERIC_TYPES]}
+
+
+def _counter_fields():
+    """Accumulators shared by both rollups; all of them are additive"""
+    fields = {
+        "count": {"$sum": 1},
+        "alerts": {"$sum": {"$cond": [{"$eq": ["$alert_status", "ALERT"]}, 1, 0]}},
+        "ok": {"$sum": {"$cond": [{"$eq": ["$alert_status", "OK"]}, 1, 0]}},
+        "anomalies": {"$sum": {"$cond": [{"$eq": ["$anomaly_label", 1]}, 1, 0]}},
+    }
+    for name, field in METRICS.items():
+        # $avg ignores missing and non-numeric values, so count only numbers
+        fields[f"sum_{name}"] = {"$sum": {"$cond": [_is_number(field), f"${field}", 0]}}
+        fields[f"n_{name}"] = {"$sum": {"$cond": [_is_number(field), 1, 0]}}
+    return fields
+
+
+COUNTERS = tuple(_counter_fields())
+
+
+def _bucket_expr(unit):
+    """Start of the minute/hour containing the incident timestamp (null if none)"""
+    parts = {
+        "year": {"$year": "$timestamp"},
+        "month": {"$month": "$timestamp"},
+        "day": {"$dayOfMonth": "$timestamp"},
+        "hour": {"$hour": "$timestamp"},
+    }
+    if unit == "minute":
+        parts["minute"] = {"$minute": "$timestamp"}
+    return {"$cond": [
+        {"$eq": [{"$type": "$timestamp"}, "date"]},
+        {"$dateFromParts": parts},
+        None
+    ]}
+
+
+def _now():
+    """Local time at BSON (millisecond) precision, so it compares equal once stored"""
+    now = datetime.now()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def _naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _aligned(value, unit):
+    if value.second or value.microsecond:
+        return False
+    return unit == "minute" or value.minute == 0
+
+
+class IncidentRollups:
+    """Maintains and queries the per-minute and per-hour incident rollups"""
+
+    def __init__(self, db, incidents_store, settle_seconds=SETTLE_SECONDS,
+                 refresh_seconds=REFRESH_SECONDS, pending_seconds=PENDING_SECONDS):
+        """
+        Args:
+            db: pymongo Database
+            incidents_store: TimeSeriesStore holding the incidents
+            settle_seconds: Age an incident must reach before it is rolled up
+            refresh_seconds: Time between background refreshes (0: no thread)
+            pending_seconds: Age after which another refresher's claim is abandoned
+        """
+        self.db = db
+        self.incidents_store = incidents_store
+        self.settle_seconds = settle_seconds
+        self.refresh_seconds = refresh_seconds
+        self.pending_seconds = pending_seconds
+        self.collections = {unit: db[name] for unit, name in ROLLUP_COLLECTIONS.items()}
+        self.state = db[STATE_COLLECTION]
+        self._lock = threading.Lock()
+        self._last_refresh = None
+        # claimed_at of this process's last failed merge; rebuilt without waiting
+        self._failed_claim = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def ensure_indexes(self):
+        for collection in self.collections.values():
+            collection.create_index([("ts", ASCENDING)])
+            collection.create_index([("alert_status", ASCENDING), ("ts", ASCENDING)])
+
+    # Maintenance
+    def _pipeline(self, unit, match, target):
+        group_id = {"ts": _bucket_expr(unit)}
+        group_id.update({dim: f"${dim}" for dim in DIMENSIONS})
+        flatten = {"ts": "$_id.ts", "updated_at": "$$NOW"}
+        flatten.update({dim: f"$_id.{dim}" for dim in DIMENSIONS})
+        add_new = {field: {"$add": [f"${field}", f"$$new.{field}"]} for field in COUNTERS}
+        add_new["updated_at"] = "$$new.updated_at"
+        return [
+            {"$match": match},
+            {"$group": dict(_id=group_id, **_counter_fields())},
+            {"$set": flatten},
+            {"$merge": {
+                "into": target,
+                "on": "_id",
+                "whenMatched": [{"$set": add_new}],
+                "whenNotMatched": "insert"
+            }}
+        ]
+
+    def _claim(self, watermark, upper):
+        """
+        Move the watermark forward unless another refresher already did
+
+        Returns:
+            The claim's claimed_at, or None if the claim was lost
+        """
+        claimed_at = _now()
+        update = {"$set": {"watermark": upper, "pending": True, "claimed_at": claimed_at}}
+        try:
+            result = self.state.update_one(
+                {"_id": STATE_ID, "watermark": watermark}, update, upsert=watermark is None)
+        except DuplicateKeyError:
+            return None
+        if result.matched_count > 0 or result.upserted_id is not None:
+            return claimed_at
+        return None
+
+    def _abandoned(self, state):
+        """True if a pending claim failed here or its refresher is long gone"""
+        claimed_at = state.get("claimed_at")
+        if claimed_at is None or claimed_at == self._failed_claim:
+            return True
+        return datetime.now() - claimed_at > timedelta(seconds=self.pending_seconds)
+
+    def refresh(self, force=False):
+        """
+        Roll up incidents created since the watermark
+
+        Args:
+            force: Ignore the refresh interval
+
+        Returns:
+            True if new incidents were merged into the rollups
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh is not None \
+                    and now - self._last_refresh < self.refresh_seconds:
+                return False
+            self._last_refresh = now
+
+            state = self.state.find_one({"_id": STATE_ID}) or {}
+            if state.get("pending"):
+                # Another refresher is merging, or a merge failed part-way
+                if not self._abandoned(state):
+                    return False
+                print("[WARN] Incident rollups were left half-merged; rebuilding")
+                return self._rebuild(state.get("claimed_at"))
+            return self._merge_new(state.get("watermark"))
+
+    def _merge_new(self, watermark):
+        """Claim the incidents after `watermark` and merge them (caller holds _lock)"""
+        upper = datetime.now() - timedelta(seconds=self.settle_seconds)
+        if watermark is not None and upper <= watermark:
+            return False
+        claimed_at = self._claim(watermark, upper)
+        if claimed_at is None:
+            return False
+
+        if watermark is None:
+            # First run: include incidents written before created_at existed
+            match = {"$or": [{"created_at": {"$lte": upper}},
+                             {"created_at": {"$exists": False}}]}
+        else:
+            match = {"created_at": {"$gt": watermark, "$lte": upper}}
+
+        try:
+            for unit, collection in self.collections.items():
+                list(self.incidents_store.aggregate(self._pipeline(unit, match, collection.name)))
+        except Exception as e:
+            # Buckets may be half-merged; the state stays pending so readers
+            # fall back to the incidents, and the next refresh rebuilds
+            print(f"[ERROR] Incident rollup failed: {e}")
+            self._failed_claim = claimed_at
+            return False
+
+        self.state.update_one({"_id": STATE_ID, "claimed_at": claimed_at},
+                              {"$set": {"pending": False}})
+        return True
+
+    def _rebuild(self, claimed_at=None):
+        """
+        Drop the rollups and recompute them (caller holds _lock)
+
+        Args:
+            claimed_at: The abandoned claim to take over; None rebuilds
+                        regardless of the current state
+        """
+        now = _now()
+        query = {"_id": STATE_ID}
+        if claimed_at is not None:
+            # Another refresher may be recovering the same claim
+            query.update({"pending": True, "claimed_at": claimed_at})
+        try:
+            # Stays pending (readers scan the incidents) until the merge is done
+            result = self.state.update_one(
+                query, {"$set": {"pending": True, "claimed_at": now}}, upsert=claimed_at is None)
+            if result.matched_count == 0 and result.upserted_id is None:
+                return False
+            for collection in self.collections.values():
+                collection.delete_many({})
+            self.state.delete_one({"_id": STATE_ID, "claimed_at": now})
+        except Exception as e:
+            print(f"[ERROR] Incident rollup rebuild failed: {e}")
+            self._failed_claim = now
+            return False
+        return self._merge_new(None)
+
+    def rebuild(self):
+        """Drop the rollups and recompute them from all incidents"""
+        with self._lock:
+            return self._rebuild()
+
+    # Background refresh
+    def start(self):
+        """Refresh every refresh_seconds on a daemon thread (once; cheap to call again)"""
+        if self.refresh_seconds <= 0 or self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="incident-rollups", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh(force=True)
+            except Exception as e:
+                # Never let one refresh stop the thread
+                print(f"[ERROR] Incident rollup refresh failed: {e}")
+            if self._stop.wait(self.refresh_seconds):
+                return
+
+    def stop(self, timeout=10.0):
+        """Stop the background refresh thread"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def is_ready(self):
+        """True once a refresh has completed and none is half-done"""
+        state = self.state.find_one({"_id": STATE_ID}, {"watermark": 1, "pending": 1})
+        return bool(state) and state.get("watermark") is not None and not state.get("pending")
+
+    # Queries
+    def _plan(self, filters):
+        """Pick a rollup and translate filters for it, or None if not exact"""
+        filters = filters or {}
+        match = {}
+        for key, value in filters.items():
+            if key in DIMENSIONS:
+                if isinstance(value, dict) and not set(value) <= {"$eq", "$in"}:
+                    return None
+                match[key] = value
+            elif key != "timestamp":
+                return None
+
+        condition = filters.get("timestamp")
+        if condition is None:
+            return self.collections["hour"], match
+        if not isinstance(condition, dict) or not set(condition) <= {"$gte", "$lt", "$lte"}:
+            return None
+
+        bounds = {}
+        for op, value in condition.items():
+            if not isinstance(value, datetime):
+                return None
+            value = _naive_utc(value)
+            if op == "$lte":
+                # BSON dates have millisecond precision; "<= x" covers buckets
+                # up to the next millisecond
+                value = value.replace(microsecond=value.microsecond // 1000 * 1000) \
+                    + timedelta(milliseconds=1)
+                op = "$lt"
+            bounds[op] = value
+
+        for unit in ("hour", "minute"):
+            if all(_aligned(value, unit) for value in bounds.values()):
+                match["ts"] = bounds
+                return self.collections[unit], match
+        return None
+
+    def stats(self, filters=None):
+        """Same result as AIOpsDatabase.get_incident_stats, or None"""
+        plan = self._plan(filters)
+        if plan is None or not self.is_ready():
+            return None
+        collection, match = plan
+        sums = {field: {"$sum": f"${field}"} for field in COUNTERS}
+        result = list(collection.aggregate([
+            {"$match": match},
+            {"$group": dict(_id=None, **sums)}
+        ]))
+        if not result or not result[0]["count"]:
+            return {}
+        totals = result[0]
+
+        stats = {
+            "_id": None,
+            "total": totals["count"],
+            "alerts": totals["alerts"],
+            "ok": totals["ok"],
+            "anomalies": totals["anomalies"],
+        }
+        for name in METRICS:
+            n = totals[f"n_{name}"]
+            stats[f"avg_{name}"] = totals[f"sum_{name}"] / n if n else None
+        return stats
+
+    def root_cause_distribution(self, filters=None):
+        """Same result as AIOpsDatabase.get_root_cause_distribution, or None"""
+        plan = self._plan(filters)
+        if plan is None or not self.is_ready():
+            return None
+        collection, match = plan
+        result = collection.aggregate([
+            {"$match": match},
+            {"$group": {"_id": "$predicted_root_cause", "count": {"$sum": "$count"}}},
+            {"$sort": {"count": -1}}
+        ])
+        return {item["_id"]: item["count"] for item in result}
@@ -0,0 +1,355 @@
+"""
+Storage backends for time-ordered collections (metrics, incidents)
+
+Three storage modes are supported, selected with AIOPS_STORAGE_MODE:
+
+    standard   - one document per sample in a plain collection (default)
+    timeseries - a native MongoDB time-series collection (MongoDB 5.0+)
+    bucketed   - N samples per document, for servers without time-series
+                 support; documents look like
+                 {meta, start, end, count, samples: [...]}
+
+TimeSeriesStore exposes insert_many/find/find_one/aggregate/count_documents
+with pymongo-compatible signatures so callers do not care which layout is
+underneath. Samples keep all of their fields; the series metadata is also
+copied into a `meta` sub-document that the time-series and bucketed
+layouts key on.
+"""
+import os
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+STANDARD = "standard"
+TIMESERIES = "timeseries"
+BUCKETED = "bucketed"
+STORAGE_MODES = (STANDARD, TIMESERIES, BUCKETED)
+
+TIME_FIELD = "timestamp"
+META_FIELD = "meta"
+DEFAULT_META_FIELDS = ("series",)
+DEFAULT_SERIES = "default"
+DEFAULT_BUCKET_SIZE = 200
+
+
+def storage_mode_from_env():
+    """Read AIOPS_STORAGE_MODE, falling back to the standard layout"""
+    mode = os.getenv("AIOPS_STORAGE_MODE", STANDARD).lower()
+    if mode not in STORAGE_MODES:
+        print(f"[WARN] Unknown AIOPS_STORAGE_MODE '{mode}', using '{STANDARD}'")
+        return STANDARD
+    return mode
+
+
+def _bucket_bounds(filters):
+    """Translate timestamp ranges (top level or in $and) into bucket start/end bounds"""
+    filters = filters or {}
+    clauses = [_bucket_bounds(clause) for clause in filters.get("$and", [])]
+    condition = filters.get(TIME_FIELD)
+    if isinstance(condition, dict):
+        bounds = {}
+        low = condition.get("$gte", condition.get("$gt"))
+        high = condition.get("$lte", condition.get("$lt"))
+        if low is not None:
+            bounds["end"] = {"$gte": low}
+        if high is not None:
+            bounds["start"] = {"$lte": high}
+        clauses.insert(0, bounds)
+    clauses = [clause for clause in clauses if clause]
+    if len(clauses) > 1:
+        return {"$and": clauses}
+    return clauses[0] if clauses else {}
+
+
+class _BucketCursor:
+    """Minimal cursor over unwound bucket samples (find().sort().limit())"""
+
+    def __init__(self, store, filters=None, projection=None, **kwargs):
+        self._store = store
+        self._filters = filters or {}
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+        self._batch_size = kwargs.get("batch_size")
+
+    def sort(self, key_or_list, direction=None):
+        if isinstance(key_or_list, str):
+            key_or_list = [(key_or_list, direction if direction is not None else ASCENDING)]
+        self._sort = list(key_or_list)
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    def __iter__(self):
+        if self._limit and self._sort and self._sort[0][0] == TIME_FIELD:
+            return iter(self._windowed())
+        return iter(self._run(self._filters))
+
+    def _windowed(self):
+        """
+        Unwind only the buckets that can hold the first `limit` samples
+
+        Buckets are read in time order by their bounds alone (no samples);
+        the first few span a time window. If the window yields `limit`
+        samples they are the first ones overall; otherwise the window grows
+        until it takes in every matching bucket.
+        """
+        order = self._sort[0][1]
+        bounds = _bucket_bounds(self._filters)
+        dated = {"start": {"$ne": None}}
+        edge_query = {"$and": [bounds, dated]} if bounds else dated
+        edge_field = "end" if order < 0 else "start"
+        take = max(1, -(-self._limit // self._store.bucket_size))
+        while True:
+            edges = list(self._store.collection.find(edge_query, {"start": 1, "end": 1})
+                         .sort(edge_field, order).limit(take))
+            if len(edges) < take:
+                # Every bucket is in the window anyway
+                return self._run(self._filters)
+            if order < 0:
+                window = {TIME_FIELD: {"$gte": min(edge["start"] for edge in edges)}}
+            else:
+                window = {TIME_FIELD: {"$lte": max(edge["end"] for edge in edges)}}
+            filters = {"$and": [self._filters, window]} if self._filters else window
+            samples = list(self._run(filters))
+            if len(samples) >= self._limit:
+                return samples
+            take *= 2
+
+    def _run(self, filters):
+        pipeline = [{"$match": filters}] if filters else []
+        if self._sort:
+            pipeline.append({"$sort": dict(self._sort)})
+        if self._limit:
+            pipeline.append({"$limit": self._limit})
+        if self._projection:
+            projection = self._projection
+            if isinstance(projection, (list, tuple)):
+                projection = {field: 1 for field in projection}
+            pipeline.append({"$project": projection})
+        kwargs = {"batchSize": self._batch_size} if self._batch_size else {}
+        return self._store.aggregate(pipeline, _bounds=_bucket_bounds(filters), **kwargs)
+
+
+class TimeSeriesStore:
+    """A time-ordered collection stored in one of the STORAGE_MODES"""
+
+    def __init__(self, db, name, mode=STANDARD, meta_fields=DEFAULT_META_FIELDS,
+                 bucket_size=DEFAULT_BUCKET_SIZE, granularity="minutes"):
+        """
+        Args:
+            db: pymongo Database
+            name: Collection name
+            mode: One of STORAGE_MODES
+            meta_fields: Sample fields identifying a series
+            bucket_size: Samples per document in bucketed mode
+            granularity: Time-series collection granularity
+        """
+        self.db = db
+        self.name = name
+        self.meta_fields = tuple(meta_fields)
+        self.bucket_size = bucket_size
+        self.mode = mode
+        if mode == TIMESERIES:
+            self.mode = self._ensure_timeseries(granularity)
+        self.collection = db[name]
+        self._ensure_indexes()
+
+    def _ensure_timeseries(self, granularity):
+        """Create the time-series collection, falling back to buckets if unsupported"""
+        try:
+            existing = self.db.list_collection_names(filter={"name": self.name})
+            if existing:
+                info = next(iter(self.db.list_collections(filter={"name": self.name})), {})
+                if info.get("type") != "timeseries":
+                    print(f"[WARN] '{self.name}' exists as a regular collection; "
+                          "keeping the standard layout for it")
+                    return STANDARD
+                return TIMESERIES
+            self.db.create_collection(
+                self.name,
+                timeseries={
+                    "timeField": TIME_FIELD,
+                    "metaField": META_FIELD,
+                    "granularity": granularity
+                }
+            )
+            print(f"[OK] Created time-series collection: {self.name}")
+            return TIMESERIES
+        except (OperationFailure, CollectionInvalid) as e:
+            print(f"[WARN] Time-series collections unavailable ({e}); "
+                  f"using bucketed documents for '{self.name}'")
+            return BUCKETED
+
+    def _ensure_indexes(self):
+        if self.mode == BUCKETED:
+            self.collection.create_index([(META_FIELD, ASCENDING), ("start", ASCENDING)])
+            self.collection.create_index([("end", ASCENDING)])
+            # Oldest-first reads walk buckets by start across all series
+            self.collection.create_index([("start", ASCENDING)])
+            self.collection.create_index([(META_FIELD, ASCENDING), ("count", ASCENDING)])
+        elif self.mode == TIMESERIES:
+            # Time-series collections are clustered on meta + time internally;
+            # a secondary time index serves range queries across series
+            self.collection.create_index(TIME_FIELD)
+        else:
+            # Matches the (timestamp, _id) keyset order used by readers
+            self.collection.create_index([(TIME_FIELD, DESCENDING), ("_id", DESCENDING)])
+
+    def _meta(self, doc):
+        return {field: doc.get(field, DEFAULT_SERIES) for field in self.meta_fields}
+
+    # Writes
+    def insert_many(self, documents, ordered=False):
+        """Insert samples; returns the number written"""
+        documents = list(documents)
+        if not documents:
+            return 0
+        if self.mode == STANDARD:
+            self.collection.insert_many(documents, ordered=ordered)
+            return len(documents)
+
+        for doc in documents:
+            doc[META_FIELD] = self._meta(doc)
+        if self.mode == TIMESERIES:
+            self.collection.insert_many(documents, ordered=ordered)
+            return len(documents)
+
+        series = {}
+        for doc in documents:
+            doc.setdefault("_id", ObjectId())
+            key = tuple(sorted(doc[META_FIELD].items()))
+            series.setdefault(key, []).append(doc)
+        for samples in series.values():
+            self._append_to_buckets(samples[0][META_FIELD], samples)
+        return len(documents)
+
+    def insert_one(self, document):
+        """Insert a single sample"""
+        self.insert_many([document])
+        return document.get("_id")
+
+    def _append_to_buckets(self, meta, samples):
+        """Top up the open bucket for a series, then write full new buckets"""
+        position = 0
+        open_bucket = self.collection.find_one(
+            {META_FIELD: meta, "count": {"$lt": self.bucket_size}},
+            {"count": 1},
+            sort=[("start", DESCENDING)]
+        )
+        if open_bucket is not None:
+            room = self.bucket_size - open_bucket["count"]
+            part = samples[:room]
+            result = self.collection.update_one(
+                # Guard against a concurrent writer having filled it meanwhile
+                {"_id": open_bucket["_id"], "count": {"$lte": self.bucket_size - len(part)}},
+                self._push(part)
+            )
+            if result.modified_count:
+                position = len(part)
+
+        new_buckets = []
+        for start in range(position, len(samples), self.bucket_size):
+            part = samples[start:start + self.bucket_size]
+            times = [s[TIME_FIELD] for s in part if s.get(TIME_FIELD) is not None]
+            new_buckets.append({
+                META_FIELD: meta,
+                "start": min(times) if times else None,
+                "end": max(times) if times else None,
+                "count": len(part),
+                "samples": part
+            })
+        if new_buckets:
+            self.collection.insert_many(new_buckets, ordered=False)
+
+    @staticmethod
+    def _push(samples):
+        times = [s[TIME_FIELD] for s in samples if s.get(TIME_FIELD) is not None]
+        update = {
+            "$push": {"samples": {"$each": samples}},
+            "$inc": {"count": len(samples)}
+        }
+        if times:
+            update["$min"] = {"start": min(times)}
+            update["$max"] = {"end": max(times)}
+        return update
+
+    # Reads
+    def _unwind(self, bounds=None):
+        """Pipeline prefix turning bucket documents back into samples"""
+        stages = [{"$match": bounds}] if bounds else []
+        stages += [
+            {"$unwind": "$samples"},
+            {"$replaceRoot": {"newRoot": "$samples"}}
+        ]
+        return stages
+
+    def aggregate(self, pipeline, _bounds=None, **kwargs):
+        """Run an aggregation over samples regardless of layout"""
+        if self.mode == BUCKETED:
+            if _bounds is None and pipeline and "$match" in pipeline[0]:
+                _bounds = _bucket_bounds(pipeline[0]["$match"])
+            pipeline = self._unwind(_bounds) + list(pipeline)
+        return self.collection.aggregate(pipeline, **kwargs)
+
+    def find(self, filters=None, projection=None, **kwargs):
+        if self.mode == BUCKETED:
+            return _BucketCursor(self, filters, projection, **kwargs)
+        return self.collection.find(filters or {}, projection, **kwargs)
+
+    def find_one(self, filters=None, projection=None, sort=None):
+        if self.mode == BUCKETED:
+            cursor = self.find(filters, projection)
+            if sort:
+                cursor.sort(sort)
+            return next(iter(cursor.limit(1)), None)
+        return self.collection.find_one(filters or {}, projection, sort=sort)
+
+    def count_documents(self, filters=None):
+        if self.mode == BUCKETED:
+            if not filters:
+                result = list(self.collection.aggregate(
+                    [{"$group": {"_id": None, "n": {"$sum": "$count"}}}]))
+                return result[0]["n"] if result else 0
+            result = list(self.aggregate([{"$match": filters}, {"$count": "n"}]))
+            return result[0]["n"] if result else 0
+        return self.collection.count_documents(filters or {})
+
+    def find_range(self, start=None, end=None, filters=None, projection=None, sort_order=ASCENDING):
+        """Samples with start <= timestamp <= end, ordered by time"""
+        query = dict(filters or {})
+        window = {}
+        if start is not None:
+            window["$gte"] = start
+        if end is not None:
+            window["$lte"] = end
+        if window:
+            query[TIME_FIELD] = window
+        return self.find(query, projection).sort(TIME_FIELD, sort_order)
+
+    def with_options(self, **kwargs):
+        """Collection with different codec/read options (not for bucketed mode)"""
+        if self.mode == BUCKETED:
+            raise NotImplementedError("raw collection options are not available for bucketed storage")
+        return self.collection.with_options(**kwargs)
+
+    def create_index(self, keys, **kwargs):
+        """Create an index on sample fields (bucketed mode indexes bucket bounds only)"""
+        if self.mode == BUCKETED:
+            return None
+        return self.collection.create_index(keys, **kwargs)
+
+    def storage_stats(self):
+        """Document count, storage and index size as reported by collStats"""
+        stats = self.db.command("collStats", self.name)
+        return {
+            "mode": self.mode,
+            "samples": self.count_documents(),
+            "documents": stats.get("count"),
+            "size": stats.get("size"),
+            "storage_size": stats.get("storageSize"),
+            "index_size": stats.get("totalIndexSize"),
+        }
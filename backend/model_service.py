@@ -0,0 +1,127 @@
+"""
+Active model set for the backend, with hot swap
+
+The registry's active version is loaded lazily on first use. Swapping to
+another version loads it completely first and then replaces a single
+reference, so a request that already picked up the old set finishes with
+it while new requests get the new one; nothing is dropped or half-loaded.
+"""
+import os
+import threading
+
+import pandas as pd
+
+from decision_engine.pipeline import DecisionPipeline
+from models.registry import ModelRegistry
+
+POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "30"))
+
+# MODEL_COMPILED=1 scores with the compiled forests (models/compiled_forest.py),
+# which is faster on small request batches but copies every forest into
+# private per-process arrays. Off by default: estimators are served as the
+# registry's joblib mmap loaded them, so their arrays stay shared between
+# the workers serving a version (sklearn copies tree node tables on load
+# either way).
+COMPILED_MODELS = os.getenv("MODEL_COMPILED", "0") == "1"
+
+
+class ModelService:
+    """Holds the active model version's DecisionPipeline and swaps it atomically"""
+
+    def __init__(self, registry=None, poll_seconds=POLL_SECONDS):
+        """
+        Args:
+            registry: ModelRegistry (default: models/registry)
+            poll_seconds: How often to follow the registry's ACTIVE pointer (0: never)
+        """
+        self.registry = registry or ModelRegistry()
+        self._models = None
+        self._lock = threading.Lock()
+        # One swap at a time, so a slow refresh cannot publish over a newer activate
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        if poll_seconds > 0:
+            thread = threading.Thread(target=self._poll, args=(poll_seconds,), daemon=True)
+            thread.start()
+
+    def _build(self, version=None):
+        return DecisionPipeline(self.registry.load(version), compiled=COMPILED_MODELS)
+
+    def current(self):
+        """The active DecisionPipeline (loaded on first call)"""
+        models = self._models
+        if models is None:
+            with self._lock:
+                if self._models is None:
+                    self._models = self._build()
+                    print(f"[OK] Loaded model version {self._models.version}")
+                models = self._models
+        return models
+
+    def activate(self, version):
+        """
+        Load `version`, make it active in the registry and swap to it
+
+        The registry's ACTIVE pointer only moves once the version has loaded,
+        so a version that fails to load never becomes active for the other
+        processes following the pointer.
+        """
+        with self._swap_lock:
+            models = self._build(version)
+            if models.version != version:
+                raise ValueError(f"registry loaded version {models.version}, not {version}")
+            self.registry.activate(version)
+            return self._publish(models)
+
+    def refresh(self):
+        """Swap to the registry's active version if it changed"""
+        with self._swap_lock:
+            version = self.registry.active_version()
+            loaded = self._models
+            if version is None or (loaded is not None and loaded.version == version):
+                return False
+            # Requests keep using the current set while the new one loads
+            models = self._build(version)
+            # ACTIVE may have moved on (another process) while this one loaded
+            if self.registry.active_version() != version:
+                return False
+            self._publish(models)
+            return True
+
+    def _publish(self, models):
+        with self._lock:
+            previous = self._models
+            self._models = models
+        print(f"[OK] Model version {previous.version if previous else None} -> {models.version}")
+        return models
+
+    def _poll(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[WARN] Model registry refresh failed: {e}")
+
+    def score(self, rows):
+        """
+        Score feature rows with one consistent model set
+
+        Args:
+            rows: List of dicts holding the engineered features
+
+        Returns:
+            (model version, list of result dicts)
+        """
+        pipeline = self.current()
+        frame = pd.DataFrame(rows)
+        scored = pd.DataFrame(pipeline.score(frame))
+        results = scored.astype(object).to_dict("records")
+        return pipeline.version, results
+
+    def info(self):
+        models = self._models
+        return {
+            "loaded_version": models.version if models else None,
+            "active_version": self.registry.active_version(),
+            "versions": self.registry.versions(),
+        }
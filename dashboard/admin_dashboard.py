@@ -13,6 +13,10 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dashboard.utils.config_manager import load_config, save_config
+from decision_engine.stage_store import PARQUET, read_recent, read_stage, stage_exists, stage_format, stage_size_bytes
+
+# Day partitions of a Parquet dataset loaded at startup (date ranges read their own days)
+DASHBOARD_DAYS = int(os.getenv("AIOPS_DASHBOARD_DAYS", "7"))
 
 # -----------------------------
 # MAIN APP FUNCTION
@@ -75,13 +79,22 @@ def main():
     @st.cache_data(show_spinner=False)
     def load_data(path: str) -> pd.DataFrame:
         """Load CSV data"""
-        if not os.path.exists(path):
+        if not stage_exists(path):
             return pd.DataFrame()
-        df = pd.read_csv(path)
+        # CSV, or the newest DASHBOARD_DAYS day partitions of the Parquet
+        # dataset with AIOPS_STAGE_FORMAT=parquet
+        df = read_recent(path, DASHBOARD_DAYS)
         df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
         df = df.dropna(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
         return df
 
+    @st.cache_data(show_spinner=False)
+    def load_date_range(path: str, start_date, end_date) -> pd.DataFrame:
+        """Only the day partitions of the Parquet dataset inside the range"""
+        df = read_stage(path, days=[str(day.date()) for day in pd.date_range(start_date, end_date)])
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        return df.dropna(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
+
     # -----------------------------
     # CHECK ADMIN ROLE
     # -----------------------------
@@ -95,7 +108,7 @@ def main():
     # -----------------------------
     # LOAD DATA
     # -----------------------------
-    if not os.path.exists(DATA_FILE):
+    if not stage_exists(DATA_FILE):
         st.error(f"❌ Data file not found: {DATA_FILE}")
         st.info("💡 Please ensure final_decision_output.csv exists in data/processed/")
         st.stop()
@@ -195,10 +208,13 @@ def main():
                 end_date = st.date_input("End Date", value=df["timestamp"].max().date())
             
             # Filter data by date range
-            filtered_df = df[
-                (df["timestamp"].dt.date >= start_date) &
-                (df["timestamp"].dt.date <= end_date)
-            ]
+            if stage_format() == PARQUET:
+                filtered_df = load_date_range(DATA_FILE, start_date, end_date)
+            else:
+                filtered_df = df[
+                    (df["timestamp"].dt.date >= start_date) &
+                    (df["timestamp"].dt.date <= end_date)
+                ]
         
         # Root Cause Distribution
         st.markdown("#### Root Cause Distribution")
@@ -251,11 +267,11 @@ def main():
         st.info(f"📄 CSV file location: `{DATA_FILE}`")
         
         # Data file info
-        if os.path.exists(DATA_FILE):
+        if stage_exists(DATA_FILE):
             st.success("✅ CSV file found")
             
             # Get file info
-            file_size = os.path.getsize(DATA_FILE) / (1024 * 1024)  # MB
+            file_size = stage_size_bytes(DATA_FILE) / (1024 * 1024)  # MB
             st.info(f"📊 File size: **{file_size:.2f} MB**")
             st.info(f"📈 Total records: **{len(df)}**")
             
@@ -296,13 +312,13 @@ def main():
         st.markdown("#### 📊 Data Source Information")
         st.json({
             "Data File": DATA_FILE,
-            "File Exists": os.path.exists(DATA_FILE),
-            "Total Records": len(df) if os.path.exists(DATA_FILE) else 0,
+            "File Exists": stage_exists(DATA_FILE),
+            "Total Records": len(df) if stage_exists(DATA_FILE) else 0,
             "Date Range": {
-                "Start": str(df["timestamp"].min().date()) if os.path.exists(DATA_FILE) and 'timestamp' in df.columns else "N/A",
-                "End": str(df["timestamp"].max().date()) if os.path.exists(DATA_FILE) and 'timestamp' in df.columns else "N/A"
+                "Start": str(df["timestamp"].min().date()) if stage_exists(DATA_FILE) and 'timestamp' in df.columns else "N/A",
+                "End": str(df["timestamp"].max().date()) if stage_exists(DATA_FILE) and 'timestamp' in df.columns else "N/A"
             },
-            "Columns": list(df.columns) if os.path.exists(DATA_FILE) else []
+            "Columns": list(df.columns) if stage_exists(DATA_FILE) else []
         })
         
         st.markdown("---")
@@ -17,6 +17,11 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from decision_engine.stage_store import read_recent, stage_exists
+
+# Day partitions of a Parquet dataset loaded at startup
+DASHBOARD_DAYS = int(os.getenv("AIOPS_DASHBOARD_DAYS", "7"))
+
 # Lazy imports - only import when needed to speed up initial load
 # from backend.report_generator import generate_pdf_report
 # from dashboard.utils.config_manager import load_config
@@ -140,9 +145,11 @@ def main():
     # -----------------------------
     @st.cache_data(show_spinner=False)
     def load_data(path: str) -> pd.DataFrame:
-        if not os.path.exists(path):
+        if not stage_exists(path):
             return pd.DataFrame()
-        df = pd.read_csv(path)
+        # CSV, or the newest DASHBOARD_DAYS day partitions of the Parquet
+        # dataset with AIOPS_STAGE_FORMAT=parquet
+        df = read_recent(path, DASHBOARD_DAYS)
         df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
         df = df.dropna(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
         return df
@@ -1,12 +1,61 @@
+"""
+Batch decision engine
+
+Scores the engineered metrics (anomaly, failure probability, root cause),
+applies the alert rule and resolution model, and writes
+final_decision_output.csv.
+
+By default the whole file is scored in memory. With --chunk-rows N the
+input is streamed in chunks of N rows and every scored chunk is appended
+to the output, so memory stays bounded by the chunk size instead of the
+dataset size. With --workers N the file is cut into byte ranges on line
+boundaries that a process pool scores in parallel; each worker loads the
+models once (memory-mapped from the registry, so the pages are shared),
+streams its ranges into part files, and the parts are joined in order.
+With --incremental only the rows appended to the input since the last
+run are scored and appended to the output; a checkpoint next to the
+output records how far the input was scored and with which model and
+resolution policy versions, and everything is rescored when either changes.
+Recommended actions and resolution plans come from the versioned policy
+in decision_engine/resolution_policy.json (see resolution_model.py).
+Every step is row-wise, so all modes write the same bytes.
+
+Consecutive or nearby alert rows with the same root cause are coalesced
+into incidents (decision_engine/incidents.py), written next to the output
+as <output>_incidents.csv: resolved incidents first, then the ones still
+open. Incremental runs carry the open incidents over in the checkpoint.
+
+With --format parquet (or AIOPS_STAGE_FORMAT=parquet) the in-memory mode
+reads and writes the date-partitioned Parquet stages of
+decision_engine/stage_store.py; the streaming modes work on CSV files.
+
+Usage:
+    python decision_engine/decision_logic.py [--input CSV] [--output CSV]
+                                             [--chunk-rows 100000] [--workers 4]
+                                             [--incremental] [--model-version V]
+                                             [--format csv|parquet]
+"""
+import argparse
+import io
+import json
 import os
-import pandas as pd
-import joblib
+import shutil
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
 
 # Make package imports work when run as a script
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from decision_engine.resolution_model import recommend_resolution
+from decision_engine.resolution_model import load_policy, recommend_action_batch, recommend_resolution_batch
+from decision_engine.incidents import INPUT_COLUMNS as INCIDENT_COLUMNS, IncidentTracker, write_incidents
+from decision_engine.pipeline import DecisionPipeline
+from decision_engine.stage_store import (CSV, PARQUET, ByteRange, complete_end, dataset_path, first_row_digest,
+                                         line_digest, read_header, read_stage, split_ranges, stage_format,
+                                         write_stage)
+from models.registry import ModelRegistry
 
 # -------------------------------
 # PATH SETUP
@@ -16,16 +65,6 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_FILE = os.path.join(BASE_DIR, "data", "processed", "metrics_features.csv")
 OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "final_decision_output.csv")
 
-ANOMALY_MODEL_FILE = os.path.join(BASE_DIR, "models", "isolation_forest.pkl")
-PRED_MODEL_FILE = os.path.join(BASE_DIR, "models", "incident_prediction_model.pkl")
-ROOT_MODEL_FILE = os.path.join(BASE_DIR, "models", "root_cause_model.pkl")
-
-# -------------------------------
-# LOAD DATA
-# -------------------------------
-df = pd.read_csv(DATA_FILE)
-print("✅ Loaded metrics features dataset:", df.shape)
-
 # -------------------------------
 # FEATURE LIST
 # -------------------------------
@@ -40,102 +79,441 @@ feature_cols = [
     "error_lag1", "error_lag2"
 ]
 
-X = df[feature_cols]
+SAMPLE_COLUMNS = [
+    "timestamp", "cpu_usage", "memory_usage", "response_time",
+    "failure_probability", "predicted_root_cause", "recommended_action"
+]
+SAMPLE_ALERTS = 10
 
-# -------------------------------
-# LOAD MODELS
-# -------------------------------
-anomaly_bundle = joblib.load(ANOMALY_MODEL_FILE)
-anomaly_model = anomaly_bundle["model"]
-anomaly_scaler = anomaly_bundle["scaler"]
+# Rows per chunk inside each worker when --chunk-rows is not given
+WORKER_CHUNK_ROWS = 100000
+# Ranges per worker; more, smaller ranges even out uneven workers
+RANGES_PER_WORKER = 4
 
-pred_bundle = joblib.load(PRED_MODEL_FILE)
-pred_model = pred_bundle["model"]
-pred_features = pred_bundle["features"]
 
-root_bundle = joblib.load(ROOT_MODEL_FILE)
-root_model = root_bundle["model"]
-root_features = root_bundle["features"]
+def load_pipeline(version=None):
+    """DecisionPipeline for a registry version (default: active, models/*.pkl until one is registered)"""
+    pipeline = DecisionPipeline.from_registry(version)
+    print(f"✅ All models loaded successfully! (version {pipeline.version})")
+    return pipeline
 
-print("✅ All models loaded successfully!")
 
-# -------------------------------
-# 1) ANOMALY DETECTION
-# -------------------------------
-X_scaled = anomaly_scaler.transform(X)
-anomaly_pred = anomaly_model.predict(X_scaled)
+def score_frame(pipeline, df):
+    """
+    Add every decision column to a frame of engineered metrics
 
-df["anomaly_label"] = (anomaly_pred == -1).astype(int)
-df["anomaly_score"] = anomaly_model.decision_function(X_scaled)
+    Args:
+        pipeline: DecisionPipeline
+        df: Rows of metrics_features.csv
 
-# -------------------------------
-# 2) INCIDENT PREDICTION
-# -------------------------------
-X_pred = df[pred_features] if set(pred_features).issubset(df.columns) else df[feature_cols + ["anomaly_label", "anomaly_score"]]
-df["failure_probability"] = pred_model.predict_proba(X_pred)[:, 1]
-df["predicted_failure"] = pred_model.predict(X_pred)
+    Returns:
+        The frame with the model, alert and resolution columns appended
+    """
+    # 1-3) Anomaly detection, incident prediction, root cause:
+    # one feature matrix; root cause only predicted when predicted_failure = 1
+    for column, values in pipeline.score(df[feature_cols]).items():
+        df[column] = values
 
-# -------------------------------
-# 3) ROOT CAUSE PREDICTION
-# -------------------------------
-# Only predict root cause when predicted_failure = 1
-df["predicted_root_cause"] = "NORMAL"
+    # 4) Decision engine rule: alert_status uses the pipeline's
+    # threshold (ALERT_THRESHOLD = 0.70)
+    # Recommended action and automatic resolution from the compiled
+    # resolution policy (whole columns at once)
+    policy = load_policy()
+    df["recommended_action"] = recommend_action_batch(df["predicted_root_cause"].to_numpy(), policy)
+    resolution_output = pd.DataFrame(
+        recommend_resolution_batch(
+            root_cause=df["predicted_root_cause"].to_numpy(),
+            cpu_usage=df["cpu_usage"].to_numpy(),
+            memory_usage=df["memory_usage"].to_numpy(),
+            response_time=df["response_time"].to_numpy(),
+            anomaly_score=df["anomaly_score"].to_numpy(),
+            failure_probability=df["failure_probability"].to_numpy(),
+            anomaly_label=df["anomaly_label"].to_numpy(),
+            policy=policy,
+        ),
+        index=df.index,
+    )
 
-incident_rows = df[df["predicted_failure"] == 1]
-if len(incident_rows) > 0:
-    X_root = incident_rows[root_features]
-    df.loc[df["predicted_failure"] == 1, "predicted_root_cause"] = root_model.predict(X_root)
+    return pd.concat([df, resolution_output], axis=1)
+
+
+def incidents_path(output_path):
+    """Incidents CSV written next to a decision output"""
+    return os.path.splitext(output_path)[0] + "_incidents.csv"
+
+
+class RunSummary:
+    """Alert counts and the first alerts, accumulated chunk by chunk"""
+
+    def __init__(self, incidents=None):
+        self.incidents = incidents
+        self.incidents_file = None
+        self.incident_counts = (0, 0)
+        self.rows = 0
+        self.alert_counts = pd.Series(dtype="int64")
+        self.samples = []
+        self.last_timestamp = None
+
+    def add(self, scored):
+        self.rows += len(scored)
+        if len(scored) and "timestamp" in scored.columns:
+            self.last_timestamp = str(scored["timestamp"].iloc[-1])
+        self.alert_counts = self.alert_counts.add(scored["alert_status"].value_counts(), fill_value=0)
+        taken = sum(len(sample) for sample in self.samples)
+        if taken < SAMPLE_ALERTS:
+            alerts = scored[scored["alert_status"] == "ALERT"][SAMPLE_COLUMNS]
+            self.samples.append(alerts.head(SAMPLE_ALERTS - taken))
+        if self.incidents is not None:
+            self.incidents.update_frame(scored)
+
+    def merge(self, other):
+        """Append a later part's summary (its sample index is shifted past our rows)"""
+        self.alert_counts = self.alert_counts.add(other.alert_counts, fill_value=0)
+        taken = sum(len(sample) for sample in self.samples)
+        for sample in other.samples:
+            if taken >= SAMPLE_ALERTS:
+                break
+            sample = sample.head(SAMPLE_ALERTS - taken)
+            sample.index = sample.index + self.rows
+            self.samples.append(sample)
+            taken += len(sample)
+        self.rows += other.rows
+        self.last_timestamp = other.last_timestamp or self.last_timestamp
+
+    def print(self, output_path):
+        print("\n✅ Decision Engine Completed!")
+        print("📁 Final output saved to:", output_path)
+
+        print("\n📌 Alert Distribution:")
+        counts = self.alert_counts.astype("int64").sort_values(ascending=False)
+        counts.index.name = "alert_status"
+        print(counts.rename("count"))
+
+        print("\n📌 Sample Alerts:")
+        samples = [sample for sample in self.samples if len(sample)]
+        print(pd.concat(samples) if samples else pd.DataFrame(columns=SAMPLE_COLUMNS))
+
+        if self.incidents_file:
+            resolved, still_open = self.incident_counts
+            print(f"\n📌 Incidents: {resolved} resolved, {still_open} open "
+                  f"(from {int(self.alert_counts.get('ALERT', 0))} alert rows scored in this run)")
+            print("📁 Incidents saved to:", self.incidents_file)
+
+    def save_incidents(self, path, keep_bytes=None):
+        """Write the tracker's incidents (see incidents.write_incidents) and remember the counts"""
+        self.incident_counts = (len(self.incidents.resolved), len(self.incidents.open))
+        self.incidents_file = path
+        return write_incidents(self.incidents, path, keep_bytes)
+
+
+def run_in_memory(pipeline, input_path, output_path, fmt=None):
+    """Score the whole stage at once (CSV or Parquet)"""
+    df = read_stage(input_path, fmt)
+    print("✅ Loaded metrics features dataset:", df.shape)
+
+    scored = score_frame(pipeline, df)
+    write_stage(scored, output_path, fmt)
+
+    summary = RunSummary(IncidentTracker())
+    summary.add(scored)
+    return summary
+
+
+def run_chunked(pipeline, input_path, output_path, chunk_rows):
+    """
+    Stream the file through the pipeline chunk by chunk
+
+    Args:
+        pipeline: DecisionPipeline
+        input_path: Engineered metrics CSV
+        output_path: Decision output CSV (header written with the first chunk)
+        chunk_rows: Rows per chunk
+    """
+    summary = RunSummary(IncidentTracker())
+    tmp_path = f"{output_path}.partial"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+        for chunk in pd.read_csv(input_path, chunksize=chunk_rows):
+            scored = score_frame(pipeline, chunk)
+            scored.to_csv(out, header=summary.rows == 0, index=False)
+            summary.add(scored)
+    # Readers never see a half-written output
+    os.replace(tmp_path, output_path)
+    print(f"✅ Streamed {summary.rows} rows in chunks of {chunk_rows}")
+    return summary
+
+
+def score_byte_range(pipeline, input_path, columns, start, end, out, chunk_rows, write_header,
+                     incidents=None):
+    """
+    Score the rows in bytes [start, end) of the input and write them to `out`
+
+    Args:
+        pipeline: DecisionPipeline
+        input_path: Engineered metrics CSV
+        columns: Input header columns
+        start, end: Byte range on line boundaries
+        out: Text file the scored rows are written to
+        chunk_rows: Rows per chunk
+        write_header: Write the CSV header before the first chunk
+        incidents: IncidentTracker fed with the scored rows (optional)
+    """
+    summary = RunSummary(incidents)
+    if end <= start:
+        return summary
+    with ByteRange(input_path, start, end) as raw:
+        reader = pd.read_csv(io.BufferedReader(raw), names=columns, header=None, chunksize=chunk_rows)
+        for chunk in reader:
+            scored = score_frame(pipeline, chunk)
+            scored.to_csv(out, header=write_header and summary.rows == 0, index=False)
+            summary.add(scored)
+    return summary
+
+
+_worker_pipeline = None
+
+
+def _init_worker(version):
+    global _worker_pipeline
+    _worker_pipeline = DecisionPipeline.from_registry(version)
+
+
+def _score_range(task):
+    """Score one byte range into its part file (worker process)"""
+    input_path, columns, start, end, part_path, chunk_rows, write_header = task
+    with open(part_path, "w", newline="", encoding="utf-8") as out:
+        return score_byte_range(_worker_pipeline, input_path, columns, start, end,
+                                out, chunk_rows, write_header)
+
+
+def replay_incidents(tracker, output_path, start, chunk_rows):
+    """
+    Feed the decision rows from byte `start` of an output CSV to an IncidentTracker
+
+    Floats are parsed round-trip, so severities match the in-memory run exactly.
+    """
+    columns, data_start = read_header(output_path)
+    with ByteRange(output_path, max(start, data_start), os.path.getsize(output_path)) as raw:
+        reader = pd.read_csv(io.BufferedReader(raw), names=columns, header=None,
+                             usecols=INCIDENT_COLUMNS, chunksize=chunk_rows,
+                             float_precision="round_trip")
+        for chunk in reader:
+            tracker.update_frame(chunk)
+
+
+def run_parallel(version, input_path, output_path, workers, chunk_rows=0,
+                 start=None, end=None, append=False, incidents=None):
+    """
+    Score the file in a process pool and join the parts in input order
+
+    Args:
+        version: Registry version every worker loads (None: models/*.pkl)
+        input_path: Engineered metrics CSV
+        output_path: Decision output CSV
+        workers: Worker processes
+        chunk_rows: Rows per chunk inside a worker (0: WORKER_CHUNK_ROWS)
+        start, end: Byte range of the input to score (default: all rows)
+        append: Append the rows to output_path instead of replacing it
+        incidents: IncidentTracker fed with the new rows once they are joined
+            (the workers score ranges independently, so incidents that span
+            ranges are only seen in order here)
+    """
+    chunk_rows = chunk_rows or WORKER_CHUNK_ROWS
+    columns, ranges = split_ranges(input_path, workers * RANGES_PER_WORKER, start, end)
+    part_paths = [f"{output_path}.part{i:04d}" for i in range(len(ranges))]
+    tasks = [
+        (input_path, columns, a, b, part_path, chunk_rows, i == 0 and not append)
+        for i, ((a, b), part_path) in enumerate(zip(ranges, part_paths))
+    ]
+
+    summary = RunSummary(incidents)
+    replay_from = os.path.getsize(output_path) if append else 0
+    tmp_path = f"{output_path}.partial"
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(version,)) as executor:
+            # map() yields in submission order, so parts are merged in input order
+            for part_summary in executor.map(_score_range, tasks):
+                summary.merge(part_summary)
+        with open(output_path if append else tmp_path, "ab" if append else "wb") as out:
+            for part_path in part_paths:
+                with open(part_path, "rb") as part:
+                    shutil.copyfileobj(part, out, 1 << 20)
+        if not append:
+            os.replace(tmp_path, output_path)
+        if incidents is not None:
+            replay_incidents(incidents, output_path, replay_from, chunk_rows)
+    finally:
+        for path in part_paths + [tmp_path]:
+            if os.path.exists(path):
+                os.remove(path)
+    print(f"✅ Scored {summary.rows} rows with {workers} workers ({len(ranges)} ranges)")
+    return summary
 
-# -------------------------------
-# 4) DECISION ENGINE RULE
-# -------------------------------
-# Decision threshold
-THRESHOLD = 0.70
-
-df["alert_status"] = df["failure_probability"].apply(lambda x: "ALERT" if x >= THRESHOLD else "OK")
-
-# Recommended action based on root cause
-def recommend_action(root):
-    if root == "CPU_OVERLOAD":
-        return "Scale up CPU / Restart overloaded service"
-    if root == "MEMORY_LEAK":
-        return "Restart service / Check memory leak deployment"
-    if root == "LATENCY_SPIKE":
-        return "Check network / API latency / Load balancer"
-    return "No action needed"
-
-df["recommended_action"] = df["predicted_root_cause"].apply(recommend_action)
-
-# Automatic resolution model output
-resolution_output = df.apply(
-    lambda row: recommend_resolution(
-        root_cause=row.get("predicted_root_cause", "NORMAL"),
-        cpu_usage=float(row.get("cpu_usage", 0)),
-        memory_usage=float(row.get("memory_usage", 0)),
-        response_time=float(row.get("response_time", 0)),
-        anomaly_score=float(row.get("anomaly_score", 0)),
-        failure_probability=float(row.get("failure_probability", 0)),
-        anomaly_label=int(row.get("anomaly_label", 0)),
-    ),
-    axis=1,
-    result_type="expand",
-)
-
-df = pd.concat([df, resolution_output], axis=1)
 
 # -------------------------------
-# SAVE FINAL OUTPUT
+# INCREMENTAL RUNS
 # -------------------------------
-df.to_csv(OUTPUT_FILE, index=False)
+def _load_decision_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-print("\n✅ Decision Engine Completed!")
-print("📁 Final output saved to:", OUTPUT_FILE)
 
-print("\n📌 Alert Distribution:")
-print(df["alert_status"].value_counts())
+def _save_decision_checkpoint(checkpoint_path, state):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(state, updated_at=datetime.now().isoformat()), f, indent=2)
+    os.replace(tmp_path, checkpoint_path)
 
-print("\n📌 Sample Alerts:")
-print(df[df["alert_status"] == "ALERT"][[
-    "timestamp", "cpu_usage", "memory_usage", "response_time",
-    "failure_probability", "predicted_root_cause", "recommended_action"
-]].head(10))
\ No newline at end of file
+
+def _rescore_reason(state, input_path, output_path, model_version, policy_version, data_start, end):
+    """Why the checkpoint cannot be continued (None when it can)"""
+    if state is None:
+        return "no checkpoint"
+    if state.get("model_version") != model_version:
+        return f"model version changed ({state.get('model_version')} -> {model_version})"
+    if state.get("policy_version") != policy_version:
+        return f"resolution policy changed ({state.get('policy_version')} -> {policy_version})"
+    incidents_file = incidents_path(output_path)
+    if state.get("incidents") is None or not os.path.exists(incidents_file) \
+            or os.path.getsize(incidents_file) < state.get("incidents_bytes", 0):
+        return "incidents file is missing or truncated"
+    offset = state.get("input_offset", 0)
+    if state.get("input_path") != os.path.abspath(input_path) or not data_start <= offset <= end \
+            or (offset > data_start and (
+                line_digest(input_path, offset) != state.get("input_tail_sha256")
+                or first_row_digest(input_path, data_start) != state.get("input_head_sha256"))):
+        return "input file was rewritten"
+    if not os.path.exists(output_path) or os.path.getsize(output_path) < state.get("output_bytes", 0):
+        return "output file is missing or truncated"
+    return None
+
+
+def run_incremental(model_version, input_path, output_path, chunk_rows=0, workers=0,
+                    checkpoint_path=None):
+    """
+    Score only the rows appended to the input since the last run
+
+    The checkpoint records the input byte offset scored so far (with
+    hashes of the first and last scored rows), the last timestamp, the output size,
+    the model version and the resolution policy version. Everything is rescored
+    when there is no usable checkpoint, the input was rewritten, or either
+    version changed. The incident tracker's state travels in the checkpoint,
+    so incidents open at the end of one run continue with the next run's rows.
+
+    Args:
+        model_version: Registry version (None: models/*.pkl)
+        input_path: Engineered metrics CSV, appended to between runs
+        output_path: Decision output CSV
+        chunk_rows: Rows per chunk (0: WORKER_CHUNK_ROWS)
+        workers: Worker processes (0: score in this process)
+        checkpoint_path: State file (default: <output_path>.decision-checkpoint.json)
+    """
+    checkpoint_path = checkpoint_path or output_path + ".decision-checkpoint.json"
+    chunk_rows = chunk_rows or WORKER_CHUNK_ROWS
+    version_label = model_version or "legacy"
+    policy_version = load_policy().version
+    columns, data_start = read_header(input_path)
+    end = complete_end(input_path)
+
+    state = _load_decision_checkpoint(checkpoint_path)
+    reason = _rescore_reason(state, input_path, output_path, version_label, policy_version,
+                             data_start, end)
+    if reason:
+        print(f"📌 Rescoring all rows: {reason}")
+        start, append, rows_before = data_start, False, 0
+        tracker, incidents_bytes = IncidentTracker(), None
+    else:
+        start, append, rows_before = state["input_offset"], True, state.get("rows_done", 0)
+        # Incidents still open at the last run carry on with the new rows
+        tracker = IncidentTracker.from_state(state["incidents"])
+        incidents_bytes = state["incidents_bytes"]
+        # Drop anything an interrupted run appended after its last checkpoint
+        with open(output_path, "r+b") as f:
+            f.truncate(state["output_bytes"])
+        print(f"📌 Continuing after {rows_before} rows (watermark {state.get('watermark')})")
+
+    if append and start >= end:
+        summary = RunSummary(tracker)
+    elif workers > 0:
+        summary = run_parallel(model_version, input_path, output_path, workers, chunk_rows,
+                               start=start, end=end, append=append, incidents=tracker)
+    else:
+        pipeline = load_pipeline(model_version)
+        tmp_path = f"{output_path}.partial"
+        with open(output_path if append else tmp_path, "a" if append else "w",
+                  newline="", encoding="utf-8") as out:
+            summary = score_byte_range(pipeline, input_path, columns, start, end,
+                                       out, chunk_rows, write_header=not append, incidents=tracker)
+        if not append:
+            os.replace(tmp_path, output_path)
+    incidents_bytes = summary.save_incidents(incidents_path(output_path), incidents_bytes)
+
+    _save_decision_checkpoint(checkpoint_path, {
+        "input_path": os.path.abspath(input_path),
+        "input_offset": end,
+        "input_head_sha256": first_row_digest(input_path, data_start) if end > data_start else None,
+        "input_tail_sha256": line_digest(input_path, end) if end > data_start else None,
+        "rows_done": rows_before + summary.rows,
+        "watermark": summary.last_timestamp or (state.get("watermark") if append else None),
+        "model_version": version_label,
+        "policy_version": policy_version,
+        "incidents": tracker.state(),
+        "incidents_bytes": incidents_bytes,
+        "output_bytes": os.path.getsize(output_path) if os.path.exists(output_path) else 0,
+    })
+    print(f"✅ Scored {summary.rows} new rows ({rows_before + summary.rows} in total)")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the batch decision engine")
+    parser.add_argument("--input", default=DATA_FILE, help="Engineered metrics CSV")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Decision output CSV")
+    parser.add_argument("--chunk-rows", type=int, default=0,
+                        help="Stream the input in chunks of this many rows (0: load it all)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Score row ranges in this many processes (0: in this process)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only score rows appended since the last run (checkpointed)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Incremental state file (default: <output>.decision-checkpoint.json)")
+    parser.add_argument("--model-version", default=None, help="Registry version (default: active)")
+    parser.add_argument("--format", choices=("csv", "parquet"), default=None,
+                        help="Stage storage format (default: AIOPS_STAGE_FORMAT or csv)")
+    args = parser.parse_args(argv)
+
+    fmt = stage_format(args.format)
+    if fmt != CSV and (args.workers > 0 or args.incremental or args.chunk_rows > 0):
+        parser.error("--chunk-rows, --workers and --incremental stream CSV files; use --format csv")
+
+    if args.workers > 0 or args.incremental:
+        # Pin the version, so every worker and the checkpoint agree on the models
+        version = args.model_version or ModelRegistry().active_version()
+        print(f"✅ Scoring with model version {version or 'legacy'}")
+        if args.incremental:
+            summary = run_incremental(version, args.input, args.output, args.chunk_rows,
+                                      args.workers, args.checkpoint)
+        else:
+            summary = run_parallel(version, args.input, args.output, args.workers, args.chunk_rows,
+                                   incidents=IncidentTracker())
+            summary.save_incidents(incidents_path(args.output))
+        summary.print(args.output)
+        return 0
+
+    pipeline = load_pipeline(args.model_version)
+    if args.chunk_rows > 0:
+        summary = run_chunked(pipeline, args.input, args.output, args.chunk_rows)
+    else:
+        summary = run_in_memory(pipeline, args.input, args.output, fmt)
+    summary.save_incidents(incidents_path(args.output))
+    summary.print(dataset_path(args.output) if fmt == PARQUET else args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Streaming coalescing of alert rows into incidents.
+
+Every row at or above the alert threshold used to be a separate alert.
+IncidentTracker merges consecutive or nearby alert rows with the same root
+cause (and series, when there is one) into one incident:
+
+    open     a row reaches OPEN_PROBABILITY and no incident is open for its key
+    update   a row of the same key reaches HOLD_PROBABILITY (lower than the
+             open threshold, so an incident does not flap around 0.70)
+    resolve  no such row for RESOLVE_AFTER_SECONDS
+
+Each row costs a dict lookup plus a check of the open incidents (at most
+one per root cause and series), so the tracker keeps up with the ingest
+API one row at a time and with the batch engine a chunk at a time. Its
+state is a small dict, so incremental runs can carry it between runs.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from decision_engine.pipeline import ALERT_THRESHOLD
+from decision_engine.resolution_model import load_policy, severity_array
+
+OPEN_PROBABILITY = ALERT_THRESHOLD
+HOLD_PROBABILITY = 0.50
+RESOLVE_AFTER_SECONDS = 300.0
+
+OPENED = "opened"
+UPDATED = "updated"
+RESOLVED = "resolved"
+
+# Copied from the peak-severity row, so an incident carries one recommendation
+_PLAN_FIELDS = ("recommended_action", "auto_resolution", "resolution_playbook")
+# Decision output columns update_frame() reads
+INPUT_COLUMNS = ["timestamp", "cpu_usage", "memory_usage", "response_time", "anomaly_score",
+                 "failure_probability", "predicted_root_cause", *_PLAN_FIELDS]
+
+
+@dataclass
+class Incident:
+    incident_id: str
+    status: str
+    root_cause: str
+    series: Optional[str]
+    start: str
+    end: str
+    duration_seconds: float
+    row_count: int
+    alert_rows: int
+    peak_failure_probability: float
+    peak_severity: float
+    recommended_action: Optional[str] = None
+    auto_resolution: Optional[str] = None
+    resolution_playbook: Optional[str] = None
+    # Seconds since the epoch of start / end (the tracker's clock)
+    _start_seconds: float = 0.0
+    _end_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: value for key, value in asdict(self).items() if not key.startswith("_")}
+
+
+INCIDENT_COLUMNS = [field.name for field in fields(Incident) if not field.name.startswith("_")]
+
+
+def _seconds(timestamp) -> float:
+    value = pd.to_datetime(timestamp, errors="coerce")
+    return np.nan if pd.isna(value) else value.value / 1e9
+
+
+class IncidentTracker:
+    """
+    Open / update / resolve incidents from a time-ordered stream of rows
+
+    Args:
+        open_probability: failure_probability that opens an incident
+        hold_probability: failure_probability that keeps an open one going
+        resolve_after: Quiet seconds after the last such row before it is resolved
+    """
+
+    def __init__(self, open_probability: float = OPEN_PROBABILITY,
+                 hold_probability: float = HOLD_PROBABILITY,
+                 resolve_after: float = RESOLVE_AFTER_SECONDS):
+        if hold_probability > open_probability:
+            raise ValueError("hold_probability must not exceed open_probability")
+        self.open_probability = open_probability
+        self.hold_probability = hold_probability
+        self.resolve_after = resolve_after
+        self.open: Dict[Tuple[Optional[str], str], Incident] = {}
+        # Resolved since the last drain_resolved()
+        self.resolved: List[Incident] = []
+        self.clock = np.nan
+        self.next_id = 1
+
+    # -------------------------------
+    # STREAMING (one row at a time)
+    # -------------------------------
+    def advance(self, timestamp) -> List[Incident]:
+        """Move the clock forward and resolve incidents quiet for too long"""
+        now = timestamp if isinstance(timestamp, float) else _seconds(timestamp)
+        if np.isnan(now) or (not np.isnan(self.clock) and now < self.clock):
+            return []
+        self.clock = now
+        expired = [key for key, incident in self.open.items()
+                   if now - incident._end_seconds > self.resolve_after]
+        return [self._resolve(key) for key in expired]
+
+    def update(self, timestamp, root_cause: str, failure_probability: float, severity: float = 0.0,
+               series: Optional[str] = None, plan: Optional[Dict[str, Any]] = None
+               ) -> Tuple[Optional[str], Optional[Incident], List[Incident]]:
+        """
+        Feed one row
+
+        Args:
+            timestamp: Row time (anything pandas can parse)
+            root_cause: Predicted root cause
+            failure_probability: Predicted failure probability
+            severity: Row severity (resolution_model.severity_score)
+            series: Host / service the row belongs to (None: a single stream)
+            plan: recommended_action / auto_resolution / resolution_playbook of the row
+
+        Returns:
+            (event, incident, resolved): event is "opened", "updated" or None
+            for rows below the thresholds; resolved lists incidents this row's
+            time closed.
+        """
+        now = _seconds(timestamp)
+        resolved = self.advance(now)
+        if now != now:
+            now = self.clock
+        event, incident = self._feed(now, str(timestamp), root_cause, failure_probability,
+                                     severity, series, plan)
+        return event, incident, resolved
+
+    def _feed(self, now, stamp, root_cause, probability, severity, series, plan):
+        probability, severity = float(probability), float(severity)
+        if not probability >= self.hold_probability:
+            return None, None
+        key = (series, root_cause)
+        incident = self.open.get(key)
+        if incident is None:
+            if not probability >= self.open_probability:
+                return None, None
+            incident = Incident(
+                incident_id=f"INC-{self.next_id:06d}", status="OPEN", root_cause=root_cause,
+                series=series, start=stamp, end=stamp, duration_seconds=0.0, row_count=0,
+                alert_rows=0, peak_failure_probability=probability, peak_severity=-1.0,
+                _start_seconds=now, _end_seconds=now,
+            )
+            self.next_id += 1
+            self.open[key] = incident
+            event = OPENED
+        else:
+            event = UPDATED
+        # end = max(end, row time): an out-of-order row must not move it back
+        if not now < incident._end_seconds:
+            incident.end, incident._end_seconds = stamp, now
+        end = incident._end_seconds
+        incident.duration_seconds = max(0.0, end - incident._start_seconds) if end == end else 0.0
+        incident.row_count += 1
+        incident.alert_rows += int(probability >= self.open_probability)
+        incident.peak_failure_probability = max(incident.peak_failure_probability, probability)
+        if severity > incident.peak_severity:
+            incident.peak_severity = severity
+            for name in _PLAN_FIELDS:
+                if plan and plan.get(name) is not None:
+                    setattr(incident, name, str(plan[name]))
+        return event, incident
+
+    def _resolve(self, key) -> Incident:
+        incident = self.open.pop(key)
+        incident.status = "RESOLVED"
+        self.resolved.append(incident)
+        return incident
+
+    # -------------------------------
+    # BATCH (a scored frame at a time)
+    # -------------------------------
+    def update_frame(self, frame: pd.DataFrame, series_column: Optional[str] = None, policy=None) -> None:
+        """
+        Feed a time-ordered chunk of decision output rows
+
+        Only rows at or above hold_probability touch the incidents, so the
+        per-row Python work is limited to those; severity for them is computed
+        in one vectorized call. Resolved incidents collect in self.resolved.
+        """
+        if not len(frame):
+            return
+        probability = frame["failure_probability"].to_numpy(dtype=np.float64)
+        stamps = pd.to_datetime(frame["timestamp"], errors="coerce")
+        seconds = np.where(stamps.isna(), np.nan, stamps.to_numpy("datetime64[ns]").astype(np.int64) / 1e9)
+        rows = np.flatnonzero(probability >= self.hold_probability)
+        if len(rows):
+            candidates = frame.iloc[rows]
+            severity = severity_array(candidates["cpu_usage"], candidates["memory_usage"],
+                                      candidates["response_time"], candidates["anomaly_score"],
+                                      policy or load_policy())
+            stamp_text = candidates["timestamp"].astype(str).to_numpy()
+            roots = candidates["predicted_root_cause"].astype(str).to_numpy()
+            series = candidates[series_column].astype(str).to_numpy() if series_column else None
+            plan_columns = [name for name in _PLAN_FIELDS if name in candidates.columns]
+            plans = candidates[plan_columns].astype(object).to_numpy() if plan_columns else None
+            for i, row in enumerate(rows):
+                now = seconds[row]
+                self.advance(now)
+                if now != now:
+                    now = self.clock
+                plan = dict(zip(plan_columns, plans[i])) if plans is not None else None
+                self._feed(now, stamp_text[i], roots[i], probability[row], severity[i],
+                           series[i] if series is not None else None, plan)
+        # Quiet rows after the last candidate still move the clock
+        valid = seconds[~np.isnan(seconds)]
+        if len(valid):
+            self.advance(float(valid[-1]))
+
+    def drain_resolved(self) -> List[Incident]:
+        """Incidents resolved since the last call"""
+        resolved, self.resolved = self.resolved, []
+        return resolved
+
+    def open_incidents(self) -> List[Incident]:
+        return sorted(self.open.values(), key=lambda incident: incident.incident_id)
+
+    def resolve_all(self) -> List[Incident]:
+        """Resolve every open incident (end of a finite stream)"""
+        return [self._resolve(key) for key in list(self.open)]
+
+    # -------------------------------
+    # STATE (carried between incremental runs)
+    # -------------------------------
+    def state(self) -> Dict[str, Any]:
+        return {
+            "open_probability": self.open_probability,
+            "hold_probability": self.hold_probability,
+            "resolve_after": self.resolve_after,
+            "clock": None if np.isnan(self.clock) else self.clock,
+            "next_id": self.next_id,
+            "open": [asdict(incident) for incident in self.open_incidents()],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "IncidentTracker":
+        tracker = cls(state["open_probability"], state["hold_probability"], state["resolve_after"])
+        tracker.clock = np.nan if state.get("clock") is None else float(state["clock"])
+        tracker.next_id = int(state["next_id"])
+        for values in state.get("open", []):
+            incident = Incident(**values)
+            tracker.open[(incident.series, incident.root_cause)] = incident
+        return tracker
+
+
+def incidents_frame(incidents: List[Incident]) -> pd.DataFrame:
+    return pd.DataFrame([incident.to_dict() for incident in incidents], columns=INCIDENT_COLUMNS)
+
+
+def write_incidents(tracker: IncidentTracker, path: str, keep_bytes: Optional[int] = None) -> int:
+    """
+    Write the resolved incidents, then the ones still open
+
+    Args:
+        tracker: IncidentTracker (its resolved incidents are drained)
+        path: Incidents CSV
+        keep_bytes: Keep this many bytes of an earlier run's resolved incidents
+            and append after them (None: write a new file)
+
+    Returns:
+        Size of the file up to the end of the resolved incidents, which is
+        where the next incremental run continues (open incidents follow it)
+    """
+    resolved = incidents_frame(tracker.drain_resolved())
+    if keep_bytes is None or not os.path.exists(path):
+        resolved.to_csv(path, index=False)
+    else:
+        with open(path, "r+b") as f:
+            f.truncate(keep_bytes)
+        resolved.to_csv(path, mode="a", header=False, index=False)
+    resolved_bytes = os.path.getsize(path)
+    incidents_frame(tracker.open_incidents()).to_csv(path, mode="a", header=False, index=False)
+    return resolved_bytes
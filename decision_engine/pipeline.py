@@ -0,0 +1,142 @@
+"""
+Single-pass inference for the decision engine
+
+DecisionPipeline runs the three models over a batch of engineered feature
+rows with one feature matrix:
+
+    1) the scaler and Isolation Forest see the base features; the anomaly
+       label is derived from the decision scores (predict() is the sign
+       of decision_function(), so the forest is walked once)
+    2) the base features and both anomaly outputs are written into one
+       contiguous float32 matrix, laid out in the prediction model's
+       feature order, and a single predict_proba() gives both the failure
+       probability and the predicted label
+    3) the root cause model only scores the rows predicted to fail
+
+Outputs are identical to running predict/decision_function/predict_proba
+separately on DataFrame selections, as decision_logic.py used to.
+"""
+from __future__ import annotations
+
+import os
+import sys
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.registry import ModelRegistry
+
+# Decision threshold on the failure probability
+ALERT_THRESHOLD = 0.70
+
+OUTPUT_COLUMNS = [
+    "anomaly_label", "anomaly_score", "failure_probability",
+    "predicted_failure", "predicted_root_cause", "alert_status",
+]
+
+
+class DecisionPipeline:
+    """Anomaly, failure and root cause scoring over one feature matrix"""
+
+    def __init__(self, models, compiled: bool = False, version: Optional[str] = None):
+        """
+        Args:
+            models: ModelSet or dict with "anomaly", "prediction" and "root_cause" bundles
+            compiled: Score with models/compiled_forest.py (bit-identical, faster on small batches)
+            version: Model version label (default: models.version when available)
+        """
+        self.version = version or getattr(models, "version", None)
+        anomaly, prediction, root = models["anomaly"], models["prediction"], models["root_cause"]
+
+        self.anomaly_features = list(anomaly["features"])
+        self.scaler = anomaly["scaler"]
+        self.anomaly_model = anomaly["model"]
+        self.pred_features = list(prediction["features"])
+        self.pred_model = prediction["model"]
+        self.root_features = list(root["features"])
+        self.root_model = root["model"]
+        self.compiled = compiled
+        if compiled:
+            from models.compiled_forest import compile_model
+            self.anomaly_model = compile_model(self.anomaly_model)
+            self.pred_model = compile_model(self.pred_model)
+            self.root_model = compile_model(self.root_model)
+
+        self.failure_index = list(self.pred_model.classes_).index(1)
+
+    @classmethod
+    def from_registry(cls, version: Optional[str] = None, compiled: bool = False,
+                      registry: Optional[ModelRegistry] = None) -> "DecisionPipeline":
+        """Pipeline over a registry version (default: the active one)"""
+        return cls((registry or ModelRegistry()).load(version), compiled=compiled)
+
+    def _matrix(self, columns: Dict[str, np.ndarray], features, n_rows: int) -> np.ndarray:
+        X = np.empty((n_rows, len(features)), dtype=np.float32)
+        for j, name in enumerate(features):
+            X[:, j] = columns[name]
+        return X
+
+    def _model_input(self, X: np.ndarray, features, model):
+        # sklearn checks the column names it was fitted with; wrapping the
+        # float32 block in a DataFrame costs no copy
+        if not self.compiled and hasattr(model, "feature_names_in_"):
+            return pd.DataFrame(X, columns=features, copy=False)
+        return X
+
+    def score(self, frame: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Score a batch of feature rows
+
+        Args:
+            frame: DataFrame holding at least the anomaly model's features
+
+        Returns:
+            Dict of output column name -> array, in OUTPUT_COLUMNS order
+        """
+        n_rows = len(frame)
+        base = frame[self.anomaly_features]
+
+        # 1) Anomaly detection: one forest traversal for score and label
+        scores = self.anomaly_model.decision_function(self.scaler.transform(base))
+        labels = (scores < 0).astype(int)
+
+        # 2) Failure prediction: one matrix, one predict_proba
+        columns = {name: base[name].to_numpy() for name in self.anomaly_features}
+        columns["anomaly_label"] = labels
+        columns["anomaly_score"] = scores
+        for name in set(self.pred_features + self.root_features) - set(columns):
+            columns[name] = frame[name].to_numpy()
+        X = self._matrix(columns, self.pred_features, n_rows)
+
+        proba = self.pred_model.predict_proba(self._model_input(X, self.pred_features, self.pred_model))
+        failure_probability = proba[:, self.failure_index]
+        predicted_failure = self.pred_model.classes_.take(proba.argmax(axis=1))
+
+        # 3) Root cause, only for the predicted incidents
+        root_cause = np.full(n_rows, "NORMAL", dtype=object)
+        incident = predicted_failure == 1
+        if incident.any():
+            X_root = X[incident] if self.root_features == self.pred_features else \
+                self._matrix({k: v[incident] for k, v in columns.items()}, self.root_features, int(incident.sum()))
+            root_cause[incident] = self.root_model.predict(
+                self._model_input(X_root, self.root_features, self.root_model))
+
+        alert_status = np.where(failure_probability >= ALERT_THRESHOLD, "ALERT", "OK").astype(object)
+        return {
+            "anomaly_label": labels,
+            "anomaly_score": scores,
+            "failure_probability": failure_probability,
+            "predicted_failure": predicted_failure,
+            "predicted_root_cause": root_cause,
+            "alert_status": alert_status,
+        }
+
+    def score_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """The input rows with the output columns added"""
+        out = frame.copy()
+        for name, values in self.score(frame).items():
+            out[name] = values
+        return out
@@ -1,8 +1,28 @@
-"""Automatic resolution recommendation model for anomaly incidents."""
+"""Automatic resolution recommendation model for anomaly incidents.
+
+Playbooks, confidence coefficients and auto-execute thresholds come from a
+versioned policy file (decision_engine/resolution_policy.json, or the path
+in AIOPS_RESOLUTION_POLICY). The file is compiled once into per-plan lookup
+arrays and recompiled when it changes on disk, so policy edits need no code
+change or restart.
+"""
 from __future__ import annotations
 
+import json
+import os
+import threading
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+POLICY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resolution_policy.json")
+
+_RULE_FIELDS = ("base_confidence", "severity_weight", "probability_weight", "auto_execute_severity")
+_TEXT_FIELDS = ("recommended_action", "auto_resolution", "resolution_playbook")
+_SEVERITY_FIELDS = ("cpu_scale", "memory_scale", "latency_scale", "anomaly_offset", "anomaly_scale")
+_SEVERITY_WEIGHTS = ("cpu", "memory", "latency", "anomaly")
 
 
 @dataclass(frozen=True)
@@ -13,16 +33,183 @@ class ResolutionPlan:
     can_auto_execute: bool
 
 
+def _number(section: dict, key: str, where: str) -> float:
+    value = section.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"resolution policy: {where}.{key} must be a number, got {value!r}")
+    return float(value)
+
+
+def _text(section: dict, key: str, where: str) -> str:
+    value = section.get(key)
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"resolution policy: {where}.{key} must be a non-empty string")
+    return value
+
+
+def _categories(texts):
+    """Distinct texts (Categorical categories) and the code of every plan"""
+    categories = list(dict.fromkeys(texts))
+    codes = np.array([categories.index(text) for text in texts], dtype=np.int8)
+    return categories, codes
+
+
+class ResolutionPolicy:
+    """
+    A resolution policy compiled into lookup arrays
+
+    Plan index 0 is the observe plan, then one per rule in file order, the
+    default rule last. Every per-plan value (coefficients, thresholds, the
+    codes of the plan texts) is an array indexed by plan, so the batch path
+    is a handful of takes.
+    """
+
+    def __init__(self, spec: dict, source: Optional[str] = None):
+        if not isinstance(spec, dict):
+            raise ValueError("resolution policy: top level must be an object")
+        self.version = str(spec.get("version", "unversioned"))
+        self.source = source
+
+        observe = spec.get("observe") or {}
+        self.observe_label = int(_number(observe, "anomaly_label", "observe"))
+        self.observe_probability = _number(observe, "min_failure_probability", "observe")
+        self.observe_confidence = _number(observe, "resolution_confidence", "observe")
+
+        severity = spec.get("severity") or {}
+        self.cpu_scale, self.memory_scale, self.latency_scale, self.anomaly_offset, self.anomaly_scale = (
+            _number(severity, key, "severity") for key in _SEVERITY_FIELDS)
+        weights = severity.get("weights") or {}
+        self.cpu_weight, self.memory_weight, self.latency_weight, self.anomaly_weight = (
+            _number(weights, key, "severity.weights") for key in _SEVERITY_WEIGHTS)
+
+        rules = spec.get("rules") or []
+        roots = [_text(rule, "root_cause", f"rules[{i}]").upper() for i, rule in enumerate(rules)]
+        if len(set(roots)) != len(roots):
+            raise ValueError("resolution policy: duplicate root_cause in rules")
+        # Plan index of every root cause; anything else gets the default plan
+        self.plan_index = {root: i + 1 for i, root in enumerate(roots)}
+        self.default_index = len(rules) + 1
+        plans = [dict(rule, _where=f"rules[{i}]") for i, rule in enumerate(rules)]
+        plans.append(dict(spec.get("default") or {}, _where="default"))
+
+        coefficients = {field: [0.0] for field in _RULE_FIELDS}
+        texts = {field: [] for field in _TEXT_FIELDS}
+        for plan in plans:
+            for field in _RULE_FIELDS:
+                coefficients[field].append(_number(plan, field, plan["_where"]))
+            for field in _TEXT_FIELDS:
+                texts[field].append(_text(plan, field, plan["_where"]))
+        self.base_confidence = np.array(coefficients["base_confidence"])
+        self.severity_weight = np.array(coefficients["severity_weight"])
+        self.probability_weight = np.array(coefficients["probability_weight"])
+        self.auto_execute_severity = np.array(coefficients["auto_execute_severity"])
+
+        # recommended_action is matched on the exact root cause, as the
+        # decision engine always did; the resolution plan on the upper-cased one
+        self.actions = texts["recommended_action"]
+        self.action_index = {rule["root_cause"]: i for i, rule in enumerate(rules)}
+        self.observe_plan = ResolutionPlan(
+            auto_resolution=_text(observe, "auto_resolution", "observe"),
+            resolution_playbook=_text(observe, "resolution_playbook", "observe"),
+            resolution_confidence=self.observe_confidence,
+            can_auto_execute=False,
+        )
+        self.auto_resolutions = [self.observe_plan.auto_resolution] + texts["auto_resolution"]
+        self.playbooks = [self.observe_plan.resolution_playbook] + texts["resolution_playbook"]
+        self.auto_resolution_categories, self.auto_resolution_codes = _categories(self.auto_resolutions)
+        self.playbook_categories, self.playbook_codes = _categories(self.playbooks)
+        self.action_categories, self.action_codes = _categories(self.actions)
+
+    @classmethod
+    def from_file(cls, path: str) -> "ResolutionPolicy":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), source=path)
+
+
+_policy_cache: Dict[str, Any] = {}
+_policy_lock = threading.Lock()
+
+
+def load_policy(path: Optional[str] = None) -> ResolutionPolicy:
+    """
+    The compiled resolution policy
+
+    Args:
+        path: Policy file (default: AIOPS_RESOLUTION_POLICY, else resolution_policy.json)
+
+    Returns:
+        ResolutionPolicy, recompiled only when the file's mtime or size changes
+    """
+    path = os.path.abspath(path or os.getenv("AIOPS_RESOLUTION_POLICY") or POLICY_FILE)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _policy_cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with _policy_lock:
+        policy = ResolutionPolicy.from_file(path)
+        _policy_cache[path] = (key, policy)
+    return policy
+
+
 def _bounded(value: float, low: float = 0.0, high: float = 1.0) -> float:
     return max(low, min(high, value))
 
 
-def _severity_score(cpu_usage: float, memory_usage: float, response_time: float, anomaly_score: float) -> float:
-    cpu_norm = _bounded(cpu_usage / 100.0)
-    memory_norm = _bounded(memory_usage / 100.0)
-    latency_norm = _bounded(response_time / 3000.0)
-    anomaly_norm = _bounded((abs(anomaly_score) + 0.2) / 1.4)
-    return _bounded(0.35 * cpu_norm + 0.25 * memory_norm + 0.25 * latency_norm + 0.15 * anomaly_norm)
+def _bounded_array(values: np.ndarray, low: float = 0.0, high: float = 1.0) -> np.ndarray:
+    # Same results as _bounded, including NaN (min/max keep their first argument)
+    values = np.where(values < high, values, high)
+    return np.where(values > low, values, low)
+
+
+def _severity_score(policy: ResolutionPolicy, cpu_usage: float, memory_usage: float, response_time: float,
+                    anomaly_score: float) -> float:
+    cpu_norm = _bounded(cpu_usage / policy.cpu_scale)
+    memory_norm = _bounded(memory_usage / policy.memory_scale)
+    latency_norm = _bounded(response_time / policy.latency_scale)
+    anomaly_norm = _bounded((abs(anomaly_score) + policy.anomaly_offset) / policy.anomaly_scale)
+    return _bounded(policy.cpu_weight * cpu_norm + policy.memory_weight * memory_norm
+                    + policy.latency_weight * latency_norm + policy.anomaly_weight * anomaly_norm)
+
+
+def _severity_array(policy: ResolutionPolicy, cpu_usage: np.ndarray, memory_usage: np.ndarray,
+                    response_time: np.ndarray, anomaly_score: np.ndarray) -> np.ndarray:
+    cpu_norm = _bounded_array(cpu_usage / policy.cpu_scale)
+    memory_norm = _bounded_array(memory_usage / policy.memory_scale)
+    latency_norm = _bounded_array(response_time / policy.latency_scale)
+    anomaly_norm = _bounded_array((np.abs(anomaly_score) + policy.anomaly_offset) / policy.anomaly_scale)
+    return _bounded_array(policy.cpu_weight * cpu_norm + policy.memory_weight * memory_norm
+                          + policy.latency_weight * latency_norm + policy.anomaly_weight * anomaly_norm)
+
+
+def severity_score(cpu_usage: float, memory_usage: float, response_time: float, anomaly_score: float,
+                   policy: Optional[ResolutionPolicy] = None) -> float:
+    """Incident severity in [0, 1] from the policy's severity weights."""
+    return _severity_score(policy or load_policy(), cpu_usage, memory_usage, response_time, anomaly_score)
+
+
+def severity_array(cpu_usage, memory_usage, response_time, anomaly_score,
+                   policy: Optional[ResolutionPolicy] = None) -> np.ndarray:
+    """severity_score() for whole columns at once."""
+    return _severity_array(policy or load_policy(),
+                           np.asarray(cpu_usage, dtype=np.float64), np.asarray(memory_usage, dtype=np.float64),
+                           np.asarray(response_time, dtype=np.float64), np.asarray(anomaly_score, dtype=np.float64))
+
+
+def recommend_action(root_cause: str, policy: Optional[ResolutionPolicy] = None) -> str:
+    """Operator action for a predicted root cause."""
+    policy = policy or load_policy()
+    return policy.actions[policy.action_index.get(root_cause, len(policy.actions) - 1)]
+
+
+def recommend_action_batch(root_cause, policy: Optional[ResolutionPolicy] = None) -> pd.Categorical:
+    """recommend_action() for a whole column, as a Categorical."""
+    policy = policy or load_policy()
+    codes, uniques = pd.factorize(np.asarray(root_cause, dtype=object))
+    default = len(policy.actions) - 1
+    unique_index = np.array([policy.action_index.get(root, default) for root in uniques] + [default],
+                            dtype=np.intp)
+    return pd.Categorical.from_codes(policy.action_codes[unique_index[codes]], policy.action_categories)
 
 
 def recommend_resolution(
@@ -33,47 +220,85 @@ def recommend_resolution(
     anomaly_score: float,
     failure_probability: float,
     anomaly_label: int,
+    policy: Optional[ResolutionPolicy] = None,
 ) -> Dict[str, Any]:
     """Generate automatic remediation suggestion for anomaly rows."""
-    if anomaly_label != 1 and failure_probability < 0.5:
-        return ResolutionPlan(
-            auto_resolution="No automated action required",
-            resolution_playbook="Observe only; continue normal monitoring.",
-            resolution_confidence=0.20,
-            can_auto_execute=False,
-        ).__dict__
+    policy = policy or load_policy()
+    if anomaly_label != policy.observe_label and failure_probability < policy.observe_probability:
+        return dict(policy.observe_plan.__dict__)
 
-    severity = _severity_score(cpu_usage, memory_usage, response_time, anomaly_score)
+    severity = _severity_score(policy, cpu_usage, memory_usage, response_time, anomaly_score)
 
     root = (root_cause or "NORMAL").upper()
+    i = policy.plan_index.get(root, policy.default_index)
 
-    if root == "CPU_OVERLOAD":
-        plan = ResolutionPlan(
-            auto_resolution="Auto-scale compute tier and restart hottest service",
-            resolution_playbook="1) Increase replica count by +2; 2) Restart top-CPU pod/service; 3) Rebalance traffic.",
-            resolution_confidence=_bounded(0.55 + 0.35 * severity + 0.10 * failure_probability),
-            can_auto_execute=severity >= 0.60,
-        )
-    elif root == "MEMORY_LEAK":
-        plan = ResolutionPlan(
-            auto_resolution="Roll restart memory-leaking service and cap memory",
-            resolution_playbook="1) Trigger rolling restart; 2) Apply memory limit policy; 3) Enable heap diagnostics.",
-            resolution_confidence=_bounded(0.58 + 0.30 * severity + 0.12 * failure_probability),
-            can_auto_execute=severity >= 0.58,
-        )
-    elif root == "LATENCY_SPIKE":
-        plan = ResolutionPlan(
-            auto_resolution="Shift traffic and reset high-latency upstream",
-            resolution_playbook="1) Shift 20% traffic to healthy pool; 2) Flush connection pool; 3) Warm cache layer.",
-            resolution_confidence=_bounded(0.50 + 0.32 * severity + 0.10 * failure_probability),
-            can_auto_execute=severity >= 0.62,
-        )
-    else:
-        plan = ResolutionPlan(
-            auto_resolution="Run safe remediation workflow",
-            resolution_playbook="1) Capture diagnostics; 2) Restart impacted component; 3) Escalate if no recovery in 5 min.",
-            resolution_confidence=_bounded(0.45 + 0.25 * severity + 0.08 * failure_probability),
-            can_auto_execute=severity >= 0.68,
-        )
+    plan = ResolutionPlan(
+        auto_resolution=policy.auto_resolutions[i],
+        resolution_playbook=policy.playbooks[i],
+        resolution_confidence=_bounded(
+            float(policy.base_confidence[i]) + float(policy.severity_weight[i]) * severity
+            + float(policy.probability_weight[i]) * failure_probability
+        ),
+        can_auto_execute=severity >= float(policy.auto_execute_severity[i]),
+    )
 
     return plan.__dict__
+
+
+def _plan_index(policy: ResolutionPolicy, root_cause) -> np.ndarray:
+    """Plan index of every root cause, upper-casing each distinct value once"""
+    codes, uniques = pd.factorize(np.asarray(root_cause, dtype=object))
+    unique_index = np.array(
+        [policy.plan_index.get(str(root).upper(), policy.default_index) for root in uniques]
+        + [policy.default_index],
+        dtype=np.intp,
+    )
+    # Missing root causes (code -1) take the last entry: the default plan
+    return unique_index[codes]
+
+
+def recommend_resolution_batch(
+    root_cause,
+    cpu_usage,
+    memory_usage,
+    response_time,
+    anomaly_score,
+    failure_probability,
+    anomaly_label,
+    policy: Optional[ResolutionPolicy] = None,
+) -> Dict[str, Any]:
+    """
+    recommend_resolution() for whole columns at once.
+
+    Every argument is an array-like of the same length. Returns the same
+    four keys as recommend_resolution(): auto_resolution and
+    resolution_playbook as pandas Categoricals (one small dictionary of
+    plan texts plus int8 codes), resolution_confidence as float64 and
+    can_auto_execute as bool arrays.
+    """
+    policy = policy or load_policy()
+    cpu_usage = np.asarray(cpu_usage, dtype=np.float64)
+    memory_usage = np.asarray(memory_usage, dtype=np.float64)
+    response_time = np.asarray(response_time, dtype=np.float64)
+    anomaly_score = np.asarray(anomaly_score, dtype=np.float64)
+    failure_probability = np.asarray(failure_probability, dtype=np.float64)
+    anomaly_label = np.asarray(anomaly_label)
+
+    plan = _plan_index(policy, root_cause)
+    observe = (anomaly_label != policy.observe_label) & (failure_probability < policy.observe_probability)
+    plan[observe] = 0
+
+    severity = _severity_array(policy, cpu_usage, memory_usage, response_time, anomaly_score)
+    confidence = _bounded_array(policy.base_confidence[plan] + policy.severity_weight[plan] * severity
+                                + policy.probability_weight[plan] * failure_probability)
+    confidence[observe] = policy.observe_confidence
+    can_auto_execute = (severity >= policy.auto_execute_severity[plan]) & ~observe
+
+    return {
+        "auto_resolution": pd.Categorical.from_codes(
+            policy.auto_resolution_codes[plan], policy.auto_resolution_categories),
+        "resolution_playbook": pd.Categorical.from_codes(
+            policy.playbook_codes[plan], policy.playbook_categories),
+        "resolution_confidence": confidence,
+        "can_auto_execute": can_auto_execute,
+    }
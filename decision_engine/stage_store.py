@@ -0,0 +1,494 @@
+"""
+Storage for the pipeline stage outputs (CSV or date-partitioned Parquet)
+
+Every stage keeps its CSV path (data/raw/cloud_metrics.csv,
+data/processed/metrics_features.csv, ...) as its name. With
+AIOPS_STAGE_FORMAT=parquet (or fmt="parquet") the same stage is stored as
+a Parquet dataset in a directory next to it, without the .csv suffix,
+hive-partitioned by day and optionally by a series column:
+
+    data/processed/final_decision_output/
+        _stage.json
+        date=2025-01-01/part-0.parquet
+        date=2025-01-02/part-0.parquet
+
+Readers given a time range or column filters only open the partitions
+and row groups that can match. CSV remains the default and reads and
+writes exactly as before. Parquet needs pyarrow.
+
+Usage (convert existing CSV stages to Parquet datasets, or merge the
+small files appends leave in each partition, e.g. from cron):
+    python decision_engine/stage_store.py convert [--series-column host]
+    python decision_engine/stage_store.py compact
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional; only the parquet format needs it
+    pa = ds = pq = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CSV = "csv"
+PARQUET = "parquet"
+
+# Stage outputs, in pipeline order
+STAGE_FILES = {
+    "cloud_metrics": os.path.join(BASE_DIR, "data", "raw", "cloud_metrics.csv"),
+    "metrics_features": os.path.join(BASE_DIR, "data", "processed", "metrics_features.csv"),
+    "anomaly_output": os.path.join(BASE_DIR, "data", "processed", "anomaly_output.csv"),
+    "final_decision_output": os.path.join(BASE_DIR, "data", "processed", "final_decision_output.csv"),
+}
+
+TIMESTAMP_COLUMN = "timestamp"
+# Partition keys are written as extra columns so stored columns keep their types
+DATE_KEY = "date"
+SERIES_KEY = "series"
+UNKNOWN_DATE = "unknown"
+METADATA_FILE = "_stage.json"
+# compact_stage() rewrites partitions that have collected this many files
+COMPACT_MIN_FILES = int(os.getenv("AIOPS_STAGE_COMPACT_FILES", "16"))
+
+
+def stage_format(fmt=None):
+    """The storage format to use (argument, else AIOPS_STAGE_FORMAT, else csv)"""
+    fmt = (fmt or os.getenv("AIOPS_STAGE_FORMAT", CSV)).lower()
+    if fmt not in (CSV, PARQUET):
+        raise ValueError(f"unknown stage format: {fmt}")
+    if fmt == PARQUET and pa is None:
+        raise ImportError("the parquet stage format needs pyarrow (pip install pyarrow)")
+    return fmt
+
+
+def dataset_path(csv_path):
+    """Directory of the Parquet dataset for a stage CSV path"""
+    root, ext = os.path.splitext(csv_path)
+    return root if ext.lower() == ".csv" else csv_path + ".parquet"
+
+
+def stage_exists(csv_path, fmt=None):
+    if stage_format(fmt) == PARQUET:
+        return os.path.isfile(os.path.join(dataset_path(csv_path), METADATA_FILE))
+    return os.path.exists(csv_path)
+
+
+def _metadata(directory):
+    with open(os.path.join(directory, METADATA_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _partitioned_table(df, series_column):
+    """Arrow table of df plus the partition key columns"""
+    frame = df.copy()
+    if TIMESTAMP_COLUMN in frame.columns:
+        frame[TIMESTAMP_COLUMN] = pd.to_datetime(frame[TIMESTAMP_COLUMN], errors="coerce")
+        frame[DATE_KEY] = frame[TIMESTAMP_COLUMN].dt.strftime("%Y-%m-%d").fillna(UNKNOWN_DATE)
+    else:
+        frame[DATE_KEY] = UNKNOWN_DATE
+    if series_column:
+        frame[SERIES_KEY] = frame[series_column].astype(str)
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def _partitioning(series_column):
+    fields = [pa.field(DATE_KEY, pa.string())]
+    if series_column:
+        fields.append(pa.field(SERIES_KEY, pa.string()))
+    return ds.partitioning(pa.schema(fields), flavor="hive")
+
+
+def _basename():
+    """File name prefix that sorts by write time, so a dataset reads back in write order"""
+    return f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+
+
+def _write_files(table, directory, series_column, basename):
+    ds.write_dataset(
+        table, directory, format="parquet",
+        partitioning=_partitioning(series_column),
+        basename_template=basename + "-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        preserve_order=True,
+    )
+
+
+def write_stage(df, csv_path, fmt=None, series_column=None):
+    """
+    Store a stage output
+
+    Args:
+        df: Stage rows
+        csv_path: Stage CSV path (the Parquet dataset goes next to it)
+        fmt: csv or parquet (default: AIOPS_STAGE_FORMAT)
+        series_column: Also partition by this column (parquet only;
+            default: AIOPS_STAGE_SERIES_COLUMN when the frame has it)
+
+    Returns:
+        The path written
+    """
+    if stage_format(fmt) == CSV:
+        df.to_csv(csv_path, index=False)
+        return csv_path
+
+    series_column = series_column or os.getenv("AIOPS_STAGE_SERIES_COLUMN") or None
+    if series_column and series_column not in df.columns:
+        series_column = None
+    directory = dataset_path(csv_path)
+    parent = os.path.dirname(directory) or "."
+    os.makedirs(parent, exist_ok=True)
+
+    # Written next to the old dataset and swapped in, so readers never see a mix
+    tmp_dir = os.path.join(parent, f".{os.path.basename(directory)}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    _write_files(_partitioned_table(df, series_column), tmp_dir, series_column, _basename())
+    # An empty frame writes no files, but the dataset (its metadata) still exists
+    os.makedirs(tmp_dir, exist_ok=True)
+    with open(os.path.join(tmp_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "columns": list(df.columns),
+            "series_column": series_column,
+            "written_at": datetime.now().isoformat(),
+        }, f, indent=2)
+
+    old_dir = None
+    if os.path.exists(directory):
+        old_dir = os.path.join(parent, f".{os.path.basename(directory)}.old-{os.getpid()}")
+        os.rename(directory, old_dir)
+    os.rename(tmp_dir, directory)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return directory
+
+
+def append_stage(df, csv_path, fmt=None):
+    """
+    Append rows to an existing stage output (new files in the touched partitions)
+    """
+    if stage_format(fmt) == CSV:
+        exists = os.path.exists(csv_path)
+        df.to_csv(csv_path, mode="a" if exists else "w", header=not exists, index=False)
+        return csv_path
+    directory = dataset_path(csv_path)
+    if not os.path.exists(os.path.join(directory, METADATA_FILE)):
+        return write_stage(df, csv_path, fmt=PARQUET)
+    metadata = _metadata(directory)
+    frame = df.reindex(columns=metadata["columns"])
+    _write_files(_partitioned_table(frame, metadata["series_column"]), directory,
+                 metadata["series_column"], _basename())
+    return directory
+
+
+def _dataset(directory):
+    metadata = _metadata(directory)
+    return ds.dataset(directory, format="parquet",
+                      partitioning=_partitioning(metadata["series_column"])), metadata
+
+
+def _day(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _filter_expression(start, end, filters, series=None):
+    expression = None
+
+    def both(condition):
+        return condition if expression is None else expression & condition
+
+    # Day partitions prune whole directories; the timestamp bounds then
+    # skip row groups by their statistics and drop the remaining rows
+    if start is not None:
+        expression = both((ds.field(DATE_KEY) >= _day(start)) &
+                          (ds.field(TIMESTAMP_COLUMN) >= pa.scalar(pd.Timestamp(start).to_pydatetime())))
+    if end is not None:
+        expression = both((ds.field(DATE_KEY) <= _day(end)) &
+                          (ds.field(TIMESTAMP_COLUMN) <= pa.scalar(pd.Timestamp(end).to_pydatetime())))
+    if series is not None:
+        expression = both(ds.field(SERIES_KEY) == str(series))
+    for column, value in (filters or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            expression = both(ds.field(column).isin(list(value)))
+        else:
+            expression = both(ds.field(column) == value)
+    return expression
+
+
+def read_stage(csv_path, fmt=None, start=None, end=None, columns=None, filters=None, days=None):
+    """
+    Load a stage output, optionally only a time range and matching rows
+
+    Args:
+        csv_path: Stage CSV path
+        fmt: csv or parquet (default: AIOPS_STAGE_FORMAT)
+        start, end: Inclusive timestamp bounds
+        columns: Columns to load (default: all)
+        filters: Dict of column -> value or list of values (equality / isin)
+        days: Only these day partitions ("YYYY-MM-DD"; parquet only)
+
+    Returns:
+        DataFrame. CSV stages are read whole and then filtered; Parquet
+        stages only read the partitions and row groups that can match.
+    """
+    if stage_format(fmt) == CSV:
+        df = pd.read_csv(csv_path)
+        if start is not None or end is not None:
+            stamps = pd.to_datetime(df[TIMESTAMP_COLUMN], errors="coerce")
+            keep = pd.Series(True, index=df.index)
+            if start is not None:
+                keep &= stamps >= pd.Timestamp(start)
+            if end is not None:
+                keep &= stamps <= pd.Timestamp(end)
+            df = df[keep]
+        for column, value in (filters or {}).items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            df = df[df[column].isin(values)]
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+        return df.reset_index(drop=True)
+
+    dataset, metadata = _dataset(dataset_path(csv_path))
+    if not dataset.files:
+        columns = [c for c in (columns or metadata["columns"]) if c in metadata["columns"]]
+        return pd.DataFrame(columns=columns)
+    expression = _filter_expression(start, end, filters)
+    if days is not None:
+        day_filter = ds.field(DATE_KEY).isin(list(days))
+        expression = day_filter if expression is None else expression & day_filter
+    wanted = [c for c in (columns or metadata["columns"]) if c in metadata["columns"]]
+    table = dataset.to_table(columns=wanted, filter=expression)
+    return table.to_pandas()
+
+
+def stage_days(csv_path):
+    """Day partitions of a Parquet stage, oldest first (from the directory names)"""
+    directory = dataset_path(csv_path)
+    prefix = DATE_KEY + "="
+    return sorted(
+        name[len(prefix):] for name in os.listdir(directory)
+        if name.startswith(prefix) and name != prefix + UNKNOWN_DATE
+    )
+
+
+def count_stage_rows(csv_path, fmt=None, filters=None):
+    """Row count (Parquet answers from the file footers)"""
+    if stage_format(fmt) == CSV:
+        return len(read_stage(csv_path, CSV, filters=filters))
+    dataset, _ = _dataset(dataset_path(csv_path))
+    if not dataset.files:
+        return 0
+    return dataset.count_rows(filter=_filter_expression(None, None, filters))
+
+
+def read_recent(csv_path, n_days, fmt=None, columns=None):
+    """
+    The rows of the newest n_days day partitions (a CSV stage is read whole)
+
+    For callers that only need recent history, such as priming state at
+    startup, so they do not read the whole dataset.
+    """
+    if stage_format(fmt) == CSV:
+        return read_stage(csv_path, CSV, columns=columns)
+    return read_stage(csv_path, PARQUET, columns=columns, days=stage_days(csv_path)[-n_days:])
+
+
+def compact_stage(csv_path, min_files=COMPACT_MIN_FILES, days=None):
+    """
+    Rewrite every partition of a Parquet stage that holds min_files or more
+    files as one file, rows in read order
+
+    Small appends (one file per append and partition) otherwise pile up,
+    and every read and row count opens each file's footer. The compacted
+    file is written under a hidden name and renamed in before the old files
+    are removed, so another process reading at that moment can see the
+    partition's rows twice; readers in the writing process hold its lock.
+
+    Args:
+        csv_path: Stage CSV path
+        min_files: Only compact partitions with at least this many files
+        days: Only these day partitions ("YYYY-MM-DD"; default: all)
+
+    Returns:
+        Number of partitions compacted
+    """
+    directory = dataset_path(csv_path)
+    wanted = None if days is None else {f"{DATE_KEY}={day}" for day in days}
+    compacted = 0
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith((".", "_")))
+        parts = sorted(name for name in files if name.endswith(".parquet") and not name.startswith((".", "_")))
+        relative = os.path.relpath(root, directory).split(os.sep)
+        if len(parts) < max(min_files, 2) or (wanted is not None and relative[0] not in wanted):
+            continue
+        table = pa.concat_tables([pq.read_table(os.path.join(root, name)) for name in parts],
+                                 promote_options="default")
+        name = _basename() + "-0.parquet"
+        tmp_path = os.path.join(root, "." + name)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(root, name))
+        for old in parts:
+            os.remove(os.path.join(root, old))
+        compacted += 1
+    return compacted
+
+
+def stage_size_bytes(csv_path, fmt=None):
+    """Bytes on disk of a stage output"""
+    if stage_format(fmt) == CSV:
+        return os.path.getsize(csv_path)
+    total = 0
+    for root, _, files in os.walk(dataset_path(csv_path)):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+# -------------------------------
+# CSV BYTE RANGES (streaming, parallel and incremental runs over CSV stages)
+# -------------------------------
+class ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file"""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._left = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._left)
+        if size <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:size])
+        self._left -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def read_header(path):
+    """(column names, byte offset of the first data row)"""
+    with open(path, "rb") as f:
+        header = f.readline()
+        return header.decode("utf-8").rstrip("\r\n").split(","), f.tell()
+
+
+def split_ranges(path, n_ranges, start=None, end=None):
+    """
+    Cut a CSV into byte ranges that start and end on line boundaries
+
+    Args:
+        path: CSV file
+        n_ranges: Number of ranges wanted
+        start: First byte to cover, on a line boundary (default: after the header)
+        end: Byte after the last one to cover, on a line boundary (default: end of file)
+
+    Returns:
+        (header columns, list of (start, end) byte offsets)
+    """
+    columns, data_start = read_header(path)
+    data_start = data_start if start is None else start
+    end = os.path.getsize(path) if end is None else end
+    with open(path, "rb") as f:
+        bounds = [data_start]
+        for i in range(1, n_ranges):
+            target = data_start + (end - data_start) * i // n_ranges
+            f.seek(max(target - 1, data_start))
+            f.readline()
+            bounds.append(min(max(f.tell(), bounds[-1]), end))
+        bounds.append(end)
+    ranges = [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+    return columns, ranges
+
+
+def complete_end(path):
+    """Offset just past the last newline, so a row still being appended is left for the next run"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        position = size
+        while position > 0:
+            block = min(1 << 16, position)
+            f.seek(position - block)
+            data = f.read(block)
+            newline = data.rfind(b"\n")
+            if newline >= 0:
+                return position - block + newline + 1
+            position -= block
+    return 0
+
+
+def rows_before(path, offset, n_rows, data_start):
+    """Offset of the first of the n_rows lines that end at `offset` (data_start when there are fewer)"""
+    with open(path, "rb") as f:
+        position = offset
+        newlines = 0
+        while position > data_start:
+            block = min(1 << 16, position - data_start)
+            f.seek(position - block)
+            data = f.read(block)
+            stop = len(data)
+            while True:
+                newline = data.rfind(b"\n", 0, stop)
+                if newline < 0:
+                    break
+                # The first newline ends the last of the n_rows lines; n_rows + 1 ends the line before them
+                newlines += 1
+                if newlines > n_rows:
+                    return position - block + newline + 1
+                stop = newline
+            position -= block
+    return data_start
+
+
+def line_digest(path, end):
+    """sha256 of the line ending at byte `end` (identifies the last processed row)"""
+    with open(path, "rb") as f:
+        f.seek(max(0, end - (1 << 16)))
+        data = f.read(end - f.tell())
+    line = data[data.rfind(b"\n", 0, len(data) - 1) + 1:]
+    return hashlib.sha256(line).hexdigest()
+
+
+def first_row_digest(path, data_start):
+    """sha256 of the first data row (catches a regenerated input of the same length)"""
+    with open(path, "rb") as f:
+        f.seek(data_start)
+        return hashlib.sha256(f.readline()).hexdigest()
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ("convert", "compact"):
+        print(__doc__)
+        return 1
+    if argv[1] == "compact":
+        for name, path in STAGE_FILES.items():
+            if stage_exists(path, PARQUET):
+                print(f"✅ {name}: compacted {compact_stage(path, min_files=2)} partitions")
+        return 0
+    series_column = argv[argv.index("--series-column") + 1] if "--series-column" in argv else None
+    for name, path in STAGE_FILES.items():
+        if not os.path.exists(path):
+            print(f"⚠️ Skipping {name}: {path} not found")
+            continue
+        output = write_stage(pd.read_csv(path), path, fmt=PARQUET, series_column=series_column)
+        print(f"✅ {name}: {os.path.getsize(path) / 2**20:.2f}MB CSV -> "
+              f"{stage_size_bytes(path, PARQUET) / 2**20:.2f}MB Parquet ({output})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 import joblib
 from sklearn.ensemble import IsolationForest
@@ -13,13 +14,17 @@ INPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "metrics_features.csv")
 OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "anomaly_output.csv")
 MODEL_FILE = os.path.join(BASE_DIR, "models", "isolation_forest.pkl")
 
+# Stage storage (CSV, or Parquet with AIOPS_STAGE_FORMAT=parquet)
+sys.path.append(BASE_DIR)
+from decision_engine.stage_store import read_stage, write_stage
+
 # Ensure folders exist
 os.makedirs(os.path.dirname(MODEL_FILE), exist_ok=True)
 
 # -------------------------------
 # LOAD DATA
 # -------------------------------
-df = pd.read_csv(INPUT_FILE)
+df = read_stage(INPUT_FILE)
 
 print("✅ Loaded processed dataset:", df.shape)
 print(df.head(2))
@@ -71,13 +76,13 @@ df["anomaly_score"] = model.decision_function(X_scaled)
 # -------------------------------
 # SAVE RESULTS + MODEL
 # -------------------------------
-df.to_csv(OUTPUT_FILE, index=False)
+saved_to = write_stage(df, OUTPUT_FILE)
 
 # Save model + scaler together
 joblib.dump({"model": model, "scaler": scaler, "features": feature_cols}, MODEL_FILE)
 
 print("\n✅ Anomaly Detection Completed!")
-print("📁 Output saved to:", OUTPUT_FILE)
+print("📁 Output saved to:", saved_to)
 print("💾 Model saved to:", MODEL_FILE)
 
 print("\n📌 Anomaly distribution:")
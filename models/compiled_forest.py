@@ -0,0 +1,257 @@
+"""
+Compiled tree-ensemble inference
+
+A fitted RandomForestClassifier or IsolationForest is flattened into a
+few packed NumPy arrays (children, split feature, threshold, leaf values)
+holding every tree of the forest. Small batches walk all trees for all
+rows at once, one vectorized step per tree level, so scoring a single row
+costs a handful of NumPy calls instead of one Python dispatch per tree.
+Large batches, where per-element NumPy work would dominate, run each
+tree's compiled apply() and gather from the same packed leaf tables,
+skipping sklearn's per-tree validation and dispatch.
+
+Results are bit-identical to scikit-learn: splits compare the float32
+input against the float64 thresholds exactly as the Cython tree does, and
+per-tree outputs are summed sequentially in tree order before the same
+final arithmetic.
+
+Usage (writes <model>.compiled.pkl next to each model):
+    python models/compiled_forest.py
+"""
+import os
+import sys
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest, RandomForestClassifier
+from sklearn.ensemble._iforest import _average_path_length
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_FILES = {
+    "anomaly": os.path.join(BASE_DIR, "models", "isolation_forest.pkl"),
+    "prediction": os.path.join(BASE_DIR, "models", "incident_prediction_model.pkl"),
+    "root_cause": os.path.join(BASE_DIR, "models", "root_cause_model.pkl"),
+}
+
+# Batches with at least this many rows are scored tree by tree
+LARGE_BATCH_ROWS = 64
+
+
+def compiled_path(model_path):
+    return os.path.splitext(model_path)[0] + ".compiled.pkl"
+
+
+class PackedTrees:
+    """All trees of a forest in flat node arrays, indexed by global node id"""
+
+    def __init__(self, trees, feature_maps=None):
+        """
+        Args:
+            trees: sklearn Tree objects (estimator.tree_)
+            feature_maps: Per-tree arrays mapping tree features to input columns
+        """
+        counts = [tree.node_count for tree in trees]
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.intp)
+        self.roots = offsets[:-1].copy()
+        # Kept for the large-batch path
+        self.tree_objects = list(trees)
+        self.feature_maps = None if feature_maps is None else [np.asarray(f) for f in feature_maps]
+
+        left, right, feature, threshold, missing_left = [], [], [], [], []
+        for i, tree in enumerate(trees):
+            leaf = tree.children_left == -1
+            offset = offsets[i]
+            left.append(np.where(leaf, -1, tree.children_left + offset))
+            right.append(np.where(leaf, -1, tree.children_right + offset))
+            tree_feature = np.where(leaf, 0, tree.feature)
+            if feature_maps is not None:
+                tree_feature = np.asarray(feature_maps[i])[tree_feature]
+            feature.append(tree_feature)
+            threshold.append(tree.threshold)
+            missing = getattr(tree, "missing_go_to_left", None)
+            missing_left.append(np.zeros(tree.node_count, dtype=bool) if missing is None
+                                else np.asarray(missing, dtype=bool))
+
+        index_type = np.int32 if offsets[-1] < 2 ** 31 else np.intp
+        # children[2 * node] is the left child, children[2 * node + 1] the right
+        self.children = np.stack([np.concatenate(left), np.concatenate(right)], axis=1) \
+            .ravel().astype(index_type)
+        self.feature = np.concatenate(feature).astype(index_type)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.missing_left = np.concatenate(missing_left)
+        self.is_leaf = self.children[0::2] == -1
+        self.roots = self.roots.astype(index_type)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """
+        Leaf reached in every tree by every row
+
+        Args:
+            X: float32 array of shape (n_samples, n_features), C-contiguous
+
+        Returns:
+            Global leaf ids of shape (n_samples, n_trees)
+        """
+        roots = self.roots
+        n_samples, n_features = X.shape
+        nodes = np.tile(roots, n_samples)
+        row_start = np.repeat(np.arange(n_samples, dtype=np.intp) * n_features, len(roots))
+        flat_X = X.ravel()
+
+        # Only (row, tree) pairs still at an internal node take the next step
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            node = nodes[active]
+            value = flat_X[row_start[active] + self.feature[node]]
+            # float32 value vs float64 threshold, as in the Cython tree
+            go_right = ~(value <= self.threshold[node])
+            missing = np.isnan(value)
+            if missing.any():
+                go_right[missing] = ~self.missing_left[node[missing]]
+            node = self.children[2 * node + go_right]
+            nodes[active] = node
+            active = active[~self.is_leaf[node]]
+        return nodes.reshape(n_samples, len(roots))
+
+    def sum_leaf_values(self, X, table):
+        """
+        Per-row sum over all trees of table[leaf], added in tree order
+
+        Args:
+            X: float32 array of shape (n_samples, n_features), C-contiguous
+            table: Per-node values, shape (n_nodes,) or (n_nodes, k)
+
+        Returns:
+            Array of shape (n_samples,) or (n_samples, k)
+        """
+        n_samples = X.shape[0]
+        if n_samples < LARGE_BATCH_ROWS:
+            # cumsum adds tree by tree, in the order sklearn accumulates them
+            return np.cumsum(table[self.apply(X)], axis=1)[:, -1]
+
+        total = np.zeros((n_samples,) + table.shape[1:], dtype=np.float64)
+        for i, tree in enumerate(self.tree_objects):
+            X_tree = X if self.feature_maps is None else np.ascontiguousarray(X[:, self.feature_maps[i]])
+            total += table[tree.apply(X_tree) + self.roots[i]]
+        return total
+
+
+class _CompiledModel:
+    """Input handling shared by the compiled models"""
+
+    feature_names_in_ = None
+
+    def _validate(self, X):
+        if self.feature_names_in_ is not None and hasattr(X, "columns"):
+            X = X[list(self.feature_names_in_)]
+        # Trees split on float32 inputs; the copy is skipped when X already is one
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, expected {self.n_features_in_}")
+        return X
+
+
+class CompiledForestClassifier(_CompiledModel):
+    """Drop-in predict/predict_proba for a fitted RandomForestClassifier"""
+
+    def __init__(self, model):
+        if not isinstance(model, RandomForestClassifier) or model.n_outputs_ != 1:
+            raise ValueError("expected a fitted single-output RandomForestClassifier")
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        self.trees = PackedTrees(trees)
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        self.feature_names_in_ = getattr(model, "feature_names_in_", None)
+        # Tree.predict returns value[leaf, 0, :n_classes] (class fractions)
+        self.values = np.concatenate(
+            [tree.value[:, 0, :model.n_classes_] for tree in trees]).astype(np.float64)
+
+    def predict_proba(self, X):
+        proba = self.trees.sum_leaf_values(self._validate(X), self.values)
+        proba /= self.trees.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def predict_with_proba(self, X):
+        """Labels and probabilities from one traversal"""
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0), proba
+
+
+class CompiledIsolationForest(_CompiledModel):
+    """Drop-in score_samples/decision_function/predict for a fitted IsolationForest"""
+
+    def __init__(self, model):
+        if not isinstance(model, IsolationForest):
+            raise ValueError("expected a fitted IsolationForest")
+        self.n_features_in_ = model.n_features_in_
+        self.feature_names_in_ = getattr(model, "feature_names_in_", None)
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        # Trees only see their feature subset when features were subsampled
+        feature_maps = None
+        if model._max_features != model.n_features_in_:
+            feature_maps = model.estimators_features_
+        self.trees = PackedTrees(trees, feature_maps)
+        # Path length credited to a sample ending in each node
+        self.path_lengths = np.concatenate([
+            decision_lengths + average_lengths - 1.0
+            for decision_lengths, average_lengths in zip(
+                model._decision_path_lengths, model._average_path_length_per_tree)
+        ])
+        self.denominator = len(model.estimators_) * _average_path_length([model._max_samples])
+        self.offset_ = model.offset_
+
+    def score_samples(self, X):
+        depths = self.trees.sum_leaf_values(self._validate(X), self.path_lengths)
+        scores = 2 ** (
+            -np.divide(depths, self.denominator, out=np.ones_like(depths),
+                       where=self.denominator != 0)
+        )
+        return -scores
+
+    def decision_function(self, X):
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X):
+        is_inlier = np.ones(len(X) if np.ndim(X) > 1 else 1, dtype=int)
+        is_inlier[self.decision_function(X) < 0] = -1
+        return is_inlier
+
+
+def compile_model(model):
+    """Compiled counterpart of a fitted RandomForestClassifier or IsolationForest"""
+    if isinstance(model, IsolationForest):
+        return CompiledIsolationForest(model)
+    return CompiledForestClassifier(model)
+
+
+def compile_bundle(model_path, output_path=None):
+    """Compile the model in a joblib bundle; other bundle keys are kept as they are"""
+    bundle = joblib.load(model_path)
+    compiled = dict(bundle)
+    compiled["model"] = compile_model(bundle["model"])
+    output_path = output_path or compiled_path(model_path)
+    joblib.dump(compiled, output_path)
+    return output_path
+
+
+def main():
+    for name, path in MODEL_FILES.items():
+        if not os.path.exists(path):
+            print(f"⚠️ Skipping {name}: {path} not found")
+            continue
+        output = compile_bundle(path)
+        print(f"✅ Compiled {name} model -> {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
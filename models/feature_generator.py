@@ -0,0 +1,168 @@
+"""
+Single-pass, multi-window feature generator
+
+Computes the engineered metric features of scripts/feature_engineering.py
+(rolling mean and std, change, lags) for any set of windows from one
+contiguous float64 block of raw metrics, into one preallocated array.
+
+Rolling statistics are built by doubling: level k holds, for every row,
+the sum and the sum of squared deviations (M2) of the 2**k rows starting
+there, merged pairwise from level k-1 with the parallel variance update
+(Chan, Golub & LeVeque). A window of w rows is the merge of the levels of
+w's binary digits, so the levels are shared by every window, the cost is
+O(n log w) however wide the window, and M2 avoids the cancellation of a
+sum-of-squares formula. Every value depends only on the rows of its own
+window, so any split of the input (blocks, chunks with halos, appended
+rows) gives bit-identical results.
+"""
+import numpy as np
+
+# (column prefix, raw metric column), in input column order
+METRICS = [
+    ("cpu", "cpu_usage"),
+    ("memory", "memory_usage"),
+    ("response", "response_time"),
+    ("error", "error_count"),
+]
+RAW_COLUMNS = [column for _, column in METRICS]
+STD_METRICS = ("cpu", "memory", "response")
+LAGS = (1, 2)
+
+DEFAULT_WINDOWS = (5,)
+# Rows computed per block (bounds the scratch memory of the levels)
+BLOCK_ROWS = 1 << 18
+
+
+def parse_windows(text):
+    """'5,15,60' -> (5, 15, 60)"""
+    windows = tuple(int(part) for part in str(text).split(",") if part.strip())
+    return check_windows(windows)
+
+
+def check_windows(windows):
+    windows = tuple(int(w) for w in windows)
+    if not windows or min(windows) < 2 or len(set(windows)) != len(windows):
+        raise ValueError(f"windows must be distinct integers >= 2, got {windows}")
+    return windows
+
+
+def feature_columns(windows=DEFAULT_WINDOWS):
+    """
+    Output column names
+
+    The first window keeps the original names (cpu_ma, cpu_std, ...) in
+    the original order; every further window w appends cpu_ma<w>, ...,
+    cpu_std<w>, ...
+    """
+    windows = check_windows(windows)
+    columns = [f"{prefix}_ma" for prefix, _ in METRICS]
+    columns += [f"{prefix}_std" for prefix in STD_METRICS]
+    columns += [f"{prefix}_change" for prefix, _ in METRICS]
+    columns += [f"{prefix}_lag{lag}" for prefix, _ in METRICS for lag in LAGS]
+    for w in windows[1:]:
+        columns += [f"{prefix}_ma{w}" for prefix, _ in METRICS]
+        columns += [f"{prefix}_std{w}" for prefix in STD_METRICS]
+    return columns
+
+
+def warmup_rows(windows=DEFAULT_WINDOWS):
+    """Leading rows without a full window or lag history (no features for them)"""
+    return max(max(check_windows(windows)) - 1, max(LAGS))
+
+
+def _levels(x, top, with_m2):
+    """[(sums, m2s)] for segment lengths 1, 2, 4, ... 2**top starting at every row"""
+    levels = [(x, np.zeros_like(x) if with_m2 else None)]
+    for k in range(1, top + 1):
+        sums, m2s = levels[-1]
+        half = 1 << (k - 1)
+        n = len(x) - (1 << k) + 1
+        left, right = sums[:n], sums[half:half + n]
+        if not with_m2:
+            levels.append((left + right, None))
+            continue
+        delta = np.subtract(right, left)
+        delta *= 1.0 / half
+        m2 = np.multiply(delta, delta, out=delta)
+        m2 *= half / 2.0
+        m2 += m2s[:n]
+        m2 += m2s[half:half + n]
+        levels.append((left + right, m2))
+    return levels
+
+
+def _window(levels, w, first, count):
+    """(sum, m2) of the w rows ending at rows first .. first+count-1 of the block"""
+    total = m2 = None
+    size = 0
+    offset = first - w + 1
+    for k in range(len(levels) - 1, -1, -1):
+        length = 1 << k
+        if not w & length:
+            continue
+        sums, m2s = levels[k]
+        seg_sum = sums[offset:offset + count]
+        seg_m2 = None if m2s is None else m2s[offset:offset + count]
+        if total is None:
+            total = seg_sum.copy()
+            m2 = None if seg_m2 is None else seg_m2.copy()
+        else:
+            if m2 is not None:
+                delta = np.multiply(seg_sum, 1.0 / length)
+                delta -= total * (1.0 / size)
+                delta *= delta
+                delta *= size * length / (size + length)
+                m2 += seg_m2
+                m2 += delta
+            total += seg_sum
+        size += length
+        offset += length
+    return total, m2
+
+
+def generate_features(values, windows=DEFAULT_WINDOWS, out=None):
+    """
+    Engineered features of raw metric rows
+
+    Args:
+        values: (n, 4) raw metrics in METRICS order (time-ordered)
+        windows: Rolling windows; the first one keeps the original column names
+        out: Preallocated (n - warmup_rows(windows), len(feature_columns(windows)))
+            float64 array to fill (default: a new Fortran-ordered one)
+
+    Returns:
+        out; row i holds the features of input row i + warmup_rows(windows)
+    """
+    windows = check_windows(windows)
+    values = np.asarray(values, dtype=np.float64)
+    warmup = warmup_rows(windows)
+    n_out = max(len(values) - warmup, 0)
+    columns = {name: i for i, name in enumerate(feature_columns(windows))}
+    if out is None:
+        out = np.empty((n_out, len(columns)), dtype=np.float64, order="F")
+    elif out.shape != (n_out, len(columns)):
+        raise ValueError(f"out must have shape {(n_out, len(columns))}, got {out.shape}")
+    top = max(windows).bit_length() - 1
+
+    # Metric-major copy, so every metric is one contiguous row
+    series = np.ascontiguousarray(values.T)
+    for start in range(0, n_out, BLOCK_ROWS):
+        stop = min(n_out, start + BLOCK_ROWS)
+        count = stop - start
+        for m, (prefix, _) in enumerate(METRICS):
+            # Input rows start .. stop + warmup: the block plus its warm-up halo
+            x = series[m, start:stop + warmup]
+            rows = slice(start, stop)
+            np.subtract(x[warmup:], x[warmup - 1:-1], out=out[rows, columns[f"{prefix}_change"]])
+            for lag in LAGS:
+                out[rows, columns[f"{prefix}_lag{lag}"]] = x[warmup - lag:warmup - lag + count]
+
+            levels = _levels(x, top, prefix in STD_METRICS)
+            for i, w in enumerate(windows):
+                suffix = "" if i == 0 else str(w)
+                total, m2 = _window(levels, w, warmup, count)
+                np.divide(total, w, out=out[rows, columns[f"{prefix}_ma{suffix}"]])
+                if prefix in STD_METRICS:
+                    m2 /= w - 1
+                    np.sqrt(m2, out=out[rows, columns[f"{prefix}_std{suffix}"]])
+    return out
@@ -0,0 +1,20 @@
+"""
+Feature columns shared by the models and the decision engine
+"""
+
+# Engineered metric features (scripts/feature_engineering.py)
+BASE_FEATURES = [
+    "cpu_usage", "memory_usage", "response_time", "error_count",
+    "cpu_ma", "memory_ma", "response_ma", "error_ma",
+    "cpu_std", "memory_std", "response_std",
+    "cpu_change", "memory_change", "response_change", "error_change",
+    "cpu_lag1", "cpu_lag2",
+    "memory_lag1", "memory_lag2",
+    "response_lag1", "response_lag2",
+    "error_lag1", "error_lag2"
+]
+
+# Isolation Forest outputs appended for the prediction and root cause models
+ANOMALY_FEATURES = ["anomaly_label", "anomaly_score"]
+
+MODEL_FEATURES = BASE_FEATURES + ANOMALY_FEATURES
@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 import joblib
 
@@ -15,13 +16,17 @@ INPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "anomaly_output.csv")
 OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "prediction_output.csv")
 MODEL_FILE = os.path.join(BASE_DIR, "models", "incident_prediction_model.pkl")
 
+# Stage storage (CSV, or Parquet with AIOPS_STAGE_FORMAT=parquet)
+sys.path.append(BASE_DIR)
+from decision_engine.stage_store import read_stage
+
 # Ensure folders exist
 os.makedirs(os.path.dirname(MODEL_FILE), exist_ok=True)
 
 # -------------------------------
 # LOAD DATA
 # -------------------------------
-df = pd.read_csv(INPUT_FILE)
+df = read_stage(INPUT_FILE)
 
 print("✅ Loaded anomaly dataset:", df.shape)
 print(df.head(2))
@@ -0,0 +1,235 @@
+"""
+Versioned model registry
+
+Each registered version is a directory holding the three model bundles
+and a metadata.json (feature lists, training data hash, metrics):
+
+    models/registry/
+        ACTIVE                      name of the active version
+        v20250101-120000/
+            isolation_forest.pkl
+            incident_prediction_model.pkl
+            root_cause_model.pkl
+            metadata.json
+
+Versions are written to a temporary directory and renamed into place, and
+the ACTIVE pointer is replaced with os.replace, so readers never see a
+half-written version. Bundles are dumped uncompressed so that
+joblib.load(mmap_mode="r") maps their arrays straight from the page
+cache; worker processes loading the same version share those pages.
+
+Usage:
+    python models/registry.py list
+    python models/registry.py import-legacy     # register models/*.pkl
+    python models/registry.py activate <version>
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import joblib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRY_DIR = os.getenv("AIOPS_MODEL_REGISTRY", os.path.join(BASE_DIR, "models", "registry"))
+
+# Bundle name -> file name, shared with the fixed paths used before the registry
+MODEL_FILES = {
+    "anomaly": "isolation_forest.pkl",
+    "prediction": "incident_prediction_model.pkl",
+    "root_cause": "root_cause_model.pkl",
+}
+LEGACY_DIR = os.path.join(BASE_DIR, "models")
+
+ACTIVE_FILE = "ACTIVE"
+METADATA_FILE = "metadata.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def path_sha256(path):
+    """sha256 of a file, or of every file under a directory (names and contents)"""
+    if not os.path.isdir(path):
+        return file_sha256(path)
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+            digest.update(file_sha256(file_path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def load_bundles(directory, mmap_mode="r"):
+    """Load the three model bundles from a directory"""
+    return {
+        name: joblib.load(os.path.join(directory, file_name), mmap_mode=mmap_mode)
+        for name, file_name in MODEL_FILES.items()
+    }
+
+
+class ModelSet:
+    """The three model bundles of one version"""
+
+    def __init__(self, version, metadata, bundles):
+        self.version = version
+        self.metadata = metadata
+        self.bundles = bundles
+
+    def __getitem__(self, name):
+        return self.bundles[name]
+
+
+class ModelRegistry:
+    """Stores, lists, activates and loads model versions"""
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    # Versions
+    def versions(self):
+        """Registered versions, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isfile(self._path(name, METADATA_FILE))
+        )
+
+    def metadata(self, version):
+        with open(self._path(version, METADATA_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def register(self, bundles, metrics=None, data_path=None, note=None, activate=False):
+        """
+        Store a new version
+
+        Args:
+            bundles: Dict with "anomaly", "prediction" and "root_cause" bundles
+            metrics: Evaluation metrics to record
+            data_path: Training data file or dataset directory, hashed into the metadata
+            note: Free-form description
+            activate: Make it the active version
+
+        Returns:
+            The new version name
+        """
+        missing = set(MODEL_FILES) - set(bundles)
+        if missing:
+            raise ValueError(f"missing model bundles: {sorted(missing)}")
+
+        os.makedirs(self.root, exist_ok=True)
+        version = datetime.now().strftime("v%Y%m%d-%H%M%S")
+        suffix = 1
+        while os.path.exists(self._path(version)):
+            suffix += 1
+            version = f"{version.split('.')[0]}.{suffix}"
+
+        tmp_dir = self._path(f".tmp-{version}-{os.getpid()}")
+        os.makedirs(tmp_dir)
+        try:
+            files = {}
+            for name, file_name in MODEL_FILES.items():
+                path = os.path.join(tmp_dir, file_name)
+                # Uncompressed, so the arrays can be memory-mapped on load
+                joblib.dump(bundles[name], path)
+                files[name] = {"file": file_name, "sha256": file_sha256(path)}
+
+            import sklearn
+            metadata = {
+                "version": version,
+                "created_at": datetime.now().isoformat(),
+                "features": {name: list(bundle.get("features", [])) for name, bundle in bundles.items()},
+                "training_data": {
+                    "path": os.path.relpath(data_path, BASE_DIR) if data_path else None,
+                    "sha256": path_sha256(data_path) if data_path else None,
+                },
+                "metrics": metrics or {},
+                "files": files,
+                "sklearn_version": sklearn.__version__,
+                "note": note,
+            }
+            with open(os.path.join(tmp_dir, METADATA_FILE), "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2)
+            os.rename(tmp_dir, self._path(version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+    def import_legacy(self, activate=True):
+        """Register the fixed-path models in models/ as a version"""
+        bundles = load_bundles(LEGACY_DIR, mmap_mode=None)
+        return self.register(bundles, note="imported from models/*.pkl", activate=activate)
+
+    # Active version
+    def active_version(self):
+        try:
+            with open(self._path(ACTIVE_FILE), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def activate(self, version):
+        """Point ACTIVE at a version (atomic rename)"""
+        if version not in self.versions():
+            raise KeyError(f"unknown model version: {version}")
+        tmp_path = self._path(f".{ACTIVE_FILE}.{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, self._path(ACTIVE_FILE))
+
+    # Loading
+    def load(self, version=None, mmap_mode="r"):
+        """
+        Load a version (default: the active one)
+
+        Falls back to the fixed-path models in models/ when nothing has been
+        registered yet; that set has version "legacy".
+        """
+        version = version or self.active_version()
+        if version is None:
+            return ModelSet("legacy", {}, load_bundles(LEGACY_DIR, mmap_mode))
+        return ModelSet(version, self.metadata(version),
+                        load_bundles(self._path(version), mmap_mode))
+
+
+def main(argv):
+    registry = ModelRegistry()
+    command = argv[1] if len(argv) > 1 else "list"
+    if command == "list":
+        active = registry.active_version()
+        for version in registry.versions():
+            metadata = registry.metadata(version)
+            marker = "*" if version == active else " "
+            print(f"{marker} {version}  {metadata.get('created_at', '')}  {metadata.get('metrics', {})}")
+        if not registry.versions():
+            print("No registered versions (loading falls back to models/*.pkl)")
+    elif command == "import-legacy":
+        print(f"✅ Registered and activated {registry.import_legacy()}")
+    elif command == "activate" and len(argv) > 2:
+        registry.activate(argv[2])
+        print(f"✅ Active model version: {argv[2]}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
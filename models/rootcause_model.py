@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 import joblib
 
@@ -15,12 +16,16 @@ INPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "anomaly_output.csv")
 MODEL_FILE = os.path.join(BASE_DIR, "models", "root_cause_model.pkl")
 OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "rootcause_output.csv")
 
+# Stage storage (CSV, or Parquet with AIOPS_STAGE_FORMAT=parquet)
+sys.path.append(BASE_DIR)
+from decision_engine.stage_store import read_stage
+
 os.makedirs(os.path.dirname(MODEL_FILE), exist_ok=True)
 
 # -------------------------------
 # LOAD DATA
 # -------------------------------
-df = pd.read_csv(INPUT_FILE)
+df = read_stage(INPUT_FILE)
 print("✅ Loaded dataset:", df.shape)
 print(df.head(2))
 
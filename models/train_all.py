@@ -0,0 +1,264 @@
+"""
+Train all three models from one feature matrix
+
+Replaces running anomaly_model.py, prediction_model.py and
+rootcause_model.py one after another: the processed features are read
+once into a contiguous float32 matrix (the forests work in float32
+anyway, so fitting on it gives the same trees), the Isolation Forest is trained
+first (its label and score are inputs to the other two), then the
+failure and root cause forests are trained concurrently. Wall time and
+peak memory are reported per stage.
+
+Artifacts and output CSVs are the same files the separate scripts write;
+the output CSVs take their feature values from the float64 dataset, and
+the models are fit with named columns (feature_names_in_), as there.
+
+Usage:
+    python models/train_all.py [--n-jobs -1] [--executor thread|process] [--register]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest, RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from features import BASE_FEATURES, MODEL_FEATURES
+from registry import ModelRegistry
+
+# -------------------------------
+# PATH SETUP
+# -------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "metrics_features.csv")
+ANOMALY_OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "anomaly_output.csv")
+PREDICTION_OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "prediction_output.csv")
+ROOTCAUSE_OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "rootcause_output.csv")
+
+ANOMALY_MODEL_FILE = os.path.join(BASE_DIR, "models", "isolation_forest.pkl")
+PRED_MODEL_FILE = os.path.join(BASE_DIR, "models", "incident_prediction_model.pkl")
+ROOT_MODEL_FILE = os.path.join(BASE_DIR, "models", "root_cause_model.pkl")
+
+# Stage storage (CSV, or Parquet with AIOPS_STAGE_FORMAT=parquet)
+sys.path.append(BASE_DIR)
+from decision_engine.stage_store import PARQUET, dataset_path, read_stage, stage_format, write_stage
+
+# Same hyperparameters as the individual training scripts
+ANOMALY_PARAMS = {"n_estimators": 200, "contamination": 0.15, "random_state": 42}
+PREDICTION_PARAMS = {"n_estimators": 250, "max_depth": None, "random_state": 42, "class_weight": "balanced"}
+ROOTCAUSE_PARAMS = {"n_estimators": 300, "random_state": 42, "class_weight": "balanced"}
+TEST_SIZE = 0.25
+
+
+def _rss_bytes():
+    """Current resident set size (Linux /proc; 0 where unavailable)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class Stage:
+    """Times a stage and records its peak RSS and peak traced allocations"""
+
+    def __init__(self, name, report):
+        self.name = name
+        self.report = report
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(0.01):
+            self.peak_rss = max(self.peak_rss, _rss_bytes())
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.start_rss = self.peak_rss = _rss_bytes()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self._stop.set()
+        self._sampler.join()
+        self.peak_rss = max(self.peak_rss, _rss_bytes())
+        _, traced_peak = tracemalloc.get_traced_memory()
+        self.report.append((self.name, elapsed, self.peak_rss, self.peak_rss - self.start_rss, traced_peak))
+        return False
+
+
+def load_features(path):
+    """Read the processed dataset once; features become a contiguous float32 matrix"""
+    df = read_stage(path)
+    # Room for the two anomaly columns, so no later concatenation copies it
+    X = np.empty((len(df), len(MODEL_FEATURES)), dtype=np.float32)
+    X[:, :len(BASE_FEATURES)] = df[BASE_FEATURES].to_numpy(dtype=np.float32)
+    return df, X
+
+
+def train_anomaly(X_base):
+    """
+    Args:
+        X_base: float64 DataFrame of BASE_FEATURES (the scaler is fit in
+            float64 on named columns, like the standalone script)
+    """
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X_base)
+    model = IsolationForest(**ANOMALY_PARAMS)
+    model.fit(X_scaled)
+    # IsolationForest gives -1 (anomaly) / 1 (normal); lower score = more anomalous
+    scores = model.decision_function(X_scaled)
+    labels = (scores < 0).astype(int)
+    return model, scaler, labels, scores
+
+
+def _named(X):
+    """A float32 matrix as a DataFrame with the MODEL_FEATURES column names"""
+    return pd.DataFrame(X, columns=MODEL_FEATURES, copy=False)
+
+
+def fit_forest(params, X_train, y_train, n_jobs):
+    """Fit one RandomForestClassifier (top level so process pools can run it)"""
+    start = time.perf_counter()
+    model = RandomForestClassifier(n_jobs=n_jobs, **params)
+    # Named columns give the model feature_names_in_; the float32 matrix is not copied
+    model.fit(_named(X_train), y_train)
+    # Trees do not depend on n_jobs; store the model as the scripts did
+    model.n_jobs = None
+    return model, time.perf_counter() - start
+
+
+def evaluate(title, model, X_test, y_test):
+    y_pred = model.predict(_named(X_test))
+    print(f"\n✅ {title}")
+    print("Accuracy:", accuracy_score(y_test, y_pred))
+    print("\nConfusion Matrix:")
+    print(confusion_matrix(y_test, y_pred))
+    print("\nClassification Report:")
+    print(classification_report(y_test, y_pred))
+    return y_pred
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the anomaly, prediction and root cause models")
+    parser.add_argument("--input", default=INPUT_FILE, help="Processed features CSV")
+    parser.add_argument("--n-jobs", type=int, default=-1,
+                        help="Cores for the forests, split between the two (-1: all)")
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread",
+                        help="Run the two forests in threads (shared matrix) or processes")
+    parser.add_argument("--register", action="store_true",
+                        help="Also store the models as a new active registry version")
+    args = parser.parse_args()
+
+    cores = (os.cpu_count() or 1) if args.n_jobs < 0 else max(1, args.n_jobs)
+    jobs_per_forest = max(1, cores // 2)
+
+    tracemalloc.start()
+    report = []
+    wall_start = time.perf_counter()
+
+    with Stage("load features", report):
+        df, X = load_features(args.input)
+    print("✅ Loaded processed dataset:", df.shape)
+
+    with Stage("isolation forest", report):
+        anomaly_model, scaler, labels, scores = train_anomaly(df[BASE_FEATURES])
+        X[:, len(BASE_FEATURES)] = labels
+        X[:, len(BASE_FEATURES) + 1] = scores
+        df["anomaly_label"] = labels
+        df["anomaly_score"] = scores
+    print("\n📌 Anomaly distribution:")
+    print(df["anomaly_label"].value_counts())
+
+    # Row positions are split along, so the output CSVs can take the float64 rows
+    y_failure = df["failure"].to_numpy()
+    Xp_train, Xp_test, yp_train, yp_test, _, p_test_rows = train_test_split(
+        X, y_failure, np.arange(len(df)), test_size=TEST_SIZE, random_state=42, stratify=y_failure
+    )
+
+    incident_mask = y_failure == 1
+    X_incident = X[incident_mask]
+    y_root = df["root_cause"].to_numpy()[incident_mask]
+    Xr_train, Xr_test, yr_train, yr_test, _, r_test_rows = train_test_split(
+        X_incident, y_root, np.flatnonzero(incident_mask), test_size=TEST_SIZE, random_state=42,
+        stratify=y_root
+    )
+    print(f"\n✅ Prediction train/test: {Xp_train.shape} / {Xp_test.shape}")
+    print(f"✅ Root cause train/test: {Xr_train.shape} / {Xr_test.shape}")
+
+    executor_cls = ThreadPoolExecutor if args.executor == "thread" else ProcessPoolExecutor
+    with Stage(f"forests ({args.executor} pool, {jobs_per_forest} jobs each)", report):
+        with executor_cls(max_workers=2) as executor:
+            pred_future = executor.submit(fit_forest, PREDICTION_PARAMS, Xp_train, yp_train, jobs_per_forest)
+            root_future = executor.submit(fit_forest, ROOTCAUSE_PARAMS, Xr_train, yr_train, jobs_per_forest)
+            pred_model, pred_seconds = pred_future.result()
+            root_model, root_seconds = root_future.result()
+    print(f"\n✅ Prediction forest fit in {pred_seconds:.2f}s, root cause forest in {root_seconds:.2f}s")
+
+    with Stage("evaluate + save", report):
+        yp_pred = evaluate("Prediction Model Evaluation:", pred_model, Xp_test, yp_test)
+        yr_pred = evaluate("Root Cause Model Evaluation", root_model, Xr_test, yr_test)
+
+        joblib.dump({"model": anomaly_model, "scaler": scaler, "features": BASE_FEATURES}, ANOMALY_MODEL_FILE)
+        joblib.dump({"model": pred_model, "features": MODEL_FEATURES}, PRED_MODEL_FILE)
+        joblib.dump({"model": root_model, "features": MODEL_FEATURES}, ROOT_MODEL_FILE)
+
+        write_stage(df, ANOMALY_OUTPUT_FILE)
+
+        pred_results = df[MODEL_FEATURES].iloc[p_test_rows].reset_index(drop=True)
+        pred_results["actual_failure"] = yp_test
+        pred_results["predicted_failure"] = yp_pred
+        pred_results["failure_probability"] = pred_model.predict_proba(_named(Xp_test))[:, 1]
+        pred_results.to_csv(PREDICTION_OUTPUT_FILE, index=False)
+
+        root_results = df[MODEL_FEATURES].iloc[r_test_rows].reset_index(drop=True)
+        root_results["actual_root_cause"] = yr_test
+        root_results["predicted_root_cause"] = yr_pred
+        root_results.to_csv(ROOTCAUSE_OUTPUT_FILE, index=False)
+
+        if args.register:
+            version = ModelRegistry().register(
+                {
+                    "anomaly": {"model": anomaly_model, "scaler": scaler, "features": BASE_FEATURES},
+                    "prediction": {"model": pred_model, "features": MODEL_FEATURES},
+                    "root_cause": {"model": root_model, "features": MODEL_FEATURES},
+                },
+                metrics={
+                    "anomaly_rate": float(labels.mean()),
+                    "prediction_accuracy": float(accuracy_score(yp_test, yp_pred)),
+                    "root_cause_accuracy": float(accuracy_score(yr_test, yr_pred)),
+                },
+                data_path=dataset_path(args.input) if stage_format() == PARQUET else args.input,
+                activate=True
+            )
+            print(f"✅ Registered and activated model version {version}")
+
+    wall = time.perf_counter() - wall_start
+    tracemalloc.stop()
+
+    print("\n💾 Models saved to:", os.path.dirname(ANOMALY_MODEL_FILE))
+    print("\n📌 Stage timings and peak memory:")
+    print(f"{'stage':<36} {'seconds':>8} {'peak RSS':>10} {'RSS growth':>11} {'traced peak':>12}")
+    for name, seconds, peak_rss, growth, traced in report:
+        print(f"{name:<36} {seconds:8.2f} {peak_rss / 2**20:8.1f}MB {growth / 2**20:9.1f}MB {traced / 2**20:10.1f}MB")
+    print(f"{'total wall time':<36} {wall:8.2f}")
+    if args.executor == "process":
+        print("(process executor: forest memory is spent in the worker processes, not shown)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Alert lifecycle throughput: one-at-a-time vs bulk operations
+
+Raises and clears N alerts (a simulated incident storm) first with
+create_alert()/close_alert() per alert, then with the bulk
+create_alerts()/upsert_alerts()/close_alerts() calls, and prints alerts
+per second for each. Run it against a local mongod (MONGODB_URI); the
+benchmark alerts are tagged service=alert-bench and removed afterwards.
+
+Usage:
+    python scripts/bench_alerts.py [--alerts 5000] [--batch 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "backend"))
+
+from database.mongodb_connection import AIOpsDatabase
+
+BENCH_SERVICE = "alert-bench"
+
+
+def make_alerts(n, round_no):
+    return [{
+        "service": BENCH_SERVICE,
+        "host": f"host-{i % 200}",
+        "metric": ("cpu_usage", "memory_usage", "response_time")[i % 3],
+        "alert_type": f"storm-{round_no}-{i}",
+        "severity": "high",
+        "message": "threshold exceeded",
+    } for i in range(n)]
+
+
+def timed(label, n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed:8.3f}s {n / elapsed:12,.0f} alerts/s")
+
+
+def batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark alert lifecycle operations")
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    db = AIOpsDatabase()
+    alerts = db.alerts_collection
+    alerts.delete_many({"service": BENCH_SERVICE})
+    n = args.alerts
+    try:
+        ids = []
+        timed("create_alert (per alert)", n,
+              lambda: ids.extend(db.create_alert(a) for a in make_alerts(n, 1)))
+        timed("close_alert (per alert)", n,
+              lambda: [db.close_alert(i) for i in ids])
+
+        ids = []
+        timed(f"create_alerts (batch {args.batch})", n,
+              lambda: [ids.extend(db.create_alerts(b)) for b in batches(make_alerts(n, 2), args.batch)])
+        timed(f"upsert_alerts (batch {args.batch})", n,
+              lambda: [db.upsert_alerts(b) for b in batches(make_alerts(n, 2), args.batch)])
+        timed(f"close_alerts (batch {args.batch})", n,
+              lambda: [db.close_alerts(b) for b in batches(ids, args.batch)])
+
+        db.upsert_alerts(make_alerts(n, 3))
+        start = time.perf_counter()
+        for _ in range(20):
+            db.get_active_alerts(limit=100)
+        per_call = (time.perf_counter() - start) / 20
+        print(f"{'get_active_alerts(limit=100)':<34} {per_call * 1000:8.2f}ms per call")
+        active = alerts.count_documents({"service": BENCH_SERVICE, "status": "active"})
+        print(f"[OK] {active} active benchmark alerts after the final upsert (expected {n})")
+    finally:
+        alerts.delete_many({"service": BENCH_SERVICE})
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
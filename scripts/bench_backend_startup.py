@@ -0,0 +1,51 @@
+"""
+Measure backend import/startup time with and without a reachable MongoDB
+
+Usage:
+    python scripts/bench_backend_startup.py [--runs 3]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(BASE_DIR, "backend")
+
+# Time only the import of backend/app.py (tracker init + CSV load)
+PROBE = (
+    "import time; t0 = time.perf_counter(); import app; "
+    "print('STARTUP_SECONDS', time.perf_counter() - t0)"
+)
+
+SCENARIOS = {
+    "mongodb reachable": os.getenv("MONGODB_URI", "mongodb://localhost:27017/"),
+    "mongodb down": "mongodb://127.0.0.1:1/",
+}
+
+
+def time_startup(uri):
+    env = dict(os.environ, MONGODB_URI=uri)
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    for line in out.splitlines():
+        if line.startswith("STARTUP_SECONDS"):
+            return float(line.split()[1])
+    raise RuntimeError(f"No timing in output:\n{out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<20} {'best (s)':>10} {'mean (s)':>10}")
+    for name, uri in SCENARIOS.items():
+        timings = [time_startup(uri) for _ in range(args.runs)]
+        print(f"{name:<20} {min(timings):>10.3f} {sum(timings) / len(timings):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compiled forest vs scikit-learn: exactness and latency
+
+Loads the three trained models, compiles them with
+models/compiled_forest.py, checks that probabilities, anomaly scores and
+labels are bit-identical to scikit-learn on the processed dataset plus
+perturbed copies of it, then times both engines at batch sizes 1, 32 and
+10,000.
+
+Usage:
+    python scripts/bench_compiled_forest.py [--repeats 20]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "models"))
+
+from compiled_forest import MODEL_FILES, compile_model
+from features import BASE_FEATURES, MODEL_FEATURES
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "processed", "anomaly_output.csv")
+BATCH_SIZES = (1, 32, 10000)
+
+
+def make_inputs(rng, n_rows):
+    """Dataset rows plus noisy copies, so splits are exercised beyond the training data"""
+    df = pd.read_csv(DATA_FILE)
+    X = df[MODEL_FEATURES].to_numpy(dtype=np.float32)
+    picks = rng.integers(0, len(X), n_rows)
+    noisy = X[picks] * rng.normal(1.0, 0.05, (n_rows, X.shape[1])).astype(np.float32)
+    return np.ascontiguousarray(np.vstack([X, noisy]))
+
+
+def in_small_batches(fn, X, size=32):
+    """Score through the small-batch (packed traversal) path"""
+    return np.concatenate([fn(X[i:i + size]) for i in range(0, len(X), size)])
+
+
+def check_identical(name, reference, compiled, X):
+    methods = ("decision_function", "predict") if name == "anomaly" else ("predict_proba", "predict")
+    pairs = []
+    for method in methods:
+        expected = getattr(reference, method)(X)
+        pairs.append((method, expected, getattr(compiled, method)(X)))
+        pairs.append((f"{method} (batches of 32)", expected,
+                      in_small_batches(getattr(compiled, method), X)))
+    ok = True
+    for method, expected, actual in pairs:
+        # array_equal on the raw bytes: no tolerance at all
+        same = expected.shape == actual.shape and expected.dtype == actual.dtype and \
+            expected.tobytes() == actual.tobytes()
+        print(f"{'✅' if same else '❌'} {name}.{method}: {'bit-identical' if same else 'MISMATCH'} on {len(X)} rows")
+        ok &= same
+    return ok
+
+
+def time_call(fn, X, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled forest inference")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    rng = np.random.default_rng(0)
+    X_all = make_inputs(rng, 20000)
+
+    ok = True
+    results = []
+    for name, path in MODEL_FILES.items():
+        bundle = joblib.load(path)
+        reference = bundle["model"]
+        compiled = compile_model(reference)
+        if name == "anomaly":
+            X = np.ascontiguousarray(bundle["scaler"].transform(X_all[:, :len(BASE_FEATURES)]), dtype=np.float32)
+            ref_fn, comp_fn = reference.decision_function, compiled.decision_function
+        else:
+            X = X_all
+            ref_fn, comp_fn = reference.predict_proba, compiled.predict_proba
+        ok &= check_identical(name, reference, compiled, X)
+
+        for batch in BATCH_SIZES:
+            sample = X[rng.integers(0, len(X), batch)]
+            repeats = args.repeats if batch < 10000 else max(3, args.repeats // 5)
+            ref_s = time_call(ref_fn, sample, repeats)
+            comp_s = time_call(comp_fn, sample, repeats)
+            results.append((name, batch, ref_s, comp_s))
+
+    print(f"\n{'model':<12} {'batch':>6} {'sklearn':>12} {'compiled':>12} {'speed-up':>9}")
+    for name, batch, ref_s, comp_s in results:
+        print(f"{name:<12} {batch:>6} {ref_s * 1000:10.3f}ms {comp_s * 1000:10.3f}ms {ref_s / comp_s:8.1f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Decision engine inference: separate model calls vs DecisionPipeline
+
+The "separate" path is what decision_logic.py did before DecisionPipeline:
+three DataFrame selections, predict() and decision_function() on the
+Isolation Forest, predict_proba() and predict() on the failure forest.
+Both paths are checked for identical outputs, then timed on the processed
+dataset tiled to --rows rows, and on small request-sized batches.
+
+Usage:
+    python scripts/bench_decision_pipeline.py [--rows 100000] [--repeats 3]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from decision_engine.pipeline import ALERT_THRESHOLD, OUTPUT_COLUMNS, DecisionPipeline
+from models.features import BASE_FEATURES
+from models.registry import ModelRegistry
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "processed", "metrics_features.csv")
+
+
+def separate_calls(models, df):
+    """The pre-pipeline scoring steps of decision_logic.py"""
+    df = df.copy()
+    anomaly, prediction, root = models["anomaly"], models["prediction"], models["root_cause"]
+    X = df[BASE_FEATURES]
+    X_scaled = anomaly["scaler"].transform(X)
+    df["anomaly_label"] = (anomaly["model"].predict(X_scaled) == -1).astype(int)
+    df["anomaly_score"] = anomaly["model"].decision_function(X_scaled)
+
+    X_pred = df[prediction["features"]]
+    df["failure_probability"] = prediction["model"].predict_proba(X_pred)[:, 1]
+    df["predicted_failure"] = prediction["model"].predict(X_pred)
+
+    df["predicted_root_cause"] = "NORMAL"
+    incident_rows = df[df["predicted_failure"] == 1]
+    if len(incident_rows) > 0:
+        df.loc[df["predicted_failure"] == 1, "predicted_root_cause"] = \
+            root["model"].predict(incident_rows[root["features"]])
+    df["alert_status"] = df["failure_probability"].apply(lambda x: "ALERT" if x >= ALERT_THRESHOLD else "OK")
+    return df
+
+
+def fused_calls(pipeline, df):
+    return pipeline.score_frame(df)
+
+
+def same_outputs(expected, actual):
+    for column in OUTPUT_COLUMNS:
+        a = expected[column].to_numpy()
+        b = actual[column].to_numpy()
+        if a.dtype.kind == "f":
+            if a.tobytes() != b.tobytes():
+                return False, column
+        elif not np.array_equal(a.astype(str), b.astype(str)):
+            return False, column
+    return True, None
+
+
+def time_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fused decision pipeline")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows for the throughput run")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    models = ModelRegistry().load()
+    pipelines = {
+        "pipeline": DecisionPipeline(models),
+        "pipeline+compiled": DecisionPipeline(models, compiled=True),
+    }
+
+    df = pd.read_csv(DATA_FILE)
+    expected = separate_calls(models, df)
+    ok = True
+    for name, pipeline in pipelines.items():
+        same, column = same_outputs(expected, fused_calls(pipeline, df))
+        print(f"{'✅' if same else '❌'} {name}: {'identical' if same else f'MISMATCH in {column}'} on {len(df)} rows")
+        ok &= same
+
+    big = pd.concat([df] * int(np.ceil(args.rows / len(df))), ignore_index=True).iloc[:args.rows]
+    small = df.iloc[:32]
+    print(f"\n{'engine':<20} {'rows':>8} {'seconds':>9} {'rows/s':>12} {'speed-up':>9}")
+    for label, frame, repeats in ((f"{len(big)}", big, args.repeats), ("32", small, args.repeats * 20)):
+        baseline = time_call(lambda: separate_calls(models, frame), repeats)
+        print(f"{'separate calls':<20} {label:>8} {baseline:9.3f} {len(frame) / baseline:12,.0f} {1.0:8.1f}x")
+        for name, pipeline in pipelines.items():
+            seconds = time_call(lambda: fused_calls(pipeline, frame), repeats)
+            print(f"{name:<20} {label:>8} {seconds:9.3f} {len(frame) / seconds:12,.0f} {baseline / seconds:8.1f}x")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Parallel batch scoring: speed-up by worker count
+
+Builds a synthetic engineered-metrics file (the processed dataset tiled
+to --rows rows with a little multiplicative noise on the metric columns),
+runs decision_logic.run_parallel for each worker count, checks every
+output is byte-identical to the single-worker one, and prints the
+speed-up curve. Speed-up is capped by the cores available
+(os.cpu_count() is printed alongside).
+
+Usage:
+    python scripts/bench_decision_workers.py [--rows 10000000] [--workers 1,2,4,8,16]
+                                             [--data /tmp/synthetic_features.csv]
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from decision_engine.decision_logic import DATA_FILE, feature_cols, run_parallel
+from models.registry import ModelRegistry
+
+BLOCK_ROWS = 250000
+
+
+def make_synthetic(path, n_rows, seed=0):
+    """Write n_rows synthetic feature rows block by block (bounded memory)"""
+    base = pd.read_csv(DATA_FILE)
+    rng = np.random.default_rng(seed)
+    written = 0
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        while written < n_rows:
+            size = min(BLOCK_ROWS, n_rows - written)
+            block = base.iloc[rng.integers(0, len(base), size)].reset_index(drop=True)
+            noise = rng.normal(1.0, 0.02, (size, len(feature_cols)))
+            block[feature_cols] = (block[feature_cols].to_numpy() * noise).round(4)
+            block.to_csv(out, header=written == 0, index=False)
+            written += size
+    return path
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-process decision scoring")
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--workers", default="1,2,4,8,16", help="Comma-separated worker counts")
+    parser.add_argument("--data", default=None, help="Synthetic input to reuse or create")
+    parser.add_argument("--chunk-rows", type=int, default=0)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", category=UserWarning)
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    tmp_dir = tempfile.mkdtemp(prefix="decision-bench-")
+    data_path = args.data or os.path.join(tmp_dir, "synthetic_features.csv")
+    if not os.path.exists(data_path):
+        start = time.perf_counter()
+        make_synthetic(data_path, args.rows)
+        print(f"📁 Wrote {args.rows:,} synthetic rows to {data_path} in {time.perf_counter() - start:.1f}s")
+
+    version = ModelRegistry().active_version()
+    results = []
+    reference = None
+    ok = True
+    for workers in worker_counts:
+        output = os.path.join(tmp_dir, f"decisions_{workers}.csv")
+        start = time.perf_counter()
+        summary = run_parallel(version, data_path, output, workers, args.chunk_rows)
+        seconds = time.perf_counter() - start
+        digest = file_digest(output)
+        reference = reference or digest
+        same = digest == reference
+        ok &= same
+        results.append((workers, summary.rows, seconds, same))
+        os.remove(output)
+
+    base_seconds = results[0][2]
+    print(f"\n📌 Speed-up ({os.cpu_count()} cores available)")
+    print(f"{'workers':>7} {'rows':>12} {'seconds':>9} {'rows/s':>12} {'speed-up':>9}  output")
+    for workers, rows, seconds, same in results:
+        print(f"{workers:>7} {rows:>12,} {seconds:9.1f} {rows / seconds:12,.0f} {base_seconds / seconds:8.2f}x"
+              f"  {'identical' if same else 'DIFFERS'}")
+    if not args.data:
+        os.remove(data_path)
+        os.rmdir(tmp_dir)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Feature engineering: out-of-core chunked runs against file size
+
+Writes synthetic raw metric CSVs of each --rows size (one row per minute,
+shuffled within every day like data/raw/cloud_metrics.csv unless --sorted)
+and times scripts/feature_engineering.run_chunked on them. Microseconds
+per row stay flat when the run scales linearly with the file. Unless
+--no-verify, every output is compared byte for byte with an in-memory
+run (clean + engineer) of the same file.
+
+Usage:
+    python scripts/bench_feature_chunks.py [--rows 1000000,2000000,4000000] [--windows 5,15,60]
+                                           [--workers 4] [--chunk-mb 16] [--sorted] [--no-verify]
+"""
+import argparse
+import filecmp
+import gc
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, "scripts"))
+
+from bench_feature_generator import make_raw
+from feature_engineering import _store, clean, engineer, run_chunked
+from models.feature_generator import parse_windows
+
+
+def write_raw(path, n_rows, shuffle):
+    raw = make_raw(n_rows)
+    if shuffle:
+        rng = np.random.default_rng(1)
+        # Random order inside every day, days in order
+        keys = raw["timestamp"].dt.floor("D").to_numpy().astype(np.int64) + rng.random(n_rows)
+        raw = raw.iloc[np.argsort(keys)]
+    raw.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chunked feature engineering against file size")
+    parser.add_argument("--rows", default="1000000,2000000,4000000",
+                        help="Comma-separated raw row counts")
+    parser.add_argument("--windows", type=parse_windows, default=(5, 15, 60))
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=int, default=16)
+    parser.add_argument("--sorted", action="store_true", help="Write time-ordered files (no sort pass)")
+    parser.add_argument("--no-verify", action="store_true", help="Skip the in-memory comparison")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, "raw.csv")
+        out_path = os.path.join(tmp, "features.csv")
+        mem_path = os.path.join(tmp, "features_in_memory.csv")
+        for n_rows in (int(part) for part in args.rows.split(",")):
+            write_raw(raw_path, n_rows, shuffle=not args.sorted)
+            size_mb = os.path.getsize(raw_path) / 2**20
+            print(f"\n📁 {n_rows:,} raw rows ({size_mb:.0f} MB)")
+
+            gc.collect()
+            start = time.perf_counter()
+            run_chunked(raw_path, out_path, args.windows, args.workers, args.chunk_mb, presorted=args.sorted)
+            seconds = time.perf_counter() - start
+
+            identical = None
+            if not args.no_verify:
+                _store(engineer(clean(pd.read_csv(raw_path)), args.windows), mem_path, "csv")
+                identical = filecmp.cmp(out_path, mem_path, shallow=False)
+                gc.collect()
+            results.append((n_rows, size_mb, seconds, identical))
+
+    print(f"\n📌 Chunked runs, windows {','.join(map(str, args.windows))}"
+          f"{'' if args.sorted else ', including the sort pass'}")
+    print(f"{'rows':>12} {'MB':>7} {'seconds':>9} {'us/row':>8} {'MB/s':>7} {'identical':>10}")
+    for n_rows, size_mb, seconds, identical in results:
+        same = "-" if identical is None else ("yes" if identical else "NO")
+        print(f"{n_rows:>12,} {size_mb:>7.0f} {seconds:>9.2f} {seconds / n_rows * 1e6:>8.2f} "
+              f"{size_mb / seconds:>7.1f} {same:>10}")
+    return 0 if all(identical is not False for *_, identical in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Feature engineering: pandas rolling calls vs the single-pass generator
+
+Builds --rows synthetic raw metric rows (one per minute) and times:
+
+    pandas (5)            the previous feature_engineering.py: 23 rolling,
+                          diff and shift calls, each a new column, then dropna
+    pandas (5,15,60)      the same plus rolling mean/std calls for the other windows
+    generator (5)         models/feature_generator.py into one preallocated array
+    generator (5,15,60)   the same, three windows at once
+    engineer (5)          scripts/feature_engineering.engineer (generator + frame)
+
+and reports the largest difference to the pandas features. The
+multi-window pandas run holds ~2x the columns of the others while dropna
+copies them; --skip-pandas-multi leaves it out where memory is short.
+
+Usage:
+    python scripts/bench_feature_generator.py [--rows 10000000] [--windows 5,15,60]
+                                              [--skip-pandas-multi]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+sys.path.append(os.path.join(BASE_DIR, "scripts"))
+
+from feature_engineering import engineer
+from models.feature_generator import (RAW_COLUMNS, feature_columns, generate_features, parse_windows,
+                                      warmup_rows)
+
+
+def make_raw(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2025-01-01", periods=n_rows, freq="min"),
+        "cpu_usage": rng.normal(55, 15, n_rows).clip(1, 100).round(2),
+        "memory_usage": rng.normal(50, 20, n_rows).clip(1, 100).round(2),
+        "response_time": rng.gamma(2.0, 200.0, n_rows).round(2),
+        "error_count": rng.poisson(3, n_rows),
+    })
+
+
+def legacy_features(df, window=5, extra_windows=()):
+    """Feature section of the previous scripts/feature_engineering.py"""
+    df["cpu_ma"] = df["cpu_usage"].rolling(window=window).mean()
+    df["memory_ma"] = df["memory_usage"].rolling(window=window).mean()
+    df["response_ma"] = df["response_time"].rolling(window=window).mean()
+    df["error_ma"] = df["error_count"].rolling(window=window).mean()
+
+    df["cpu_std"] = df["cpu_usage"].rolling(window=window).std()
+    df["memory_std"] = df["memory_usage"].rolling(window=window).std()
+    df["response_std"] = df["response_time"].rolling(window=window).std()
+
+    df["cpu_change"] = df["cpu_usage"].diff()
+    df["memory_change"] = df["memory_usage"].diff()
+    df["response_change"] = df["response_time"].diff()
+    df["error_change"] = df["error_count"].diff()
+
+    df["cpu_lag1"] = df["cpu_usage"].shift(1)
+    df["cpu_lag2"] = df["cpu_usage"].shift(2)
+    df["memory_lag1"] = df["memory_usage"].shift(1)
+    df["memory_lag2"] = df["memory_usage"].shift(2)
+    df["response_lag1"] = df["response_time"].shift(1)
+    df["response_lag2"] = df["response_time"].shift(2)
+    df["error_lag1"] = df["error_count"].shift(1)
+    df["error_lag2"] = df["error_count"].shift(2)
+
+    for w in extra_windows:
+        for prefix, column in (("cpu", "cpu_usage"), ("memory", "memory_usage"),
+                               ("response", "response_time"), ("error", "error_count")):
+            df[f"{prefix}_ma{w}"] = df[column].rolling(window=w).mean()
+            if prefix != "error":
+                df[f"{prefix}_std{w}"] = df[column].rolling(window=w).std()
+
+    return df.dropna().reset_index(drop=True)
+
+
+def timed(fn):
+    gc.collect()
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the multi-window feature generator")
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--windows", type=parse_windows, default=(5, 15, 60))
+    parser.add_argument("--skip-pandas-multi", action="store_true",
+                        help="Skip the multi-window pandas run (it needs ~2x the memory of the others)")
+    args = parser.parse_args()
+
+    raw = make_raw(args.rows)
+    print(f"📁 {args.rows:,} synthetic raw rows")
+    columns = feature_columns((5,))
+    multi_columns = feature_columns(args.windows)
+
+    # pandas adds its columns to raw itself; they are dropped again afterwards
+    seconds_pandas, legacy = timed(lambda: legacy_features(raw))
+    raw = raw[["timestamp"] + RAW_COLUMNS]
+    gc.collect()
+
+    values = np.empty((len(raw), len(RAW_COLUMNS)))
+    for i, column in enumerate(RAW_COLUMNS):
+        values[:, i] = raw[column].to_numpy(dtype=np.float64)
+    out = np.empty((len(raw) - warmup_rows((5,)), len(columns)), order="F")
+    seconds_single, _ = timed(lambda: generate_features(values, (5,), out=out))
+    max_diff = max(np.max(np.abs(out[:, j] - legacy[column].to_numpy())) for j, column in enumerate(columns))
+    del out, legacy
+
+    out = np.empty((len(raw) - warmup_rows(args.windows), len(multi_columns)), order="F")
+    seconds_multi, _ = timed(lambda: generate_features(values, args.windows, out=out))
+    del out, values
+
+    seconds_engineer, engineered = timed(lambda: engineer(raw, (5,)))
+    del engineered
+
+    seconds_pandas_multi = None
+    if not args.skip_pandas_multi:
+        seconds_pandas_multi, legacy = timed(
+            lambda: legacy_features(raw, args.windows[0], args.windows[1:]))
+        del legacy
+
+    windows = ",".join(map(str, args.windows))
+    print(f"\n📌 Speed-up is against pandas with the same windows")
+    print(f"{'':<24} {'seconds':>9} {'rows/s':>14} {'columns':>8} {'speed-up':>9}")
+    rows = [
+        ("pandas (5)", seconds_pandas, len(columns), seconds_pandas),
+        ("generator (5)", seconds_single, len(columns), seconds_pandas),
+        ("engineer (5)", seconds_engineer, len(columns), seconds_pandas),
+        (f"generator ({windows})", seconds_multi, len(multi_columns), seconds_pandas_multi),
+    ]
+    if seconds_pandas_multi is not None:
+        rows.insert(3, (f"pandas ({windows})", seconds_pandas_multi, len(multi_columns), seconds_pandas_multi))
+    for name, seconds, n_columns, baseline in rows:
+        speed_up = f"{baseline / seconds:8.1f}x" if baseline else f"{'-':>9}"
+        print(f"{name:<24} {seconds:9.2f} {args.rows / seconds:14,.0f} {n_columns:>8} {speed_up}")
+    print(f"\n📌 Largest difference to the pandas features: {max_diff:.3g}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Concurrency benchmark for the shared MongoClient pool
+
+Runs the same read workload from many threads against pools of different
+sizes and prints throughput alongside the pool utilization and
+checkout-wait metrics collected by backend/database/mongo_client.py.
+
+Usage:
+    python scripts/bench_mongo_pool.py [--threads 64] [--ops 200] [--pool-sizes 1,4,16,64]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "backend"))
+
+from database.mongo_client import get_client, release_client, pool_stats
+
+
+def run(pool_size, threads, ops, uri):
+    client = get_client(uri, maxPoolSize=pool_size)
+    try:
+        collection = client["aiops_bench"]["pool_bench"]
+        if collection.estimated_document_count() == 0:
+            collection.insert_many([{"i": i, "payload": "x" * 256} for i in range(1000)])
+
+        def worker(seed):
+            for n in range(ops):
+                collection.find_one({"i": (seed * 31 + n) % 1000})
+
+        # Prime the pool so connection setup is not part of the measurement
+        collection.find_one({})
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, range(threads)))
+        elapsed = time.perf_counter() - start
+
+        stats = next(iter(s for label, s in pool_stats().items()
+                          if f"maxPoolSize={pool_size}" in label))
+        return threads * ops / elapsed, stats
+    finally:
+        release_client(client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--ops", type=int, default=200, help="Queries per thread")
+    parser.add_argument("--pool-sizes", default="1,4,16,64")
+    args = parser.parse_args()
+
+    print(f"{'pool':>5} {'ops/s':>10} {'peak util':>10} {'avg wait ms':>12} {'max wait ms':>12} {'conns':>6}")
+    for pool_size in [int(p) for p in args.pool_sizes.split(",")]:
+        throughput, stats = run(pool_size, args.threads, args.ops, args.uri)
+        print(f"{pool_size:>5} {throughput:>10.0f} {stats['peak_utilization']:>10.0%} "
+              f"{stats['avg_checkout_wait_ms']:>12.2f} {stats['max_checkout_wait_ms']:>12.2f} "
+              f"{stats['open_connections']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Resolution plans: df.apply(recommend_resolution) vs recommend_resolution_batch()
+
+Both are timed on the processed decision output tiled to --rows rows.
+That the two give identical results is checked by
+tests/test_resolution_batch.py.
+
+Usage:
+    python scripts/bench_resolution_batch.py [--rows 100000] [--repeats 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from decision_engine.resolution_model import recommend_resolution, recommend_resolution_batch
+
+DATA_FILE = os.path.join(BASE_DIR, "data", "processed", "final_decision_output.csv")
+
+
+def row_wise(df):
+    """What decision_logic.py did before the batch API"""
+    return df.apply(lambda row: recommend_resolution(
+        root_cause=row["predicted_root_cause"], cpu_usage=float(row["cpu_usage"]),
+        memory_usage=float(row["memory_usage"]), response_time=float(row["response_time"]),
+        anomaly_score=float(row["anomaly_score"]), failure_probability=float(row["failure_probability"]),
+        anomaly_label=int(row["anomaly_label"])), axis=1, result_type="expand")
+
+
+def batched(df):
+    return recommend_resolution_batch(
+        root_cause=df["predicted_root_cause"].to_numpy(),
+        cpu_usage=df["cpu_usage"].to_numpy(),
+        memory_usage=df["memory_usage"].to_numpy(),
+        response_time=df["response_time"].to_numpy(),
+        anomaly_score=df["anomaly_score"].to_numpy(),
+        failure_probability=df["failure_probability"].to_numpy(),
+        anomaly_label=df["anomaly_label"].to_numpy(),
+    )
+
+
+def best_of(fn, df, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batch resolution API against df.apply")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    df = pd.read_csv(DATA_FILE)
+    tiles = max(1, -(-args.rows // len(df)))
+    df = pd.concat([df] * tiles, ignore_index=True).iloc[:args.rows]
+    print(f"📁 {len(df)} rows from {DATA_FILE}")
+
+    scalar_s = best_of(row_wise, df, args.repeats)
+    batch_s = best_of(batched, df, args.repeats)
+    print(f"✅ df.apply {scalar_s * 1000:.1f}ms vs batch {batch_s * 1000:.2f}ms "
+          f"({scalar_s / batch_s:.0f}x, {len(df) / batch_s:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
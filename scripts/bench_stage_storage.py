@@ -0,0 +1,98 @@
+"""
+Stage storage: CSV vs date-partitioned Parquet
+
+Tiles a stage output (default: final_decision_output) to --rows rows,
+shifting every copy by one day so the data spans many day partitions,
+then writes it as CSV and as a Parquet dataset through
+decision_engine/stage_store.py and times:
+
+    write        the whole stage
+    read all     every row
+    read 1 day   one day (CSV must parse the whole file to find it)
+    read 1 day + ALERT only   with an equality filter pushed down
+
+Usage:
+    python scripts/bench_stage_storage.py [--rows 1000000] [--stage final_decision_output]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from decision_engine.stage_store import (CSV, PARQUET, STAGE_FILES, read_stage, stage_size_bytes,
+                                         write_stage)
+
+
+def make_frame(stage, n_rows):
+    base = pd.read_csv(STAGE_FILES[stage])
+    base["timestamp"] = pd.to_datetime(base["timestamp"])
+    copies = []
+    for k in range(-(-n_rows // len(base))):
+        copy = base.copy()
+        copy["timestamp"] = copy["timestamp"] + pd.Timedelta(days=k)
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True).iloc[:n_rows]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CSV and Parquet stage storage")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--stage", default="final_decision_output", choices=sorted(STAGE_FILES))
+    args = parser.parse_args()
+
+    df = make_frame(args.stage, args.rows)
+    tmp_dir = tempfile.mkdtemp(prefix="stage-bench-")
+    path = os.path.join(tmp_dir, f"{args.stage}.csv")
+    day = df["timestamp"].iloc[len(df) // 2].normalize()
+    day_end = day + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    has_alerts = "alert_status" in df.columns
+
+    results = {}
+    try:
+        for fmt in (CSV, PARQUET):
+            row = {}
+            row["write"], _ = timed(lambda: write_stage(df, path, fmt))
+            row["size"] = stage_size_bytes(path, fmt)
+            row["read all"], full = timed(lambda: read_stage(path, fmt))
+            row["read 1 day"], one_day = timed(lambda: read_stage(path, fmt, start=day, end=day_end))
+            if has_alerts:
+                row["read 1 day + ALERT only"], alerts = timed(
+                    lambda: read_stage(path, fmt, start=day, end=day_end, filters={"alert_status": "ALERT"}))
+                row["alert rows"] = len(alerts)
+            row["rows"], row["day rows"] = len(full), len(one_day)
+            results[fmt] = row
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    csv, parquet = results[CSV], results[PARQUET]
+    if (csv["rows"], csv["day rows"], csv.get("alert rows")) != \
+            (parquet["rows"], parquet["day rows"], parquet.get("alert rows")):
+        print("❌ CSV and Parquet returned different row counts")
+        return 1
+
+    print(f"📌 {args.stage}: {len(df):,} rows over {df['timestamp'].dt.normalize().nunique()} days "
+          f"(1 day = {csv['day rows']:,} rows)")
+    print(f"{'':<26} {'CSV':>10} {'Parquet':>10} {'ratio':>8}")
+    print(f"{'size (MB)':<26} {csv['size'] / 2**20:10.1f} {parquet['size'] / 2**20:10.1f} "
+          f"{csv['size'] / parquet['size']:7.1f}x")
+    for key in ("write", "read all", "read 1 day", "read 1 day + ALERT only"):
+        if key in csv:
+            print(f"{key + ' (s)':<26} {csv[key]:10.3f} {parquet[key]:10.3f} {csv[key] / parquet[key]:7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
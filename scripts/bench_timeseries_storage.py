@@ -0,0 +1,105 @@
+"""
+Compare metric storage layouts on a local mongod
+
+For each storage mode (standard, timeseries, bucketed) a fresh database is
+filled with synthetic per-minute samples for several series, then insert
+throughput, collStats storage/index size and time-range query latency are
+reported side by side.
+
+Usage:
+    python scripts/bench_timeseries_storage.py [--samples 500000] [--series 10]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "backend"))
+
+from database.mongo_client import get_client, release_client
+from database.timeseries_store import TimeSeriesStore, STORAGE_MODES
+
+START = datetime(2025, 1, 1)
+
+
+def synthetic_samples(n_samples, n_series, seed=42):
+    """Per-minute samples, interleaved across series"""
+    rng = np.random.default_rng(seed)
+    cpu = rng.normal(45, 6, n_samples).round(2).tolist()
+    memory = rng.normal(4.0, 0.6, n_samples).round(2).tolist()
+    latency = rng.normal(200, 50, n_samples).round(2).tolist()
+    errors = rng.poisson(1, n_samples).tolist()
+    for i in range(n_samples):
+        yield {
+            "timestamp": START + timedelta(minutes=i // n_series),
+            "series": f"service-{i % n_series}",
+            "cpu_usage": cpu[i],
+            "memory_usage": memory[i],
+            "response_time": latency[i],
+            "error_count": errors[i],
+        }
+
+
+def bench_mode(client, mode, args):
+    db_name = f"aiops_bench_{mode}"
+    client.drop_database(db_name)
+    store = TimeSeriesStore(client[db_name], "metrics", mode)
+
+    batch = []
+    start = time.perf_counter()
+    for sample in synthetic_samples(args.samples, args.series):
+        batch.append(sample)
+        if len(batch) == args.batch_size:
+            store.insert_many(batch)
+            batch = []
+    if batch:
+        store.insert_many(batch)
+    insert_seconds = time.perf_counter() - start
+
+    total_minutes = args.samples // args.series
+    latencies = {}
+    for minutes in (60, 24 * 60, 7 * 24 * 60):
+        window_start = START + timedelta(minutes=max(0, total_minutes // 2 - minutes // 2))
+        window_end = window_start + timedelta(minutes=minutes)
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            rows = sum(1 for _ in store.find_range(
+                window_start, window_end,
+                filters={"series": "service-0"},
+                projection=["timestamp", "cpu_usage"]))
+            timings.append(time.perf_counter() - t0)
+        latencies[minutes] = (rows, 1000 * min(timings))
+
+    stats = store.storage_stats()
+    client.drop_database(db_name)
+    return store.mode, args.samples / insert_seconds, stats, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--samples", type=int, default=500000)
+    parser.add_argument("--series", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    client = get_client(args.uri)
+    try:
+        print(f"{'mode':<11} {'inserts/s':>10} {'docs':>9} {'storage MB':>11} {'index MB':>9}  range query (rows, best ms)")
+        for mode in STORAGE_MODES:
+            actual, rate, stats, latencies = bench_mode(client, mode, args)
+            ranges = "  ".join(f"{m // 60}h: {rows} rows {ms:.1f}ms" for m, (rows, ms) in latencies.items())
+            print(f"{actual:<11} {rate:>10,.0f} {stats['documents'] or 0:>9} "
+                  f"{(stats['storage_size'] or 0) / 2**20:>11.1f} {(stats['index_size'] or 0) / 2**20:>9.1f}  {ranges}")
+    finally:
+        release_client(client)
+
+
+if __name__ == "__main__":
+    main()
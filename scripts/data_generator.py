@@ -1,4 +1,5 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
 
@@ -19,6 +20,10 @@ INCIDENT_TYPES = ["CPU_OVERLOAD", "MEMORY_LEAK", "LATENCY_SPIKE"]
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 OUTPUT_FILE = os.path.join(BASE_DIR, "data", "raw", "cloud_metrics.csv")
 
+# Stage storage (CSV, or Parquet with AIOPS_STAGE_FORMAT=parquet)
+sys.path.append(BASE_DIR)
+from decision_engine.stage_store import write_stage
+
 # Create folders if missing
 os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
 
@@ -115,12 +120,12 @@ df = pd.DataFrame({
 df = df.sample(frac=1, random_state=42).reset_index(drop=True)
 
 # -------------------------------
-# SAVE CSV
+# SAVE CSV (or Parquet dataset)
 # -------------------------------
-df.to_csv(OUTPUT_FILE, index=False)
+saved_to = write_stage(df, OUTPUT_FILE)
 
 print("✅ Fake cloud metrics dataset generated successfully!")
-print(f"📁 Saved to: {OUTPUT_FILE}")
+print(f"📁 Saved to: {saved_to}")
 
 print("\n📌 Dataset Preview:")
 print(df.head(10))
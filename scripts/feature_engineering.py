@@ -1,4 +1,43 @@
+"""
+Feature engineering: raw cloud metrics -> engineered metric features
+
+Rolling mean and std, rate of change and lags are computed in one pass by
+models/feature_generator.py. The first window (default 5) keeps the
+original column names; more windows add columns (--windows 5,15,60 adds
+cpu_ma15, cpu_std15, ..., cpu_ma60, ...). With --series-column the
+features are computed per series (host, service, ...).
+
+With --incremental only the raw rows appended since the last run are
+processed and their features appended to the output. A checkpoint next
+to the output keeps how far the raw input was read, the latest timestamp
+(watermark) and the last warmup_rows() raw rows of every series, which is
+all the history a new row's windows and lags need, so the appended rows
+are identical to a full recompute. Everything is recomputed when there is
+no usable checkpoint, the windows or series column changed, the raw input
+was rewritten, or rows older than the watermark were appended.
+
+With --chunked the raw CSV never has to fit in memory. Its rows are first
+sorted by time out of core (bucketed by day in parallel, then one day at a
+time; skip this with --sorted-input). The sorted file is then cut into
+byte ranges that a process pool turns into features. Each range reads the
+warmup_rows() rows before it as a halo, so windows and lags are exact
+across range boundaries. The parts are joined in input order into the
+same output as an in-memory run.
+
+Usage:
+    python scripts/feature_engineering.py [--windows 5,15,60] [--series-column host]
+                                          [--incremental] [--checkpoint PATH]
+                                          [--chunked] [--workers 4] [--chunk-mb 64] [--sorted-input]
+"""
+import argparse
+import io
+import json
 import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
 import pandas as pd
 import numpy as np
 
@@ -10,79 +49,469 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INPUT_FILE = os.path.join(BASE_DIR, "data", "raw", "cloud_metrics.csv")
 OUTPUT_FILE = os.path.join(BASE_DIR, "data", "processed", "metrics_features.csv")
 
-# Create processed folder if missing
-os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+# Stage storage (CSV, or Parquet with AIOPS_STAGE_FORMAT=parquet)
+sys.path.append(BASE_DIR)
+from decision_engine.stage_store import (CSV, UNKNOWN_DATE, ByteRange, append_stage, complete_end,
+                                         count_stage_rows, dataset_path, first_row_digest, line_digest,
+                                         read_header, read_stage, rows_before, split_ranges, stage_exists,
+                                         stage_format, write_stage)
+from models.feature_generator import (DEFAULT_WINDOWS, RAW_COLUMNS, feature_columns, generate_features,
+                                      parse_windows, warmup_rows)
 
-# -------------------------------
-# LOAD DATA
-# -------------------------------
-df = pd.read_csv(INPUT_FILE)
+# Rolling window sizes (in minutes); env AIOPS_FEATURE_WINDOWS or --windows
+WINDOWS = parse_windows(os.getenv("AIOPS_FEATURE_WINDOWS", ",".join(map(str, DEFAULT_WINDOWS))))
+# Compute features per value of this column (default: one series)
+SERIES_COLUMN = os.getenv("AIOPS_FEATURE_SERIES_COLUMN") or None
+# Raw CSV bytes per range of a --chunked run (bounds the memory of a worker)
+CHUNK_MB = int(os.getenv("AIOPS_FEATURE_CHUNK_MB", "64"))
+# Ranges per worker; more, smaller ranges even out uneven workers
+RANGES_PER_WORKER = 4
+# CSV timestamps (the raw metrics are per minute)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-print("✅ Loaded dataset successfully!")
-print("Shape:", df.shape)
-print(df.head())
 
-# -------------------------------
-# DATA CLEANING
-# -------------------------------
-# Convert timestamp to datetime
-df["timestamp"] = pd.to_datetime(df["timestamp"])
+def clean(df):
+    """Parse timestamps and sort (important for time-series features; ties keep file order)"""
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    return df.sort_values("timestamp", kind="stable").reset_index(drop=True)
 
-# Sort by timestamp (important for time-series features)
-df = df.sort_values("timestamp").reset_index(drop=True)
 
-# -------------------------------
-# FEATURE ENGINEERING
-# -------------------------------
+def compute_features(df, windows=WINDOWS, series_column=None, history=None):
+    """
+    Engineered features of time-ordered raw rows
+
+    Args:
+        df: Cleaned raw metrics
+        windows: Rolling windows
+        series_column: Compute every series separately (None: one series)
+        history: {series: raw metric rows just before df} from an earlier
+            run (None: df is the start of every series)
 
-# Rolling window size (in minutes)
-WINDOW = 5
+    Returns:
+        (frame, history): the raw columns plus features without the rows
+        that have no full window (and, as before, without any row that has
+        a missing value), and the last warmup_rows() raw metric rows of
+        every series for the next run
+    """
+    warmup = warmup_rows(windows)
+    columns = feature_columns(windows)
+    values = np.empty((len(df), len(RAW_COLUMNS)), dtype=np.float64)
+    for i, column in enumerate(RAW_COLUMNS):
+        values[:, i] = df[column].to_numpy(dtype=np.float64)
+    features = np.full((len(df), len(columns)), np.nan, order="F")
 
-# ✅ Moving averages
-df["cpu_ma"] = df["cpu_usage"].rolling(window=WINDOW).mean()
-df["memory_ma"] = df["memory_usage"].rolling(window=WINDOW).mean()
-df["response_ma"] = df["response_time"].rolling(window=WINDOW).mean()
-df["error_ma"] = df["error_count"].rolling(window=WINDOW).mean()
+    if series_column:
+        groups = {str(key): rows for key, rows in df.groupby(series_column, sort=False).indices.items()}
+    else:
+        groups = {None: slice(None)}
+    history = history or {}
+    tails = dict(history)
+    for key, rows in groups.items():
+        past = history.get(key)
+        past = np.empty((0, len(RAW_COLUMNS))) if past is None else np.asarray(past, dtype=np.float64)
+        # Only the last warmup rows reach into the windows of new rows
+        past = past[max(len(past) - warmup, 0):]
+        block = np.concatenate([past, values[rows]]) if len(past) else values[rows]
+        # The first new row with a full window
+        first = warmup - len(past)
+        if len(block) > warmup:
+            if isinstance(rows, slice):
+                generate_features(block, windows, out=features[first:])
+            else:
+                features[rows[first:]] = generate_features(block, windows)
+        tails[key] = block[-warmup:]
 
-# ✅ Rolling standard deviation
-df["cpu_std"] = df["cpu_usage"].rolling(window=WINDOW).std()
-df["memory_std"] = df["memory_usage"].rolling(window=WINDOW).std()
-df["response_std"] = df["response_time"].rolling(window=WINDOW).std()
+    frame = pd.concat([df.reset_index(drop=True), pd.DataFrame(features, columns=columns, copy=False)], axis=1)
+    return frame.dropna().reset_index(drop=True), tails
 
-# ✅ Rate of change (difference)
-df["cpu_change"] = df["cpu_usage"].diff()
-df["memory_change"] = df["memory_usage"].diff()
-df["response_change"] = df["response_time"].diff()
-df["error_change"] = df["error_count"].diff()
 
-# ✅ Lag features (previous values)
-df["cpu_lag1"] = df["cpu_usage"].shift(1)
-df["cpu_lag2"] = df["cpu_usage"].shift(2)
+def engineer(df, windows=WINDOWS, series_column=None):
+    """Raw columns plus features of cleaned raw rows (see compute_features)"""
+    return compute_features(df, windows, series_column)[0]
 
-df["memory_lag1"] = df["memory_usage"].shift(1)
-df["memory_lag2"] = df["memory_usage"].shift(2)
 
-df["response_lag1"] = df["response_time"].shift(1)
-df["response_lag2"] = df["response_time"].shift(2)
+def _csv_frame(frame):
+    """
+    Timestamps as text at second resolution, so every part of a split run
+    prints them like a full run does (pandas drops the time of a column
+    that is all midnights). Sub-second timestamps are left to pandas.
+    """
+    stamps = frame["timestamp"]
+    if stamps.dt.microsecond.any() or stamps.dt.nanosecond.any():
+        return frame
+    return frame.assign(timestamp=stamps.dt.strftime(TIMESTAMP_FORMAT))
+
+
+def _store(frame, path, fmt, append=False):
+    """write_stage / append_stage of engineered rows"""
+    if fmt == CSV:
+        frame = _csv_frame(frame)
+    return (append_stage if append else write_stage)(frame, path, fmt)
 
-df["error_lag1"] = df["error_count"].shift(1)
-df["error_lag2"] = df["error_count"].shift(2)
 
 # -------------------------------
-# HANDLE NaN VALUES
+# INCREMENTAL RUNS
 # -------------------------------
-# First few rows will become NaN due to rolling and lag
-df = df.dropna().reset_index(drop=True)
+def _load_feature_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return None
+    try:
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_feature_checkpoint(checkpoint_path, state):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(dict(state, updated_at=datetime.now().isoformat()), f, indent=2)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _recompute_reason(state, input_path, output_path, windows, series_column, fmt, data_start, end):
+    """Why the checkpoint cannot be continued (None when it can)"""
+    if state is None:
+        return "no checkpoint"
+    if tuple(state.get("windows", ())) != tuple(windows) or state.get("series_column") != series_column:
+        return "windows or series column changed"
+    if state.get("format") != fmt or state.get("input_path") != os.path.abspath(input_path):
+        return "input or storage format changed"
+    if fmt == CSV:
+        offset = state.get("input_offset", 0)
+        if not data_start <= offset <= end or (offset > data_start and (
+                line_digest(input_path, offset) != state.get("input_tail_sha256")
+                or first_row_digest(input_path, data_start) != state.get("input_head_sha256"))):
+            return "raw input was rewritten"
+        if not os.path.exists(output_path) or os.path.getsize(output_path) < state.get("output_bytes", 0):
+            return "output file is missing or truncated"
+    elif not stage_exists(output_path, fmt):
+        return "output dataset is missing"
+    return None
+
+
+def _read_raw(input_path, fmt, start=None, end=None, after=None):
+    """Raw rows in bytes [start, end) of a CSV, or the rows newer than `after` of a Parquet stage"""
+    if fmt == CSV:
+        columns, _ = read_header(input_path)
+        if end <= start:
+            return pd.DataFrame(columns=columns)
+        with ByteRange(input_path, start, end) as raw:
+            return pd.read_csv(io.BufferedReader(raw), names=columns, header=None)
+    df = read_stage(input_path, fmt, start=after)
+    if after is not None:
+        df = df[pd.to_datetime(df["timestamp"]) > pd.Timestamp(after)]
+    return df
+
+
+def run_incremental(input_path, output_path, windows=WINDOWS, series_column=None, checkpoint_path=None,
+                    fmt=None):
+    """
+    Engineer features for the raw rows appended since the last run
+
+    Args:
+        input_path: Raw metrics stage, appended to between runs
+        output_path: Engineered features stage
+        windows: Rolling windows
+        series_column: Compute every series separately (None: one series)
+        checkpoint_path: State file (default: <output_path>.feature-checkpoint.json)
+        fmt: csv or parquet (default: AIOPS_STAGE_FORMAT). CSV input is
+            tracked by byte offset, a Parquet input by the watermark and
+            its row count.
+
+    Returns:
+        (new feature rows, rows in the output)
+    """
+    fmt = stage_format(fmt)
+    checkpoint_path = checkpoint_path or output_path + ".feature-checkpoint.json"
+    data_start = end = None
+    if fmt == CSV:
+        _, data_start = read_header(input_path)
+        end = complete_end(input_path)
+
+    state = _load_feature_checkpoint(checkpoint_path)
+    reason = _recompute_reason(state, input_path, output_path, windows, series_column, fmt, data_start, end)
+    new_rows = None
+    if not reason:
+        new_rows = clean(_read_raw(input_path, fmt, state.get("input_offset"), end, state["watermark"]))
+        if len(new_rows) and state["watermark"] and new_rows["timestamp"].min() <= pd.Timestamp(state["watermark"]):
+            reason = "rows older than the watermark were appended"
+        elif fmt != CSV and count_stage_rows(input_path, fmt) != state["rows_in"] + len(new_rows):
+            # The watermark read skips late rows; the footer row count still sees them
+            reason = "rows older than the watermark were appended"
+
+    if reason:
+        print(f"📌 Recomputing all features: {reason}")
+        raw = clean(_read_raw(input_path, fmt, data_start, end))
+        features, history = compute_features(raw, windows, series_column)
+        _store(features, output_path, fmt)
+        rows_in, rows_out = len(raw), len(features)
+    else:
+        print(f"📌 Continuing after {state['rows_in']} raw rows (watermark {state['watermark']})")
+        history = {item["series"]: item["rows"] for item in state["history"]}
+        features, history = compute_features(new_rows, windows, series_column, history)
+        if fmt == CSV:
+            # Drop anything an interrupted run appended after its last checkpoint
+            with open(output_path, "r+b") as f:
+                f.truncate(state["output_bytes"])
+        if len(features):
+            _store(features, output_path, fmt, append=True)
+        raw = new_rows
+        rows_in, rows_out = state["rows_in"] + len(new_rows), state["rows_out"] + len(features)
+
+    watermark = state["watermark"] if not reason else None
+    if len(raw):
+        watermark = str(raw["timestamp"].max())
+    _save_feature_checkpoint(checkpoint_path, {
+        "input_path": os.path.abspath(input_path),
+        "format": fmt,
+        "input_offset": end,
+        "input_head_sha256": first_row_digest(input_path, data_start) if fmt == CSV and end > data_start else None,
+        "input_tail_sha256": line_digest(input_path, end) if fmt == CSV and end > data_start else None,
+        "windows": list(windows),
+        "series_column": series_column,
+        "watermark": watermark,
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "output_bytes": os.path.getsize(output_path) if fmt == CSV and os.path.exists(output_path) else 0,
+        "history": [{"series": key, "rows": np.asarray(rows).tolist()} for key, rows in history.items()],
+    })
+    print(f"✅ {len(features)} new feature rows ({rows_out} in total)")
+    return features, rows_out
+
 
 # -------------------------------
-# SAVE PROCESSED DATA
+# OUT-OF-CORE (CHUNKED) RUNS
 # -------------------------------
-df.to_csv(OUTPUT_FILE, index=False)
+def _raw_lines(path, start, end):
+    """Non-empty lines in bytes [start, end) of a CSV, each ending in a newline"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = [line for line in data.splitlines(keepends=True) if line.strip(b"\r\n")]
+    if lines and not lines[-1].endswith(b"\n"):
+        lines[-1] += b"\n"
+    return lines
+
+
+def _line_stamps(lines, columns):
+    """Parsed timestamps of raw CSV lines"""
+    frame = pd.read_csv(io.BytesIO(b"".join(lines)), names=columns, header=None, usecols=["timestamp"])
+    return pd.to_datetime(frame["timestamp"])
+
+
+def _bucket_range(task):
+    """Copy the lines of one byte range into per-day files, in file order (worker process)"""
+    input_path, columns, start, end, index, bucket_dir = task
+    lines = _raw_lines(input_path, start, end)
+    if not lines:
+        return []
+    days = _line_stamps(lines, columns).dt.strftime("%Y-%m-%d").fillna(UNKNOWN_DATE)
+    for day, rows in days.groupby(days, sort=False).indices.items():
+        os.makedirs(os.path.join(bucket_dir, day), exist_ok=True)
+        with open(os.path.join(bucket_dir, day, f"{index:06d}.csv"), "wb") as out:
+            out.write(b"".join(lines[i] for i in rows))
+    return list(days.unique())
+
+
+def _sort_day(task):
+    """Sort the rows of one day by time, ties in file order (worker process)"""
+    day_dir, columns, sorted_path = task
+    lines = []
+    for name in sorted(os.listdir(day_dir)):
+        lines += _raw_lines(os.path.join(day_dir, name), 0, os.path.getsize(os.path.join(day_dir, name)))
+    order = np.argsort(_line_stamps(lines, columns).to_numpy(), kind="stable")
+    with open(sorted_path, "wb") as out:
+        out.write(b"".join(lines[i] for i in order))
+    shutil.rmtree(day_dir)
+    return len(lines)
+
+
+def sort_raw_csv(input_path, sorted_path, workers, chunk_mb=CHUNK_MB):
+    """
+    Sort a raw metrics CSV by timestamp without loading it (ties keep file order)
+
+    Byte ranges are bucketed into per-day files in parallel, then every day
+    is sorted in memory, so one day of rows has to fit in a worker, not the
+    whole file. Day names sort in time order, so the days are joined as-is.
+
+    Args:
+        input_path: Raw metrics CSV
+        sorted_path: Sorted copy to write
+        workers: Worker processes
+        chunk_mb: Raw CSV megabytes per range
+    """
+    columns, data_start = read_header(input_path)
+    n_ranges = max(workers, -(-(os.path.getsize(input_path) - data_start) // (chunk_mb << 20)))
+    _, ranges = split_ranges(input_path, n_ranges)
+    bucket_dir = sorted_path + ".days"
+    shutil.rmtree(bucket_dir, ignore_errors=True)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tasks = [(input_path, columns, a, b, i, bucket_dir) for i, (a, b) in enumerate(ranges)]
+            days = sorted(set().union(*executor.map(_bucket_range, tasks)))
+            day_paths = [os.path.join(bucket_dir, f"{day}.csv") for day in days]
+            tasks = [(os.path.join(bucket_dir, day), columns, path) for day, path in zip(days, day_paths)]
+            rows = sum(executor.map(_sort_day, tasks))
+        with open(input_path, "rb") as f, open(sorted_path, "wb") as out:
+            out.write(f.read(data_start))
+            for path in day_paths:
+                with open(path, "rb") as part:
+                    shutil.copyfileobj(part, out, 1 << 20)
+    finally:
+        shutil.rmtree(bucket_dir, ignore_errors=True)
+    print(f"✅ Sorted {rows} raw rows ({len(days)} days, {len(ranges)} ranges)")
+    return rows
+
+
+def _chunk_features(task):
+    """Features of one byte range of a time-ordered raw CSV into its part file (worker process)"""
+    input_path, columns, halo_start, start, end, part_path, windows, write_header = task
+    halo = _read_raw(input_path, CSV, halo_start, start)
+    df = _read_raw(input_path, CSV, start, end)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+
+    # The halo's last row and the range must already be in time order
+    stamps = np.concatenate([pd.to_datetime(halo["timestamp"][-1:]).to_numpy("datetime64[ns]"),
+                             df["timestamp"].to_numpy("datetime64[ns]")])
+    if not np.array_equal(np.argsort(stamps, kind="stable"), np.arange(len(stamps))):
+        raise ValueError(f"{input_path}: rows in bytes {start}-{end} are not in time order "
+                         "(run without --sorted-input)")
+
+    history = {None: halo[RAW_COLUMNS].to_numpy(dtype=np.float64)}
+    features, _ = compute_features(df, windows, history=history)
+    with open(part_path, "w", newline="", encoding="utf-8") as out:
+        _csv_frame(features).to_csv(out, header=write_header, index=False)
+    return len(df), len(features)
+
+
+def run_chunked(input_path, output_path, windows=WINDOWS, workers=None, chunk_mb=CHUNK_MB, presorted=False):
+    """
+    Engineer features of a raw CSV of any size in a process pool
+
+    Args:
+        input_path: Raw metrics CSV
+        output_path: Engineered features CSV
+        windows: Rolling windows
+        workers: Worker processes (default: CPU count)
+        chunk_mb: Raw CSV megabytes per range (bounds a worker's memory)
+        presorted: The input is already in time order; skip the sort
+            (ranges that are not raise ValueError)
+
+    Returns:
+        (raw rows, feature rows)
+    """
+    workers = workers or os.cpu_count() or 1
+    source = input_path
+    if not presorted:
+        source = output_path + ".sorted"
+        sort_raw_csv(input_path, source, workers, chunk_mb)
+
+    warmup = warmup_rows(windows)
+    columns, data_start = read_header(source)
+    n_ranges = max(workers * RANGES_PER_WORKER, -(-(os.path.getsize(source) - data_start) // (chunk_mb << 20)))
+    _, ranges = split_ranges(source, n_ranges)
+    part_paths = [f"{output_path}.part{i:04d}" for i in range(len(ranges))]
+    tasks = [
+        (source, columns, rows_before(source, a, warmup, data_start), a, b, part_path, windows, i == 0)
+        for i, ((a, b), part_path) in enumerate(zip(ranges, part_paths))
+    ]
+
+    rows_in = rows_out = 0
+    tmp_path = f"{output_path}.partial"
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map() yields in submission order; the parts are joined in input order below
+            for part_in, part_out in executor.map(_chunk_features, tasks):
+                rows_in += part_in
+                rows_out += part_out
+        with open(tmp_path, "wb") as out:
+            for part_path in part_paths:
+                with open(part_path, "rb") as part:
+                    shutil.copyfileobj(part, out, 1 << 20)
+        os.replace(tmp_path, output_path)
+    finally:
+        for path in part_paths + [tmp_path] + ([source] if source != input_path else []):
+            if os.path.exists(path):
+                os.remove(path)
+    print(f"✅ Engineered {rows_out} of {rows_in} rows with {workers} workers ({len(ranges)} ranges)")
+    return rows_in, rows_out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engineer metric features")
+    parser.add_argument("--windows", type=parse_windows, default=WINDOWS,
+                        help="Comma-separated rolling windows (first keeps the original names)")
+    parser.add_argument("--series-column", default=SERIES_COLUMN,
+                        help="Compute features per value of this column (default: one series)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process raw rows appended since the last run (checkpointed)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="Incremental state file (default: <output>.feature-checkpoint.json)")
+    parser.add_argument("--chunked", action="store_true",
+                        help="Process the raw CSV out of core in byte ranges with window halos")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Worker processes of a chunked run (default: CPU count)")
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_MB,
+                        help="Raw CSV megabytes per range of a chunked run")
+    parser.add_argument("--sorted-input", action="store_true",
+                        help="The raw CSV is already in time order (chunked runs skip sorting it)")
+    args = parser.parse_args(argv)
+
+    # Create processed folder if missing
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    fmt = stage_format()
+
+    if args.chunked:
+        if fmt != CSV or args.incremental or args.series_column:
+            parser.error("--chunked streams one series of CSV rows; use the CSV format without "
+                         "--incremental or --series-column")
+        rows_in, rows_out = run_chunked(INPUT_FILE, OUTPUT_FILE, args.windows, args.workers,
+                                        args.chunk_mb, args.sorted_input)
+        print("\n✅ Feature Engineering Completed!")
+        print("✅ Processed dataset saved at:")
+        print(OUTPUT_FILE)
+        print(f"Raw rows: {rows_in}, feature rows: {rows_out}")
+        return 0
+
+    if args.incremental:
+        features, total = run_incremental(INPUT_FILE, OUTPUT_FILE, args.windows, args.series_column,
+                                          args.checkpoint, fmt)
+        print("\n✅ Feature Engineering Completed!")
+        print("✅ Processed dataset saved at:")
+        print(dataset_path(OUTPUT_FILE) if fmt != CSV else OUTPUT_FILE)
+        print(f"New rows: {len(features)}, total rows: {total}")
+        return 0
+
+    # -------------------------------
+    # LOAD DATA
+    # -------------------------------
+    df = read_stage(INPUT_FILE)
+
+    print("✅ Loaded dataset successfully!")
+    print("Shape:", df.shape)
+    print(df.head())
+
+    # -------------------------------
+    # DATA CLEANING + FEATURE ENGINEERING
+    # -------------------------------
+    df = engineer(clean(df), args.windows, args.series_column)
+
+    # -------------------------------
+    # SAVE PROCESSED DATA
+    # -------------------------------
+    saved_to = _store(df, OUTPUT_FILE, fmt)
+
+    print("\n✅ Feature Engineering Completed!")
+    print(f"✅ Windows: {', '.join(map(str, args.windows))}")
+    print("✅ Processed dataset saved at:")
+    print(saved_to)
+    print("Final shape:", df.shape)
+
+    print("\n📌 Preview of processed dataset:")
+    print(df.head(10))
+    return 0
 
-print("\n✅ Feature Engineering Completed!")
-print("✅ Processed dataset saved at:")
-print(OUTPUT_FILE)
-print("Final shape:", df.shape)
 
-print("\n📌 Preview of processed dataset:")
-print(df.head(10))
+if __name__ == "__main__":
+    sys.exit(main())
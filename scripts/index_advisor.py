@@ -0,0 +1,180 @@
+"""
+Index advisor for the AIOps MongoDB query patterns
+
+Runs explain("executionStats") for the query shapes issued by
+AIOpsDatabase and the Mongo data source, then prints the winning plan
+of each one with the keys and documents it examined. Queries answered by
+a collection scan or an in-memory sort are flagged; compare them with
+INDEX_PLAN in backend/database/mongodb_connection.py.
+
+Usage:
+    python scripts/index_advisor.py [--uri mongodb://localhost:27017/] [--strict]
+
+--strict exits with status 1 when an unexpected collection scan is found.
+"""
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "backend"))
+
+from database.mongodb_connection import AIOpsDatabase
+from database.timeseries_store import BUCKETED
+
+NEWEST_FIRST = [("timestamp", -1), ("_id", -1)]
+
+
+def find_query(collection, filters, sort=None, limit=0, projection=None):
+    return {"kind": "find", "collection": collection, "filters": filters,
+            "sort": sort, "limit": limit, "projection": projection}
+
+
+def aggregate_query(collection, pipeline):
+    return {"kind": "aggregate", "collection": collection, "pipeline": pipeline}
+
+
+def build_queries(db):
+    """Representative query shapes, using values present in the data"""
+    incidents = db.incidents_collection
+    sample = incidents.find_one({}, {"predicted_root_cause": 1, "timestamp": 1}, sort=NEWEST_FIRST) or {}
+    root_cause = sample.get("predicted_root_cause", "CPU_OVERLOAD")
+    newest = sample.get("timestamp")
+    time_range = {"$gte": newest - timedelta(days=1), "$lte": newest} if newest else {"$exists": True}
+    stats_group = {"$group": {"_id": None, "total": {"$sum": 1}}}
+
+    # (name, query, scan expected: the query reads the whole collection by design)
+    return [
+        ("get_incidents()", find_query("incidents", {}, [("timestamp", -1)], 1000), False),
+        ("get_incidents(alert_status)", find_query(
+            "incidents", {"alert_status": "ALERT"}, [("timestamp", -1)], 1000), False),
+        ("get_incidents(root_cause)", find_query(
+            "incidents", {"predicted_root_cause": root_cause}, [("timestamp", -1)], 1000), False),
+        ("get_latest_incident()", find_query("incidents", {}, [("timestamp", -1)], 1), False),
+        ("iter_incidents() page", find_query("incidents", {}, NEWEST_FIRST, 1000), False),
+        ("data source window", find_query(
+            "incidents", {"alert_status": "ALERT", "timestamp": time_range}, NEWEST_FIRST, 250), False),
+        ("data source window (root cause)", find_query(
+            "incidents", {"predicted_root_cause": root_cause, "timestamp": time_range}, NEWEST_FIRST, 250), False),
+        ("get_incident_stats(alert_status)", aggregate_query(
+            "incidents", [{"$match": {"alert_status": "ALERT"}}, stats_group]), False),
+        ("get_incident_stats()", aggregate_query("incidents", [{"$match": {}}, stats_group]), True),
+        ("get_root_cause_distribution()", aggregate_query("incidents", [
+            {"$match": {}},
+            {"$group": {"_id": "$predicted_root_cause", "count": {"$sum": 1}}}
+        ]), True),
+        ("get_metrics()", find_query("metrics", {}, [("timestamp", -1)], 1000), False),
+        ("get_active_alerts()", find_query("alerts", {"status": "active"}, [("created_at", -1)]), False),
+    ]
+
+
+def explain(db, query):
+    """Run explain with executionStats verbosity and return the raw output"""
+    if query["kind"] == "aggregate":
+        return db.mongo.db.command(
+            "explain",
+            {"aggregate": query["collection"], "pipeline": query["pipeline"], "cursor": {}},
+            verbosity="executionStats"
+        )
+    command = {"find": query["collection"], "filter": query["filters"]}
+    if query["sort"]:
+        command["sort"] = dict(query["sort"])
+    if query["limit"]:
+        command["limit"] = query["limit"]
+    if query["projection"]:
+        command["projection"] = query["projection"]
+    return db.mongo.db.command("explain", command, verbosity="executionStats")
+
+
+def _find_key(node, key):
+    """First value stored under `key` anywhere in a nested explain document"""
+    if isinstance(node, dict):
+        if key in node:
+            return node[key]
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        found = _find_key(child, key)
+        if found is not None:
+            return found
+    return None
+
+
+def _stages(plan):
+    """Flatten a plan tree into 'STAGE' / 'IXSCAN index_name' strings"""
+    if not isinstance(plan, dict):
+        return []
+    # Plans from the slot-based engine wrap the tree in queryPlan
+    plan = plan.get("queryPlan", plan)
+    stages = []
+    if "stage" in plan:
+        name = plan["stage"]
+        if "indexName" in plan:
+            name += f" {plan['indexName']}"
+        stages.append(name)
+    for key in ("inputStage", "inputStages"):
+        children = plan.get(key)
+        if isinstance(children, dict):
+            children = [children]
+        for child in children or []:
+            stages.extend(_stages(child))
+    return stages
+
+
+def summarize(result):
+    stats = _find_key(result, "executionStats") or {}
+    stages = _stages(_find_key(result, "winningPlan") or {})
+    return {
+        "plan": " <- ".join(stages) or "?",
+        "collscan": any(s.startswith("COLLSCAN") for s in stages),
+        "blocking_sort": "SORT" in stages,
+        "keys": stats.get("totalKeysExamined"),
+        "docs": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain the AIOps MongoDB query patterns")
+    parser.add_argument("--uri", default=None, help="MongoDB connection string (default: MONGODB_URI)")
+    parser.add_argument("--strict", action="store_true", help="Exit 1 on unexpected collection scans")
+    args = parser.parse_args()
+
+    db = AIOpsDatabase(args.uri)
+    if db.storage_mode == BUCKETED:
+        print("[INFO] Bucketed storage indexes bucket bounds only; nothing to advise")
+        return 0
+
+    problems = 0
+    print(f"{'query':<34} {'keys':>9} {'docs':>9} {'returned':>9}  plan")
+    for name, query, scan_expected in build_queries(db):
+        try:
+            info = summarize(explain(db, query))
+        except Exception as e:
+            print(f"[ERROR] {name}: explain failed: {e}")
+            problems += 1
+            continue
+
+        print(f"{name:<34} {info['keys']!s:>9} {info['docs']!s:>9} {info['returned']!s:>9}  {info['plan']}")
+        if info["collscan"] and not scan_expected:
+            print(f"[WARN] {name}: collection scan; add an index whose prefix matches the filter")
+            problems += 1
+        elif info["blocking_sort"]:
+            print(f"[WARN] {name}: in-memory sort; the index does not cover the sort order")
+        elif info["docs"] and info["returned"] and info["docs"] > 10 * info["returned"]:
+            print(f"[WARN] {name}: examined {info['docs']} documents to return {info['returned']}")
+
+    db.close()
+    if problems:
+        print(f"[WARN] {problems} query pattern(s) need attention")
+    else:
+        print("[OK] All filtered query patterns use an index")
+    return 1 if problems and args.strict else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
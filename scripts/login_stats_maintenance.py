@@ -0,0 +1,51 @@
+"""
+Maintain the materialized login_stats collection
+
+Usage:
+    python scripts/login_stats_maintenance.py --check
+    python scripts/login_stats_maintenance.py --backfill
+"""
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "backend"))
+
+from database.login_tracker import LoginTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill or verify login_stats")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Rebuild login_stats from the full user_logins history")
+    parser.add_argument("--check", action="store_true",
+                        help="Compare login_stats with a fresh aggregation")
+    args = parser.parse_args()
+
+    tracker = LoginTracker(background=False)
+    if tracker.db is None:
+        print("[ERROR] MongoDB is not reachable")
+        return 1
+
+    try:
+        if args.backfill:
+            tracker.backfill_login_stats()
+
+        if args.check or not args.backfill:
+            mismatches = tracker.check_login_stats()
+            if not mismatches:
+                print("[OK] login_stats is consistent with user_logins")
+                return 0
+            print(f"[WARN] {len(mismatches)} users out of sync:")
+            for item in mismatches:
+                print(f"   {item['username']}: expected={item['expected']} actual={item['actual']}")
+            print("[INFO] Run with --backfill to repair")
+            return 2
+        return 0
+    finally:
+        tracker.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Maintain the incidents_1m / incidents_1h rollups
+
+Usage:
+    python scripts/rollup_incidents.py             # roll up new incidents once
+    python scripts/rollup_incidents.py --loop 30   # keep refreshing every 30s
+    python scripts/rollup_incidents.py --rebuild   # recompute from all incidents
+    python scripts/rollup_incidents.py --check     # compare with a full scan
+
+The backend refreshes the rollups on its own background thread
+(ROLLUP_REFRESH_SECONDS, 0 to leave it to --loop) and rebuilds them after
+a failed refresh; --rebuild forces that by hand.
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from datetime import timedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BASE_DIR, "backend"))
+
+from database.mongodb_connection import AIOpsDatabase
+
+
+def _same(a, b):
+    if a is None or b is None:
+        return a is b
+    if isinstance(a, float) or isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9)
+    return a == b
+
+
+def check(db):
+    """Compare rollup answers with a scan of the incidents for a few filters"""
+    newest = db.get_latest_incident()
+    filters = [{}, {"alert_status": "ALERT"}]
+    rc = db.incidents_store.find_one({}, {"predicted_root_cause": 1})
+    if rc and "predicted_root_cause" in rc:
+        filters.append({"predicted_root_cause": rc["predicted_root_cause"]})
+    if newest and newest.get("timestamp"):
+        import pandas as pd
+        end = pd.Timestamp(newest["timestamp"]).floor("h").to_pydatetime()
+        filters.append({"timestamp": {"$gte": end - timedelta(days=1), "$lt": end}})
+
+    mismatches = 0
+    for f in filters:
+        raw_stats = db.get_incident_stats(f, use_rollups=False)
+        rollup_stats = db.rollups.stats(f)
+        raw_dist = db.get_root_cause_distribution(f, use_rollups=False)
+        rollup_dist = db.rollups.root_cause_distribution(f)
+        if rollup_stats is None or rollup_dist is None:
+            print(f"[WARN] Rollups cannot answer {f}")
+            mismatches += 1
+            continue
+        stats_ok = raw_stats.keys() == rollup_stats.keys() and \
+            all(_same(raw_stats[k], rollup_stats[k]) for k in raw_stats)
+        if stats_ok and raw_dist == rollup_dist:
+            print(f"[OK] {f}: total={rollup_stats.get('total', 0)}")
+        else:
+            print(f"[ERROR] {f}: rollups {rollup_stats} {rollup_dist} != scan {raw_stats} {raw_dist}")
+            mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain incident rollups")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute rollups from scratch")
+    parser.add_argument("--loop", type=float, default=0, help="Refresh every N seconds")
+    parser.add_argument("--check", action="store_true", help="Compare rollups with a full scan")
+    args = parser.parse_args()
+
+    db = AIOpsDatabase()
+    try:
+        start = time.perf_counter()
+        if args.rebuild:
+            done = db.rollups.rebuild()
+        else:
+            done = db.rollups.refresh(force=True)
+        state = "updated" if done else "already up to date"
+        print(f"[OK] Rollups {state} in {time.perf_counter() - start:.2f}s")
+
+        if args.check:
+            # Incidents newer than the settle window are not rolled up yet
+            if check(db):
+                return 1
+
+        while args.loop > 0:
+            time.sleep(args.loop)
+            start = time.perf_counter()
+            if db.rollups.refresh(force=True):
+                print(f"[OK] Rollups updated in {time.perf_counter() - start:.2f}s")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
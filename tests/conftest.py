@@ -0,0 +1,28 @@
+"""
+Shared test setup
+
+The backend modules import each other as top-level modules (data_source,
+database.*), the way backend/app.py runs them, so both the repository root
+and backend/ go on sys.path. MongoDB is replaced by mongomock.
+"""
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (BASE_DIR, os.path.join(BASE_DIR, "backend")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """A mongomock client handed out by the shared client factory"""
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    from database import login_tracker, mongodb_connection
+    for module in (login_tracker, mongodb_connection):
+        monkeypatch.setattr(module, "get_client", lambda *args, **kwargs: client)
+        monkeypatch.setattr(module, "release_client", lambda *args, **kwargs: None)
+    return client
@@ -0,0 +1,46 @@
+"""Alert fingerprints and the one-active-alert-per-fingerprint index"""
+import pytest
+
+from database.alerts import alert_fingerprint
+from database.mongodb_connection import AIOpsDatabase
+
+CPU_ALERT = {"service": "api", "host": "web-1", "metric": "cpu_usage",
+             "alert_type": "threshold", "predicted_root_cause": "CPU_OVERLOAD"}
+
+
+@pytest.fixture
+def alerts(mongo_client):
+    return mongo_client["aiops_db"]["alerts"]
+
+
+def test_index_leaves_out_active_alerts_without_a_fingerprint(alerts):
+    database = AIOpsDatabase()
+    # Alerts stored before fingerprints existed share the missing key; the
+    # index (and building it over them) must not treat them as duplicates
+    alerts.insert_many([{"status": "active", "message": "disk full"},
+                        {"status": "active", "message": "host down"}])
+    options = alerts.index_information()["active_fingerprint_unique"]
+    assert alerts.count_documents(options["partialFilterExpression"]) == 0
+
+    first = database.create_alert(CPU_ALERT)
+    assert database.create_alert(dict(CPU_ALERT, message="again")) == first
+    assert database.create_alerts([CPU_ALERT]) == [None]
+
+
+def test_alerts_without_fingerprint_fields_are_not_merged(mongo_client):
+    database = AIOpsDatabase()
+    first = database.create_alert({"message": "disk full", "severity": "high"})
+    second = database.create_alert({"message": "host down", "severity": "high"})
+    assert first is not None and second is not None and first != second
+    assert {alert["fingerprint"] for alert in database.get_active_alerts()} == {first, second}
+
+    assert database.upsert_alerts([{"message": "a"}, {"message": "b"}]) == \
+        {"created": 2, "updated": 0}
+    assert len(database.get_active_alerts()) == 4
+
+
+def test_fingerprint_fallback():
+    assert alert_fingerprint({"message": "x"}) is None
+    assert alert_fingerprint({"_id": "abc", "message": "x"}) == "abc"
+    assert alert_fingerprint({"_id": "abc", **CPU_ALERT}) == alert_fingerprint(CPU_ALERT)
+    assert alert_fingerprint({"fingerprint": "explicit", **CPU_ALERT}) == "explicit"
@@ -0,0 +1,129 @@
+"""Streaming CSV import: checkpoints, resume and idempotency"""
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from database.csv_importer import import_csv
+from database.timeseries_store import BUCKETED, STANDARD, TimeSeriesStore
+
+ROWS = 120
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "incidents.csv"
+    pd.DataFrame({
+        "timestamp": pd.date_range("2025-01-01", periods=ROWS, freq="min"),
+        "row": range(ROWS),
+        "alert_status": ["ALERT", "OK", "OK"] * (ROWS // 3),
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(params=[STANDARD, BUCKETED])
+def store(request, mongo_client):
+    return TimeSeriesStore(mongo_client["aiops_db"], "incidents", request.param, bucket_size=16)
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FailingStore:
+    """Passes insert_many through until the `fail_on`-th call, which raises"""
+
+    def __init__(self, store, fail_on=None):
+        self.store = store
+        self.fail_on = fail_on
+        self.calls = 0
+        self.lookups = []
+
+    def insert_many(self, records, ordered=False):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise Interrupted("connection lost")
+        return self.store.insert_many(records, ordered=ordered)
+
+    def find(self, filters=None, projection=None, **kwargs):
+        self.lookups.append(len(filters["_id"]["$in"]))
+        return self.store.find(filters, projection, **kwargs)
+
+
+def stored_rows(store):
+    return sorted(doc["row"] for doc in store.find({}, {"row": 1}))
+
+
+def test_import_writes_each_row_once_and_removes_checkpoint(store, csv_path):
+    result = import_csv(store, csv_path, chunksize=50, batch_size=10, workers=2)
+    assert result["rows"] == ROWS
+    assert stored_rows(store) == list(range(ROWS))
+    assert not os.path.exists(csv_path + ".import-checkpoint.json")
+
+
+def test_importing_the_same_file_again_adds_nothing(mongo_client, csv_path):
+    # Only the standard layout has a unique _id index to reject the rows;
+    # the others look up just the rows a resumed import may have written
+    store = TimeSeriesStore(mongo_client["aiops_db"], "incidents", STANDARD)
+    import_csv(store, csv_path, chunksize=50, batch_size=10)
+    result = import_csv(store, csv_path, chunksize=50, batch_size=10)
+    assert result["rows"] == 0
+    assert result["skipped"] == ROWS
+    assert stored_rows(store) == list(range(ROWS))
+
+
+def test_interrupted_import_resumes_without_duplicates(store, csv_path):
+    # Chunk 2 is batches 6-10; batch 8 fails after 6 and 7 (and maybe 9, 10) were written
+    failing = FailingStore(store, fail_on=8)
+    with pytest.raises(Interrupted):
+        import_csv(failing, csv_path, chunksize=50, batch_size=10, workers=1)
+    with open(csv_path + ".import-checkpoint.json", encoding="utf-8") as f:
+        assert json.load(f)["rows_done"] == 50
+    assert len(stored_rows(store)) > 50
+
+    with open(csv_path + ".import-checkpoint.json", encoding="utf-8") as f:
+        assert json.load(f)["rows_submitted"] == 100
+
+    resumed = FailingStore(store)
+    result = import_csv(resumed, csv_path, chunksize=50, batch_size=10)
+    assert result["skipped"] > 0
+    # Only chunk 2 (rows 50-99) may have been in flight; chunk 3 is not looked up
+    assert resumed.lookups == [50]
+    assert stored_rows(store) == list(range(ROWS))
+
+
+def test_fresh_import_does_not_look_up_stored_rows(store, csv_path):
+    counting = FailingStore(store)
+    import_csv(counting, csv_path, chunksize=50, batch_size=10)
+    assert counting.lookups == []
+
+
+def test_file_rewritten_in_place_is_imported_again(store, csv_path):
+    import_csv(store, csv_path, chunksize=50, batch_size=10)
+    changed = pd.read_csv(csv_path)
+    changed["row"] += ROWS
+    changed.to_csv(csv_path, index=False)
+    stat = os.stat(csv_path)
+    # Same size; a later mtime alone marks the new version
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    result = import_csv(store, csv_path, chunksize=50, batch_size=10)
+    assert result["rows"] == ROWS
+    assert stored_rows(store) == list(range(2 * ROWS))
+
+
+def test_checkpoint_of_an_older_version_is_ignored(store, csv_path):
+    with open(csv_path + ".import-checkpoint.json", "w", encoding="utf-8") as f:
+        json.dump({"csv_path": os.path.abspath(csv_path), "version": "0-0",
+                   "rows_done": 100, "rows_submitted": 100}, f)
+    result = import_csv(store, csv_path, chunksize=50, batch_size=10)
+    assert result["rows"] == ROWS
+
+
+def test_checkpoint_of_another_file_is_ignored(store, csv_path):
+    with open(csv_path + ".import-checkpoint.json", "w", encoding="utf-8") as f:
+        json.dump({"csv_path": "/elsewhere.csv", "rows_done": 100}, f)
+    result = import_csv(store, csv_path, chunksize=50, batch_size=10)
+    assert result["rows"] == ROWS
+    assert stored_rows(store) == list(range(ROWS))
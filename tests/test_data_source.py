@@ -0,0 +1,112 @@
+"""The API routes answer the same from every data source (csv, parquet, mongo)"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_source import DataFrameSource, MongoSource, ParquetSource, ViewFilter
+
+ROOT_CAUSES = ["CPU_OVERLOAD", "MEMORY_LEAK", "NETWORK_LATENCY"]
+
+URLS = [
+    "/api/data?window=20",
+    "/api/data?alert_status=ALERT&window=15",
+    "/api/data?root_cause=MEMORY_LEAK&start_date=2025-01-02&end_date=2025-01-03&window=500",
+    "/api/data?root_cause=NOT_A_CAUSE",
+    "/api/kpi",
+    "/api/analytics?window=40",
+    "/api/analytics?alert_status=ALERT&start_date=2025-01-01&end_date=2025-01-02",
+    "/api/insights?window=60",
+    "/api/insights?alert_status=OK&root_cause=CPU_OVERLOAD&window=30",
+    "/api/options",
+    "/api/options?alert_status=ALERT",
+]
+
+
+@pytest.fixture
+def decisions():
+    rng = np.random.default_rng(11)
+    n = 108
+    probability = rng.uniform(0, 1, n).round(3)
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2025-01-01", periods=n, freq="40min"),
+        "cpu_usage": rng.uniform(10, 95, n).round(2),
+        "memory_usage": rng.uniform(5, 90, n).round(2),
+        "response_time": rng.uniform(50, 900, n).round(2),
+        "anomaly_label": rng.integers(0, 2, n),
+        "failure_probability": probability,
+        "predicted_root_cause": rng.choice(ROOT_CAUSES, n),
+        "alert_status": np.where(probability >= 0.7, "ALERT", "OK"),
+    })
+
+
+@pytest.fixture
+def csv_path(tmp_path, decisions):
+    path = str(tmp_path / "final_decision_output.csv")
+    decisions.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(params=["csv", "parquet", "mongo"])
+def source(request, csv_path, decisions):
+    if request.param == "csv":
+        return DataFrameSource.from_csv(csv_path)
+    if request.param == "parquet":
+        from decision_engine.stage_store import PARQUET, write_stage
+        write_stage(decisions, csv_path, PARQUET)
+        return ParquetSource(csv_path)
+    request.getfixturevalue("mongo_client")
+    from database.mongodb_connection import AIOpsDatabase
+    database = AIOpsDatabase()
+    database.rollups.refresh_seconds = 0
+    database.insert_incidents_bulk(decisions.to_dict("records"))
+    return MongoSource(database)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """GET a route with app.data_source set to the given source"""
+    monkeypatch.setenv("MODEL_REGISTRY_POLL_SECONDS", "0")
+    import app as backend
+
+    def get(source, url):
+        monkeypatch.setattr(backend, "data_source", source)
+        response = backend.app.test_client().get(url)
+        return response.status_code, response.get_json()
+    return get
+
+
+def assert_same(actual, expected, path="response"):
+    """Equal JSON, with floats compared to a relative 1e-9 (server-side averages)"""
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and actual.keys() == expected.keys(), path
+        for key in expected:
+            assert_same(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert isinstance(actual, list) and len(actual) == len(expected), path
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            assert_same(a, e, f"{path}[{i}]")
+    elif isinstance(expected, float) or isinstance(actual, float):
+        assert math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-12), path
+    else:
+        assert actual == expected, path
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_routes_match_the_in_memory_source(api, source, csv_path, url):
+    expected = api(DataFrameSource.from_csv(csv_path), url)
+    actual = api(source, url)
+    assert actual[0] == expected[0]
+    assert_same(actual[1], expected[1])
+
+
+def test_appended_rows_are_counted_and_read_back(source, decisions):
+    record = decisions.iloc[-1].to_dict()
+    record.update(timestamp=str(record["timestamp"] + pd.Timedelta(days=1)),
+                  predicted_root_cause="DISK_FULL", alert_status="ALERT")
+    source.append(record)
+    assert source.count() == len(decisions) + 1
+    newest = source.rows(ViewFilter(window=1))
+    assert newest["predicted_root_cause"].tolist() == ["DISK_FULL"]
+    assert "DISK_FULL" in source.options("ALERT")[0]
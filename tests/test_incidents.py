@@ -0,0 +1,124 @@
+"""IncidentTracker open / update / resolve"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from decision_engine.incidents import (HOLD_PROBABILITY, OPEN_PROBABILITY, OPENED,
+                                       RESOLVE_AFTER_SECONDS, UPDATED, IncidentTracker)
+from decision_engine.resolution_model import severity_array
+
+ROOT_CAUSES = ["CPU_OVERLOAD", "MEMORY_LEAK"]
+SERIES = ["web-1", "web-2"]
+
+
+def decision_rows(n=400, seed=3):
+    """Decision output with bursts of high probability and irregular gaps"""
+    rng = np.random.default_rng(seed)
+    gaps = rng.choice([30, 60, 120, 400], n, p=[0.5, 0.3, 0.15, 0.05])
+    stamps = pd.Timestamp("2025-01-01") + pd.to_timedelta(np.cumsum(gaps), unit="s")
+    return pd.DataFrame({
+        "timestamp": stamps.astype(str),
+        "cpu_usage": rng.uniform(10, 99, n).round(2),
+        "memory_usage": rng.uniform(10, 99, n).round(2),
+        "response_time": rng.uniform(50, 3000, n).round(1),
+        "anomaly_score": rng.uniform(-0.5, 0.5, n).round(3),
+        "failure_probability": rng.choice([0.1, 0.3, 0.55, 0.65, 0.75, 0.95], n),
+        "predicted_root_cause": rng.choice(ROOT_CAUSES, n),
+        "recommended_action": rng.choice(["scale_out", "restart", "page"], n),
+        "host": rng.choice(SERIES, n),
+    })
+
+
+def incidents(tracker):
+    """Every incident seen so far, resolved and open, by id"""
+    found = tracker.drain_resolved() + tracker.open_incidents()
+    return sorted((incident.to_dict() for incident in found), key=lambda d: d["incident_id"])
+
+
+def feed_rows(tracker, frame):
+    """update() one row at a time, with the severity update_frame() would compute"""
+    severity = severity_array(frame["cpu_usage"], frame["memory_usage"],
+                              frame["response_time"], frame["anomaly_score"])
+    for i, row in enumerate(frame.itertuples(index=False)):
+        tracker.update(row.timestamp, row.predicted_root_cause, row.failure_probability,
+                       severity[i], series=row.host,
+                       plan={"recommended_action": row.recommended_action})
+
+
+def test_out_of_order_row_does_not_move_end_back():
+    tracker = IncidentTracker()
+    event, incident, _ = tracker.update("2025-01-01 00:00:00", "cpu_overload", 0.9)
+    assert event == OPENED
+    tracker.update("2025-01-01 00:02:00", "cpu_overload", 0.9)
+    event, incident, _ = tracker.update("2025-01-01 00:01:00", "cpu_overload", 0.9)
+    assert event == UPDATED
+    assert incident.end == "2025-01-01 00:02:00"
+    assert incident.duration_seconds == 120.0
+    assert incident.row_count == 3
+
+
+def test_hold_probability_keeps_an_incident_open_but_does_not_open_one():
+    between = (HOLD_PROBABILITY + OPEN_PROBABILITY) / 2
+    tracker = IncidentTracker()
+    assert tracker.update("2025-01-01 00:00:00", "cpu_overload", between)[0] is None
+    assert tracker.open_incidents() == []
+
+    tracker.update("2025-01-01 00:01:00", "cpu_overload", 0.9)
+    event, incident, _ = tracker.update("2025-01-01 00:02:00", "cpu_overload", between)
+    assert event == UPDATED
+    assert incident.end == "2025-01-01 00:02:00"
+    assert (incident.row_count, incident.alert_rows) == (2, 1)
+    # Below hold_probability the row does not extend it
+    assert tracker.update("2025-01-01 00:03:00", "cpu_overload", HOLD_PROBABILITY - 0.01)[0] is None
+    assert incident.end == "2025-01-01 00:02:00"
+
+
+def test_quiet_gap_longer_than_resolve_after_resolves():
+    assert RESOLVE_AFTER_SECONDS == 300
+    tracker = IncidentTracker()
+    _, first, _ = tracker.update("2025-01-01 00:00:00", "cpu_overload", 0.9)
+    # Exactly 300s later the incident is still open
+    _, _, resolved = tracker.update("2025-01-01 00:05:00", "cpu_overload", 0.1)
+    assert resolved == [] and first.status == "OPEN"
+    _, _, resolved = tracker.update("2025-01-01 00:05:01", "cpu_overload", 0.1)
+    assert resolved == [first] and first.status == "RESOLVED"
+
+    event, second, _ = tracker.update("2025-01-01 00:06:00", "cpu_overload", 0.9)
+    assert event == OPENED and second.incident_id != first.incident_id
+
+
+@pytest.mark.parametrize("chunk", [400, 37])
+def test_update_frame_matches_row_by_row_updates(chunk):
+    frame = decision_rows()
+    by_row = IncidentTracker()
+    feed_rows(by_row, frame)
+    by_frame = IncidentTracker()
+    for start in range(0, len(frame), chunk):
+        by_frame.update_frame(frame.iloc[start:start + chunk], series_column="host")
+
+    expected = incidents(by_row)
+    assert len(expected) > 5
+    assert any(incident["status"] == "RESOLVED" for incident in expected)
+    assert incidents(by_frame) == expected
+
+
+def test_state_round_trip_matches_one_continuous_run():
+    frame = decision_rows()
+    continuous = IncidentTracker()
+    continuous.update_frame(frame, series_column="host")
+
+    first = IncidentTracker()
+    first.update_frame(frame.iloc[:200], series_column="host")
+    resolved = first.drain_resolved()
+    # Carried in the JSON decision checkpoint between runs
+    resumed = IncidentTracker.from_state(json.loads(json.dumps(first.state())))
+    resumed.update_frame(frame.iloc[200:], series_column="host")
+    resolved += resumed.drain_resolved()
+
+    expected = continuous.drain_resolved()
+    assert [incident.to_dict() for incident in resolved] == [incident.to_dict() for incident in expected]
+    assert [incident.to_dict() for incident in resumed.open_incidents()] == \
+        [incident.to_dict() for incident in continuous.open_incidents()]
+    assert resumed.state() == continuous.state()
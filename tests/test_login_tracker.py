@@ -0,0 +1,107 @@
+"""LoginTracker connection handling and the login_stats summary"""
+from datetime import datetime
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from database.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from database.login_tracker import LoginTracker
+
+
+@pytest.fixture
+def spill_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOGIN_SPILL_FILE", str(tmp_path / "login_spill.jsonl"))
+
+
+def connect(**kwargs):
+    tracker = LoginTracker(background=False, **kwargs)
+    tracker.writer.close()
+    return tracker
+
+
+def test_startup_backfill_runs_before_the_connection_is_published(mongo_client, spill_env, monkeypatch):
+    mongo_client["aiops_db"]["user_logins"].insert_many([
+        {"username": "alice", "timestamp": datetime(2025, 1, 1)},
+        {"username": "alice", "timestamp": datetime(2025, 1, 2)},
+    ])
+    published = []
+    backfill = LoginTracker._backfill_login_stats
+
+    def watched_backfill(self):
+        # The writer only touches MongoDB once self.db is set
+        published.append(self.db is not None)
+        return backfill(self)
+
+    monkeypatch.setattr(LoginTracker, "_backfill_login_stats", watched_backfill)
+    tracker = connect()
+    assert published == [False]
+    assert tracker.db is not None
+    assert tracker.check_login_stats() == []
+
+
+def test_writes_and_backfill_keep_stats_consistent(mongo_client, spill_env):
+    tracker = connect()
+    tracker._write_records([{"username": "bob", "timestamp": datetime(2025, 1, 1)}])
+    assert tracker.backfill_login_stats() == 1
+    tracker._write_records([{"username": "bob", "timestamp": datetime(2025, 1, 3)}])
+    assert tracker.check_login_stats() == []
+    assert tracker.get_login_stats()["bob"]["total_logins"] == 2
+
+
+@pytest.mark.parametrize("error", [OperationFailure("auth failed"), RuntimeError("boom")])
+def test_setup_errors_open_the_breaker(mongo_client, spill_env, monkeypatch, error):
+    def fail(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(type(mongo_client["aiops_db"]["user_logins"]), "create_index", fail)
+    tracker = connect()
+    assert tracker.db is None
+    assert tracker.breaker.state == OPEN
+    assert tracker.get_recent_logins() == []
+
+
+def half_open(tracker):
+    """Trip the breaker and let its trial call through"""
+    tracker.breaker.trip()
+    tracker.breaker.opened_at -= tracker.breaker.reset_timeout
+
+
+@pytest.mark.parametrize("error", [OperationFailure("not authorized"), RuntimeError("boom")])
+@pytest.mark.parametrize("call", ["get_recent_logins", "get_login_stats", "write"])
+def test_half_open_trial_that_raises_is_not_left_half_open(mongo_client, spill_env, monkeypatch,
+                                                           call, error):
+    tracker = connect()
+    half_open(tracker)
+
+    def fail(*args, **kwargs):
+        raise error
+
+    collection = type(tracker.logins_collection)
+    with monkeypatch.context() as patch:
+        patch.setattr(collection, "find", fail)
+        patch.setattr(collection, "insert_many", fail)
+        if call == "write":
+            with pytest.raises(type(error)):
+                tracker._write_records([{"username": "bob", "timestamp": datetime(2025, 1, 1)}])
+        else:
+            getattr(tracker, call)()
+    assert tracker.breaker.state == OPEN
+
+    # The next trial goes through once reset_timeout has passed again
+    tracker.breaker.opened_at -= tracker.breaker.reset_timeout
+    tracker.get_recent_logins()
+    assert tracker.breaker.state == CLOSED
+
+
+def test_unresolved_trial_is_retried_after_reset_timeout(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("database.circuit_breaker.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(reset_timeout=30)
+    breaker.trip()
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # The trial never reports back
+    assert not breaker.allow()
+    clock[0] += 30
+    assert breaker.allow()
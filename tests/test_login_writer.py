@@ -0,0 +1,151 @@
+"""LoginAuditWriter spill / replay and the LoginTracker sink"""
+import json
+import os
+import time
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from database.login_tracker import LoginTracker
+from database.login_writer import LoginAuditWriter, PartialWriteError
+
+
+class FakeSink:
+    """Records every batch; fails while `failing` is set"""
+
+    def __init__(self):
+        self.batches = []
+        self.failing = False
+
+    def __call__(self, records):
+        if self.failing:
+            raise ConnectionError("sink down")
+        self.batches.append([dict(record) for record in records])
+
+    @property
+    def records(self):
+        return [record for batch in self.batches for record in batch]
+
+
+@pytest.fixture
+def spill_path(tmp_path):
+    return str(tmp_path / "login_spill.jsonl")
+
+
+def idle_writer(sink, spill_path, **kwargs):
+    """A writer whose thread has stopped, so tests drive _flush() directly"""
+    writer = LoginAuditWriter(sink, spill_path=spill_path, **kwargs)
+    writer.close()
+    return writer
+
+
+def spilled_lines(spill_path):
+    with open(spill_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_failed_batch_is_spilled_and_replayed_after_next_success(spill_path):
+    sink = FakeSink()
+    writer = idle_writer(sink, spill_path)
+    sink.failing = True
+    writer._flush([{"username": "a"}, {"username": "b"}])
+    assert [line["username"] for line in spilled_lines(spill_path)] == ["a", "b"]
+
+    sink.failing = False
+    writer._flush([{"username": "c"}])
+    assert [record["username"] for record in sink.records] == ["c", "a", "b"]
+    assert writer.written == 3
+
+
+def test_partial_write_spills_only_failed_records_with_their_id(spill_path):
+    ids = [ObjectId() for _ in range(3)]
+    records = [{"_id": _id, "username": name} for _id, name in zip(ids, "xyz")]
+
+    def partial_sink(batch):
+        raise PartialWriteError([batch[1]], written=2)
+
+    writer = idle_writer(partial_sink, spill_path)
+    writer._flush(records)
+    assert spilled_lines(spill_path) == [{"_id": {"$oid": str(ids[1])}, "username": "y"}]
+    assert writer.written == 2
+
+    sink = FakeSink()
+    writer.sink = sink
+    writer._flush([{"username": "next"}])
+    assert sink.records[-1] == {"_id": ids[1], "username": "y"}
+
+
+def test_corrupt_spill_lines_are_skipped(spill_path):
+    with open(spill_path, "w", encoding="utf-8") as f:
+        f.write('{"username": "a"}\n{not json\n[1, 2]\n{"username": "b"}\n')
+    sink = FakeSink()
+    writer = idle_writer(sink, spill_path)
+    writer._flush([{"username": "new"}])
+    assert [record["username"] for record in sink.records] == ["new", "a", "b"]
+    assert writer.skipped == 2
+    assert not os.path.exists(spill_path)
+    assert not os.path.exists(spill_path + ".replay")
+
+
+def test_replay_left_by_a_crash_is_resumed_at_startup(spill_path):
+    with open(spill_path, "w", encoding="utf-8") as f:
+        f.write('{"username": "spilled"}\n')
+    with open(spill_path + ".replay", "w", encoding="utf-8") as f:
+        # The crash cut the last line's newline
+        f.write('{"username": "r1"}\n{"username": "r2"}')
+    sink = FakeSink()
+    writer = idle_writer(sink, spill_path)
+    writer._flush([{"username": "new"}])
+    assert [record["username"] for record in sink.records] == ["new", "spilled", "r1", "r2"]
+
+
+def test_replay_failure_does_not_stop_the_writer_thread(spill_path):
+    sink = FakeSink()
+    writer = LoginAuditWriter(sink, spill_path=spill_path, flush_interval=0.01)
+
+    def broken_replay():
+        raise OSError("disk gone")
+
+    writer._replay_spill = broken_replay
+    writer.submit({"username": "a"})
+    time.sleep(0.2)
+    writer.submit({"username": "b"})
+    writer.close()
+    assert [record["username"] for record in sink.records] == ["a", "b"]
+
+
+# -------------------------------
+# LoginTracker as the sink
+# -------------------------------
+@pytest.fixture
+def tracker(mongo_client, spill_path, monkeypatch):
+    monkeypatch.setenv("LOGIN_SPILL_FILE", spill_path)
+    tracker = LoginTracker(background=False)
+    yield tracker
+    tracker.writer.close()
+
+
+def test_replayed_duplicates_count_as_written(tracker):
+    stored = {"_id": ObjectId(), "username": "alice", "timestamp": datetime(2025, 1, 1)}
+    tracker.logins_collection.insert_one(dict(stored))
+    tracker._write_records([dict(stored), {"username": "bob", "timestamp": datetime(2025, 1, 2)}])
+    assert tracker.logins_collection.count_documents({}) == 2
+    # Only the newly inserted record reaches the summary
+    assert tracker.stats_collection.find_one({"_id": "bob"})["total_logins"] == 1
+    assert tracker.stats_collection.find_one({"_id": "alice"}) is None
+
+
+def test_rejected_records_raise_partial_write(tracker, monkeypatch):
+    records = [{"username": name, "timestamp": None} for name in "abc"]
+
+    def insert_many(batch, ordered):
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "invalid"}],
+                              "nInserted": 2})
+
+    monkeypatch.setattr(tracker.logins_collection, "insert_many", insert_many)
+    with pytest.raises(PartialWriteError) as error:
+        tracker._write_records(records)
+    assert error.value.failed == [records[1]]
+    assert error.value.written == 2
@@ -0,0 +1,97 @@
+"""ModelService activate / refresh ordering"""
+import os
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+import model_service
+from model_service import ModelService
+from models.registry import ModelRegistry
+
+
+class FakeRegistry:
+    def __init__(self, active="v1"):
+        self.active = active
+
+    def active_version(self):
+        return self.active
+
+    def activate(self, version):
+        self.active = version
+
+    def versions(self):
+        return ["v1", "v2", "v3"]
+
+
+def service(registry, build):
+    models = ModelService(registry=registry, poll_seconds=0)
+    models._build = build
+    return models
+
+
+def test_failed_load_leaves_active_pointer_alone():
+    registry = FakeRegistry("v1")
+
+    def build(version=None):
+        if version == "v2":
+            raise IOError("corrupt bundle")
+        return SimpleNamespace(version=version or registry.active)
+
+    models = service(registry, build)
+    assert models.current().version == "v1"
+    with pytest.raises(IOError):
+        models.activate("v2")
+    assert registry.active == "v1"
+    assert models.current().version == "v1"
+
+
+def test_stale_refresh_cannot_swap_the_old_version_back():
+    registry = FakeRegistry("v2")
+    loading, release = threading.Event(), threading.Event()
+
+    def build(version=None):
+        if version == "v2":
+            # The poller is loading v2 when v3 gets activated
+            loading.set()
+            release.wait(5)
+        return SimpleNamespace(version=version)
+
+    models = service(registry, build)
+    poller = threading.Thread(target=models.refresh)
+    poller.start()
+    assert loading.wait(5)
+    activator = threading.Thread(target=models.activate, args=("v3",))
+    activator.start()
+    release.set()
+    poller.join(5)
+    activator.join(5)
+    assert registry.active == "v3"
+    assert models.current().version == "v3"
+
+
+def memmap_backed(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, "base", None)
+    return False
+
+
+def test_activated_version_is_served_from_the_mmap(tmp_path, monkeypatch):
+    if "MODEL_COMPILED" not in os.environ:
+        assert model_service.COMPILED_MODELS is False
+    monkeypatch.setattr(model_service, "COMPILED_MODELS", False)
+    registry = ModelRegistry(str(tmp_path / "registry"))
+    version = registry.import_legacy(activate=False)
+
+    models = ModelService(registry=registry, poll_seconds=0)
+    pipeline = models.activate(version)
+    assert pipeline.version == version and not pipeline.compiled
+    # The estimators joblib mapped, not private copies
+    anomaly = pipeline.anomaly_model
+    assert all(memmap_backed(features) for features in anomaly.estimators_features_)
+    assert memmap_backed(pipeline.pred_model.classes_)
+    assert memmap_backed(pipeline.root_model.estimators_[0].classes_)
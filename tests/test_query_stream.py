@@ -0,0 +1,63 @@
+"""Keyset pagination over standard and bucketed storage"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.query_stream import iter_pages
+from database.timeseries_store import BUCKETED, STANDARD, TimeSeriesStore, _bucket_bounds
+
+START = datetime(2025, 1, 1)
+
+
+@pytest.fixture(params=[STANDARD, BUCKETED])
+def store(request, mongo_client):
+    store = TimeSeriesStore(mongo_client["aiops_db"], "metrics", request.param, bucket_size=10)
+    rng = random.Random(7)
+    samples = [{"series": f"s{i % 3}", "timestamp": START + timedelta(minutes=rng.randrange(500))}
+               for i in range(300)]
+    # Written in arrival order, so buckets overlap in time
+    for start in range(0, len(samples), 25):
+        store.insert_many(samples[start:start + 25])
+    store.insert_many([{"series": "s0", "timestamp": None}])
+    return store
+
+
+def keys(docs):
+    return [(doc["timestamp"], doc["_id"]) for doc in docs]
+
+
+@pytest.mark.parametrize("sort_order", [-1, 1])
+def test_pages_cover_every_timed_document_in_order(store, sort_order):
+    pages = list(iter_pages(store, batch_size=7, sort_order=sort_order))
+    seen = keys(doc for page in pages for doc in page)
+    expected = sorted(keys(doc for doc in store.find({}) if doc["timestamp"] is not None),
+                      reverse=sort_order < 0)
+    # The null timestamp neither ends paging early nor shows up out of order
+    assert seen == expected
+    assert len(seen) == 300
+
+
+@pytest.mark.parametrize("sort_order", [-1, 1])
+def test_bucketed_pages_unwind_a_bounded_number_of_buckets(mongo_client, sort_order):
+    store = TimeSeriesStore(mongo_client["aiops_db"], "metrics", BUCKETED, bucket_size=10)
+    store.insert_many([{"timestamp": START + timedelta(minutes=i)} for i in range(1000)])
+    unwound = []
+    aggregate = store.aggregate
+
+    def counting_aggregate(pipeline, _bounds=None, **kwargs):
+        unwound.append(store.collection.count_documents(_bounds or {}))
+        return aggregate(pipeline, _bounds=_bounds, **kwargs)
+
+    store.aggregate = counting_aggregate
+    pages = list(iter_pages(store, batch_size=20, sort_order=sort_order))
+    assert sum(len(page) for page in pages) == 1000
+    # 100 buckets in all; a page never unwinds more than a few of them
+    assert max(unwound) <= 4
+
+
+def test_bucket_bounds_read_ranges_inside_and():
+    low, high = START, START + timedelta(hours=1)
+    bounds = _bucket_bounds({"$and": [{"series": "a"}, {"timestamp": {"$gte": low}},
+                                      {"timestamp": {"$lt": high}}]})
+    assert bounds == {"$and": [{"end": {"$gte": low}}, {"start": {"$lte": high}}]}
@@ -0,0 +1,69 @@
+"""recommend_resolution_batch() matches recommend_resolution() row for row"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from decision_engine.resolution_model import recommend_resolution, recommend_resolution_batch
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILE = os.path.join(BASE_DIR, "data", "processed", "final_decision_output.csv")
+FIELDS = ["auto_resolution", "resolution_playbook", "resolution_confidence", "can_auto_execute"]
+ROOT_CAUSES = ["CPU_OVERLOAD", "MEMORY_LEAK", "LATENCY_SPIKE", "NORMAL", "cpu_overload",
+               "Memory_Leak", "DISK_FULL", "", None]
+
+
+def _column(rng, n, low, high, specials):
+    """Uniform values with a share of special values mixed in"""
+    values = rng.uniform(low, high, n)
+    picks = rng.random(n) < 0.15
+    values[picks] = rng.choice(specials, picks.sum())
+    return values
+
+
+def random_batch(rng, n):
+    """Out-of-range metrics, NaN, boundary values and mixed-case or missing root causes"""
+    return {
+        "root_cause": rng.choice(np.array(ROOT_CAUSES, dtype=object), n),
+        "cpu_usage": _column(rng, n, -20, 150, [0.0, 100.0, np.nan, -0.0]),
+        "memory_usage": _column(rng, n, -20, 150, [0.0, 100.0, np.nan]),
+        "response_time": _column(rng, n, -100, 6000, [0.0, 3000.0, np.nan]),
+        "anomaly_score": _column(rng, n, -1.5, 1.5, [0.0, -0.2, 1.2, np.nan]),
+        "failure_probability": _column(rng, n, 0, 1, [0.0, 0.5, 1.0, np.nan]),
+        "anomaly_label": rng.choice(np.array([0, 1, -1]), n),
+    }
+
+
+def assert_batch_matches_scalar(batch):
+    expected = [recommend_resolution(*row) for row in zip(*batch.values())]
+    actual = recommend_resolution_batch(**batch)
+    for field in FIELDS:
+        values = np.asarray(actual[field], dtype=object)
+        for i, row in enumerate(expected):
+            a, b = row[field], values[i]
+            if field == "resolution_confidence":
+                # Bit patterns, so NaN or a last-digit difference is caught
+                same = np.float64(a).tobytes() == np.float64(b).tobytes()
+            else:
+                same = a == b
+            inputs = {name: column[i] for name, column in batch.items()}
+            assert same, f"row {i} {field}: scalar={a!r} batch={b!r} inputs={inputs}"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_batches(seed):
+    assert_batch_matches_scalar(random_batch(np.random.default_rng(seed), 300))
+
+
+def test_processed_dataset():
+    df = pd.read_csv(DATA_FILE)
+    assert_batch_matches_scalar({
+        "root_cause": df["predicted_root_cause"].to_numpy(),
+        "cpu_usage": df["cpu_usage"].to_numpy(),
+        "memory_usage": df["memory_usage"].to_numpy(),
+        "response_time": df["response_time"].to_numpy(),
+        "anomaly_score": df["anomaly_score"].to_numpy(),
+        "failure_probability": df["failure_probability"].to_numpy(),
+        "anomaly_label": df["anomaly_label"].to_numpy(),
+    })
@@ -0,0 +1,83 @@
+"""Incident rollup refresh: background thread and recovery from failed merges"""
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from database.rollups import STATE_ID, IncidentRollups
+
+
+class FakeIncidents:
+    """Stands in for the incidents store; mongomock has no $merge"""
+
+    def __init__(self):
+        self.merges = []
+        self.failing = False
+
+    def aggregate(self, pipeline):
+        if self.failing:
+            raise RuntimeError("merge interrupted")
+        self.merges.append(pipeline[-1]["$merge"]["into"])
+        return iter(())
+
+
+@pytest.fixture
+def rollups(mongo_client):
+    db = mongo_client["aiops_db"]
+    return IncidentRollups(db, FakeIncidents(), settle_seconds=0, refresh_seconds=0)
+
+
+def state(rollups):
+    return rollups.state.find_one({"_id": STATE_ID})
+
+
+def test_failed_merge_is_rebuilt_by_the_next_refresh(rollups):
+    rollups.incidents_store.failing = True
+    assert rollups.refresh(force=True) is False
+    assert state(rollups)["pending"] is True
+    assert not rollups.is_ready()
+
+    rollups.collections["hour"].insert_one({"count": 7})
+    rollups.incidents_store.failing = False
+    assert rollups.refresh(force=True) is True
+    # Half-merged buckets were dropped and everything merged again
+    assert rollups.collections["hour"].count_documents({}) == 0
+    assert rollups.incidents_store.merges == ["incidents_1m", "incidents_1h"]
+    assert rollups.is_ready()
+
+
+def test_claim_of_a_live_refresher_is_left_alone(rollups):
+    rollups.state.insert_one({"_id": STATE_ID, "watermark": datetime.now(),
+                              "pending": True, "claimed_at": datetime.now()})
+    assert rollups.refresh(force=True) is False
+    assert rollups.incidents_store.merges == []
+
+
+def test_abandoned_claim_is_rebuilt(rollups):
+    stale = datetime.now() - timedelta(seconds=rollups.pending_seconds + 60)
+    rollups.state.insert_one({"_id": STATE_ID, "watermark": stale,
+                              "pending": True, "claimed_at": stale})
+    assert rollups.refresh(force=True) is True
+    assert rollups.is_ready()
+
+
+def test_reads_do_not_merge_inline(mongo_client, monkeypatch):
+    from database.mongodb_connection import AIOpsDatabase
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_refresh(self, force=False):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(IncidentRollups, "refresh", slow_refresh)
+    db = AIOpsDatabase()
+    db.rollups.refresh_seconds = 3600
+    db.insert_incident({"alert_status": "ALERT", "cpu_usage": 50.0})
+    try:
+        # Answered by a scan while the background refresh is still running
+        assert db.get_incident_stats()["total"] == 1
+        assert started.wait(5)
+    finally:
+        release.set()
+        db.rollups.stop()